@@ -4,13 +4,10 @@ import logging
 import sys
 from src.slack_handler import SlackHandler
 from src.config.settings import Config
+from src.telemetry import configure_logging, configure_tracing, start_metrics_server
 
-# Simple logging setup
-logging.basicConfig(
-    level=getattr(logging, Config.LOG_LEVEL),
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
+# Logging setup (plain text or JSON depending on LOG_FORMAT)
+configure_logging()
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +15,8 @@ def main():
     """Start the K8s troubleshooting agent."""
     try:
         Config.validate()
+        configure_tracing()
+        start_metrics_server()
         handler = SlackHandler()
         logger.info("Starting K8s Troubleshooting Agent...")
         handler.start()
@@ -1,20 +1,33 @@
 from strands import Agent, tool
-from src.agents.memory_agent import MemoryAgent
+from src.agents.memory_agent import MemoryAgent, retrieve_solutions
 from src.agents.k8s_specialist import K8sSpecialist
+from src.agents.agent_pool import AgentBusyError, AgentPool
 from src.config.settings import Config
+from src.agents.bedrock_model import create_bedrock_model
 from src.prompts import ORCHESTRATOR_SYSTEM_PROMPT, CLASSIFICATION_PROMPT, K8S_KEYWORDS
+from src.telemetry import span, record_agent_usage, record_token_usage, ToolCallTelemetry, readiness
+from src.resilience import DependencyUnavailableError, bedrock_dependency, guard, unavailable_cause
+from concurrent.futures import ThreadPoolExecutor, wait
 import logging
+import time
 import boto3
 import json
 
 logger = logging.getLogger(__name__)
 
+CLASSIFIER_MODEL_ID = "amazon.nova-micro-v1:0"
+
 class OrchestratorAgent:
     """Direct K8s troubleshooting orchestrator."""
     
     def __init__(self):
-        self.memory_agent = MemoryAgent()
-        self.k8s_specialist = K8sSpecialist()
+        # Build the sub-agents concurrently in the background; the specialist waits on the EKS MCP
+        # server, and neither is needed until the first troubleshooting request
+        readiness.require("memory_agent", "k8s_specialist")
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="agent-init")
+        self._memory_agent = self._executor.submit(self._build, "memory_agent", MemoryAgent)
+        self._k8s_specialist = self._executor.submit(self._build, "k8s_specialist", K8sSpecialist)
+        self._executor.shutdown(wait=False)
         
         # Initialize Bedrock client for Nova Micro classification
         try:
@@ -23,13 +36,47 @@ class OrchestratorAgent:
             logger.warning(f"Failed to initialize Bedrock client, falling back to keywords: {e}")
             self.bedrock_client = None
         
-        self.agent = Agent(
+        # One orchestrator agent per concurrent Slack request, up to AGENT_POOL_SIZE
+        self.agents = AgentPool("orchestrator", lambda: Agent(
             name="K8s Orchestrator",
             system_prompt=ORCHESTRATOR_SYSTEM_PROMPT,
-            model=Config.BEDROCK_MODEL_ID,
-            tools=[self.memory_operations, self.troubleshoot_k8s]
-        )
+            model=create_bedrock_model(),
+            tools=[self.memory_operations, self.troubleshoot_k8s],
+            hooks=[ToolCallTelemetry("orchestrator")]
+        ))
         
+    @staticmethod
+    def _build(component: str, factory):
+        """Build a sub-agent and mark it ready, retrying with backoff before reporting it as failed."""
+        for attempt in range(1, Config.AGENT_INIT_ATTEMPTS + 1):
+            try:
+                with span("startup", component=component, attempt=attempt):
+                    instance = factory()
+                readiness.set_ready(component)
+                return instance
+            except Exception as e:
+                if attempt == Config.AGENT_INIT_ATTEMPTS:
+                    readiness.set_failed(component, str(e))
+                    raise
+                delay = Config.AGENT_INIT_BACKOFF_SECONDS * 2 ** (attempt - 1)
+                logger.warning(f"Failed to build {component} (attempt {attempt}), retrying in {delay:.0f}s: {e}")
+                time.sleep(delay)
+    
+    @property
+    def memory_agent(self) -> MemoryAgent:
+        """The memory agent, waiting for its initialization on first use."""
+        return self._memory_agent.result()
+    
+    @property
+    def k8s_specialist(self) -> K8sSpecialist:
+        """The K8s specialist, waiting for its initialization on first use."""
+        return self._k8s_specialist.result()
+    
+    def wait_ready(self, timeout: float = None) -> bool:
+        """Wait for the sub-agents to finish initializing."""
+        done, _ = wait([self._memory_agent, self._k8s_specialist], timeout=timeout)
+        return len(done) == 2
+    
     def should_respond(self, message: str, is_mention: bool = False, is_thread: bool = False) -> bool:
         """Check if should respond to message using SLM or keyword fallback."""
         if is_mention:
@@ -48,74 +95,117 @@ class OrchestratorAgent:
     
     def _classify_with_nova(self, message: str) -> bool:
         """Use Amazon Nova Micro to classify if message is K8s/troubleshooting related."""
-        try:
-            prompt = CLASSIFICATION_PROMPT.format(message=message)
-            
-            body = {
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": [{"text": prompt}]
+        with span("classification", model=CLASSIFIER_MODEL_ID) as classification_span:
+            try:
+                prompt = CLASSIFICATION_PROMPT.format(message=message)
+                
+                body = {
+                    "messages": [
+                        {
+                            "role": "user",
+                            "content": [{"text": prompt}]
+                        }
+                    ],
+                    "inferenceConfig": {
+                        "maxTokens": 10,
+                        "temperature": 0.1
                     }
-                ],
-                "inferenceConfig": {
-                    "maxTokens": 10,
-                    "temperature": 0.1
                 }
-            }
-            
-            response = self.bedrock_client.invoke_model(
-                modelId="amazon.nova-micro-v1:0",
-                body=json.dumps(body)
-            )
-            
-            result = json.loads(response['body'].read())
-            logger.info(f"Message classification should respond:{result}")
-            
-            answer = result['output']['message']['content'][0]['text'].strip().upper()
-            
-            return answer == "YES"
-            
-        except Exception as e:
-            logger.error(f"Nova classification failed: {e}")
-            # Fallback to keyword matching
-            return any(keyword in message.lower() for keyword in K8S_KEYWORDS)
+                
+                with guard(bedrock_dependency(CLASSIFIER_MODEL_ID), model_id=CLASSIFIER_MODEL_ID):
+                    response = self.bedrock_client.invoke_model(
+                        modelId=CLASSIFIER_MODEL_ID,
+                        body=json.dumps(body)
+                    )
+                
+                result = json.loads(response['body'].read())
+                logger.info(f"Message classification should respond:{result}")
+                record_token_usage("classifier", result.get('usage', {}), classification_span)
+                
+                answer = result['output']['message']['content'][0]['text'].strip().upper()
+                classification_span.set(answer=answer)
+                
+                return answer == "YES"
+                
+            except DependencyUnavailableError as e:
+                # Degraded mode: skip the model while it is throttled
+                logger.info(f"Nova classification skipped: {e}")
+                classification_span.set(fallback="keywords", reason=str(e))
+                return any(keyword in message.lower() for keyword in K8S_KEYWORDS)
+            except Exception as e:
+                logger.error(f"Nova classification failed: {e}")
+                classification_span.set_error(e)
+                # Fallback to keyword matching
+                return any(keyword in message.lower() for keyword in K8S_KEYWORDS)
 
     def respond(self, message: str, thread_id: str, context: str = None) -> str:
         """Main entry point for responses."""
-        try:
-            # Get the agent response
-            agent_response = self.agent(message)
-            
-            # Handle different response types from Strands agent
-            if hasattr(agent_response, 'content'):
-                response = str(agent_response.content).strip()
-            elif hasattr(agent_response, 'text'):
-                response = str(agent_response.text).strip()
-            elif isinstance(agent_response, (list, tuple)):
-                # If it's a list/tuple, join all parts
-                response = ' '.join(str(part) for part in agent_response).strip()
-            else:
-                response = str(agent_response).strip()
-            
-            logger.info(f"Full agent response: {response[:200]}..." if len(response) > 200 else f"Full agent response: {response}")
-            
-            return response if response else "I'm here to help with Kubernetes troubleshooting. How can I assist you?"
-        except Exception as e:
-            logger.error(f"Orchestrator error: {e}")
-            return "Error processing request. Please try again."
+        with span("orchestrator", thread_id=thread_id) as orchestrator_span:
+            try:
+                # Get the agent response
+                with self.agents.agent() as agent:
+                    agent_response = agent(message)
+                record_agent_usage("orchestrator", agent_response, orchestrator_span)
+                
+                # Handle different response types from Strands agent
+                if hasattr(agent_response, 'content'):
+                    response = str(agent_response.content).strip()
+                elif hasattr(agent_response, 'text'):
+                    response = str(agent_response.text).strip()
+                elif isinstance(agent_response, (list, tuple)):
+                    # If it's a list/tuple, join all parts
+                    response = ' '.join(str(part) for part in agent_response).strip()
+                else:
+                    response = str(agent_response).strip()
+                
+                logger.info(f"Full agent response: {response[:200]}..." if len(response) > 200 else f"Full agent response: {response}")
+                
+                return response if response else "I'm here to help with Kubernetes troubleshooting. How can I assist you?"
+            except AgentBusyError as e:
+                logger.warning(f"Orchestrator busy: {e}")
+                orchestrator_span.set(busy=True)
+                return "I'm working on several other investigations right now, please try again in a minute."
+            except Exception as e:
+                unavailable = unavailable_cause(e)
+                if unavailable is not None:
+                    logger.warning(f"Orchestrator degraded: {unavailable}")
+                    orchestrator_span.set(degraded=True, dependency=unavailable.dependency)
+                    return self._degraded_response(message)
+                logger.error(f"Orchestrator error: {e}")
+                orchestrator_span.set_error(e)
+                return "Error processing request. Please try again."
+
+    def _degraded_response(self, message: str) -> str:
+        """Answer from stored solutions only, without the orchestrator model, while Bedrock is throttled."""
+        response = ("Amazon Bedrock is throttling requests right now, so I can't run a full "
+                    "troubleshooting session. Please try again in a few minutes.")
+        solutions = retrieve_solutions(message)
+        if solutions.startswith("Similar solutions found"):
+            response += f"\n\nIn the meantime, these stored solutions may help:\n\n{solutions}"
+        return response
 
 
 
     @tool
     def memory_operations(self, request: str) -> str:
         """Handle memory operations - store or retrieve K8s troubleshooting information."""
-        try:
-            result = self.memory_agent.agent(request)
-            return str(result)
-        except Exception as e:
-            logger.error(f"Memory operation failed: {e}")
-            return f"Memory error: {e}"
+        with span("memory_agent") as memory_span:
+            try:
+                with self.memory_agent.agents.agent() as agent:
+                    result = agent(request)
+                record_agent_usage("memory", result, memory_span)
+                return str(result)
+            except AgentBusyError as e:
+                memory_span.set(busy=True)
+                return f"Memory is busy ({e}), continue without it."
+            except Exception as e:
+                unavailable = unavailable_cause(e)
+                if unavailable is not None:
+                    memory_span.set(degraded=True, dependency=unavailable.dependency)
+                    return f"Memory is temporarily unavailable ({unavailable}), continue without it."
+                logger.error(f"Memory operation failed: {e}")
+                memory_span.set_error(e)
+                return f"Memory error: {e}"
 
     @tool
     def troubleshoot_k8s(self, query: str) -> str:
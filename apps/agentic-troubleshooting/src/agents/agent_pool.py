@@ -0,0 +1,77 @@
+"""Bounded pool of Strands agents for concurrent requests."""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List
+
+from prometheus_client import Counter
+from strands import Agent
+
+from src.config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+AGENT_POOL_REJECTIONS = Counter(
+    "agent_pool_rejections_total",
+    "Requests turned away because every agent of the pool stayed busy for AGENT_ACQUIRE_TIMEOUT_SECONDS",
+    ["agent"],
+)
+
+
+class AgentBusyError(Exception):
+    """Raised when no agent of a pool frees up in time."""
+
+
+class AgentPool:
+    """A bounded pool of interchangeable Strands agents.
+
+    A Strands agent runs one invocation at a time, so each request checks an agent out for the
+    whole invocation. Agents are built on first use, up to AGENT_POOL_SIZE; beyond that a request
+    waits at most AGENT_ACQUIRE_TIMEOUT_SECONDS and is then rejected with `AgentBusyError`
+    instead of queuing behind long investigations.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Agent], size: int = None, acquire_timeout: float = None):
+        self.name = name
+        self.size = size or Config.AGENT_POOL_SIZE
+        self.acquire_timeout = acquire_timeout if acquire_timeout is not None else Config.AGENT_ACQUIRE_TIMEOUT_SECONDS
+        self._factory = factory
+        self._idle: List[Agent] = []
+        self._created = 0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def agent(self) -> Iterator[Agent]:
+        """Check out an idle agent, building one while the pool is below its size.
+
+        Raises:
+            AgentBusyError: When every agent stays busy for `acquire_timeout` seconds.
+        """
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._condition:
+            while not self._idle and self._created >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    AGENT_POOL_REJECTIONS.labels(agent=self.name).inc()
+                    raise AgentBusyError(f"All {self.size} {self.name} agents are busy")
+                self._condition.wait(remaining)
+            agent = self._idle.pop() if self._idle else None
+            if agent is None:
+                self._created += 1
+        if agent is None:
+            try:
+                agent = self._factory()
+            except Exception:
+                with self._condition:
+                    self._created -= 1
+                    self._condition.notify()
+                raise
+            logger.info(f"Built {self.name} agent {self._created} of {self.size}")
+        try:
+            yield agent
+        finally:
+            with self._condition:
+                self._idle.append(agent)
+                self._condition.notify()
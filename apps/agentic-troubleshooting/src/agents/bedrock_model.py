@@ -0,0 +1,39 @@
+"""Shared Bedrock model configuration for the troubleshooting agents."""
+
+from typing import Any, AsyncGenerator
+
+from strands.models import BedrockModel
+from src.config.settings import Config
+from src.resilience import async_guard, bedrock_dependency
+
+
+class ResilientBedrockModel(BedrockModel):
+    """BedrockModel whose requests go through the model ID's rate limit and circuit breaker.
+
+    While the breaker is open, requests fail immediately with `CircuitOpenError` instead of
+    being retried by the Strands event loop, so callers can answer in a degraded mode.
+    """
+
+    async def stream(self, *args: Any, **kwargs: Any) -> AsyncGenerator[Any, None]:
+        model_id = self.get_config()["model_id"]
+        async with async_guard(bedrock_dependency(model_id), model_id=model_id):
+            async for event in super().stream(*args, **kwargs):
+                yield event
+
+
+def create_bedrock_model() -> BedrockModel:
+    """Create the Bedrock model used by the orchestrator, memory agent and specialist.
+
+    With ENABLE_PROMPT_CACHE, cache checkpoints are placed after the tool schemas and the system
+    prompt. Both are identical on every call, so repeat turns read that prefix from the cache
+    instead of paying for it as input tokens. The prefix must exceed the model's minimum cacheable
+    length (1,024 tokens for Claude Sonnet) for Bedrock to cache it.
+    """
+    kwargs = {
+        "model_id": Config.BEDROCK_MODEL_ID,
+        "region_name": Config.AWS_REGION,
+    }
+    if Config.ENABLE_PROMPT_CACHE:
+        kwargs["cache_prompt"] = "default"
+        kwargs["cache_tools"] = "default"
+    return ResilientBedrockModel(**kwargs)
@@ -1,14 +1,16 @@
 """K8s specialist agent with embedded EKS MCP server."""
 
 from strands import Agent
-from mcp import stdio_client, StdioServerParameters
-from strands.tools.mcp import MCPClient
 import logging
-import os
-import boto3
 from src.tools.k8s_tools import describe_pod, get_pods
+from src.tools.mcp_pool import McpSessionPool
+from src.tools.tool_cache import INVOCATION_STATE_KEY, CachedTool, ToolResultCache
 from src.config.settings import Config
+from src.agents.agent_pool import AgentBusyError, AgentPool
+from src.agents.bedrock_model import create_bedrock_model
 from src.prompts import K8S_SPECIALIST_SYSTEM_PROMPT
+from src.telemetry import span, record_agent_usage, ToolCallTelemetry
+from src.resilience import unavailable_cause
 
 logger = logging.getLogger(__name__)
 
@@ -20,85 +22,66 @@ class K8sSpecialist:
         """Initialize the K8s specialist with EKS MCP integration."""
         # Start with local K8s tools
         tools = [describe_pod, get_pods]
-        self.eks_mcp_client = None
-        self._mcp_connected = False
+        self.mcp_pool = None
         
         # Add EKS MCP server if enabled
         if Config.ENABLE_EKS_MCP:
             try:
-                # Get AWS credentials from the current session (Pod Identity)
-                session = boto3.Session()
-                credentials = session.get_credentials()
-                
-                # Create EKS MCP client with explicit credentials
-                env_vars = {
-                    "AWS_REGION": Config.AWS_REGION,
-                    "FASTMCP_LOG_LEVEL": "ERROR"
-                }
-                
-                # Pass explicit AWS credentials if available
-                if credentials:
-                    env_vars["AWS_ACCESS_KEY_ID"] = credentials.access_key
-                    env_vars["AWS_SECRET_ACCESS_KEY"] = credentials.secret_key
-                    if credentials.token:
-                        env_vars["AWS_SESSION_TOKEN"] = credentials.token
-                    logger.info("Using Pod Identity credentials for EKS MCP server")
-                else:
-                    # Fallback to environment credentials
-                    for key in ["AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_SESSION_TOKEN", "AWS_PROFILE"]:
-                        if key in os.environ:
-                            env_vars[key] = os.environ[key]
-                    logger.info("Using environment credentials for EKS MCP server")
-                
-                # Use kubeconfig created by init container
-                env_vars["KUBECONFIG"] = "/shared/kubeconfig"
-                
-                # Build args based on configuration
-                args = ["awslabs.eks-mcp-server@latest", "--allow-sensitive-data-access"]
-                if Config.EKS_MCP_ALLOW_WRITE:
-                    args.append("--allow-write")
-                
-                self.eks_mcp_client = MCPClient(lambda: stdio_client(
-                    StdioServerParameters(
-                        command="uvx",
-                        args=args,
-                        env=env_vars
-                    )
-                ))
-                
-                # Connect and get EKS MCP tools
-                self.eks_mcp_client.__enter__()
-                self._mcp_connected = True
-                eks_tools = self.eks_mcp_client.list_tools_sync()
+                # Supervised pool of MCP server sessions, restarted when they die or their
+                # Pod Identity credentials are about to expire
+                self.mcp_pool = McpSessionPool()
+                eks_tools = self.mcp_pool.start()
                 tools.extend(eks_tools)
-                logger.info(f"Added {len(eks_tools)} EKS MCP tools with persistent connection")
+                logger.info(f"Added {len(eks_tools)} EKS MCP tools backed by a pool of {self.mcp_pool.size} sessions")
                     
             except Exception as e:
                 logger.warning(f"Failed to initialize EKS MCP: {e}")
-                self.eks_mcp_client = None
+                if self.mcp_pool is not None:
+                    self.mcp_pool.close()
+                self.mcp_pool = None
         
         cluster_info = f"Cluster: {getattr(Config, 'CLUSTER_NAME', 'unknown')} in region {Config.AWS_REGION}\n"
         
         self.system_prompt = f"{cluster_info}{K8S_SPECIALIST_SYSTEM_PROMPT}"
         
-        self.agent = Agent(
+        # Identical read-only tool calls within one investigation reuse the first result
+        if Config.ENABLE_TOOL_CACHE:
+            tools = [CachedTool(tool) for tool in tools]
+        
+        # One agent per concurrent investigation, sharing the tools and the EKS MCP session pool
+        self.agents = AgentPool("specialist", lambda: Agent(
             system_prompt=self.system_prompt,
-            model=Config.BEDROCK_MODEL_ID,
-            tools=tools
-        )
+            model=create_bedrock_model(),
+            tools=tools,
+            hooks=[ToolCallTelemetry("specialist")]
+        ))
     
     def troubleshoot(self, issue: str) -> str:
         """Troubleshoot a K8s issue with EKS cluster context."""
-        try:
-            return str(self.agent(issue)).strip()
-        except Exception as e:
-            logger.error(f"Error troubleshooting: {e}")
-            return "Error during troubleshooting. Please try again."
+        with span("specialist") as specialist_span:
+            try:
+                # A new cache per investigation, passed to the tools with the invocation
+                invocation_state = {INVOCATION_STATE_KEY: ToolResultCache()}
+                with self.agents.agent() as agent:
+                    agent_result = agent(issue, invocation_state=invocation_state)
+                record_agent_usage("specialist", agent_result, specialist_span)
+                return str(agent_result).strip()
+            except AgentBusyError as e:
+                specialist_span.set(busy=True)
+                return f"Troubleshooting is busy with other investigations ({e}), please try again shortly."
+            except Exception as e:
+                unavailable = unavailable_cause(e)
+                if unavailable is not None:
+                    specialist_span.set(degraded=True, dependency=unavailable.dependency)
+                    return f"Troubleshooting is temporarily unavailable: {unavailable}"
+                logger.error(f"Error troubleshooting: {e}")
+                specialist_span.set_error(e)
+                return "Error during troubleshooting. Please try again."
     
     def __del__(self):
-        """Clean up MCP connection."""
-        if self._mcp_connected and self.eks_mcp_client:
+        """Clean up MCP sessions."""
+        if self.mcp_pool is not None:
             try:
-                self.eks_mcp_client.__exit__(None, None, None)
+                self.mcp_pool.close()
             except:
-                pass
\ No newline at end of file
+                pass
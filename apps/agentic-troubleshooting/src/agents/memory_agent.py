@@ -2,46 +2,65 @@
 
 import logging
 import json
+from functools import lru_cache
 import boto3
 from strands import Agent, tool
 from src.config.settings import Config
+from src.agents.agent_pool import AgentPool
+from src.agents.bedrock_model import create_bedrock_model
 from src.prompts import MEMORY_SYSTEM_PROMPT
+from src.telemetry import ToolCallTelemetry
+from src.resilience import DependencyUnavailableError, bedrock_dependency, guard
 
 logger = logging.getLogger(__name__)
 
-# Initialize clients
-bedrock = boto3.client("bedrock-runtime", region_name=Config.AWS_REGION)
-s3vectors = boto3.client("s3vectors", region_name=Config.AWS_REGION)
+
+@lru_cache(maxsize=None)
+def get_client(service_name: str):
+    """Create a boto3 client on first use, so importing the module does not load credentials or endpoints."""
+    return boto3.client(service_name, region_name=Config.AWS_REGION)
+
 
 VECTOR_BUCKET = Config.VECTOR_BUCKET
 INDEX_NAME = Config.INDEX_NAME
+EMBEDDING_MODEL_ID = "amazon.titan-embed-text-v2:0"
+
+
+def embed(text: str) -> list:
+    """Generate a Titan embedding under the embedding model's rate limit and circuit breaker."""
+    with guard(bedrock_dependency(EMBEDDING_MODEL_ID), model_id=EMBEDDING_MODEL_ID):
+        response = get_client("bedrock-runtime").invoke_model(
+            modelId=EMBEDDING_MODEL_ID,
+            body=json.dumps({"inputText": text})
+        )
+    return json.loads(response["body"].read())["embedding"]
 
 @tool
 def store_solution(query: str, solution: str, metadata: dict = None) -> str:
     """Store a K8s troubleshooting solution in vector database."""
     try:
         # Generate embedding
-        response = bedrock.invoke_model(
-            modelId="amazon.titan-embed-text-v2:0",
-            body=json.dumps({"inputText": query})
-        )
-        embedding = json.loads(response["body"].read())["embedding"]
+        embedding = embed(query)
         
         # Store in S3 Vectors
-        s3vectors.put_vectors(
-            vectorBucketName=VECTOR_BUCKET,
-            indexName=INDEX_NAME,
-            vectors=[{
-                "key": f"solution_{hash(query)}",
-                "data": {"float32": embedding},
-                "metadata": {
-                    "query": query,
-                    "solution": solution,
-                    **(metadata or {})
-                }
-            }]
-        )
+        with guard("s3vectors"):
+            get_client("s3vectors").put_vectors(
+                vectorBucketName=VECTOR_BUCKET,
+                indexName=INDEX_NAME,
+                vectors=[{
+                    "key": f"solution_{hash(query)}",
+                    "data": {"float32": embedding},
+                    "metadata": {
+                        "query": query,
+                        "solution": solution,
+                        **(metadata or {})
+                    }
+                }]
+            )
         return "Solution stored successfully"
+    except DependencyUnavailableError as e:
+        logger.warning(f"Store skipped: {e}")
+        return f"Memory is temporarily unavailable, solution not stored: {e}"
     except Exception as e:
         logger.error(f"Store error: {e}")
         return f"Failed to store: {e}"
@@ -51,21 +70,18 @@ def retrieve_solutions(query: str, top_k: int = 3) -> str:
     """Retrieve similar K8s troubleshooting solutions."""
     try:
         # Generate query embedding
-        response = bedrock.invoke_model(
-            modelId="amazon.titan-embed-text-v2:0",
-            body=json.dumps({"inputText": query})
-        )
-        embedding = json.loads(response["body"].read())["embedding"]
+        embedding = embed(query)
         
         # Query vector index
-        response = s3vectors.query_vectors(
-            vectorBucketName=VECTOR_BUCKET,
-            indexName=INDEX_NAME,
-            queryVector={"float32": embedding},
-            topK=top_k,
-            returnDistance=True,
-            returnMetadata=True
-        )
+        with guard("s3vectors"):
+            response = get_client("s3vectors").query_vectors(
+                vectorBucketName=VECTOR_BUCKET,
+                indexName=INDEX_NAME,
+                queryVector={"float32": embedding},
+                topK=top_k,
+                returnDistance=True,
+                returnMetadata=True
+            )
         
         if not response.get("vectors"):
             return "No similar solutions found"
@@ -78,6 +94,9 @@ def retrieve_solutions(query: str, top_k: int = 3) -> str:
             result += f"   Distance: {vector.get('distance', 'N/A')}\n\n"
         
         return result
+    except DependencyUnavailableError as e:
+        logger.warning(f"Retrieve skipped: {e}")
+        return f"Memory is temporarily unavailable: {e}"
     except Exception as e:
         logger.error(f"Retrieve error: {e}")
         return f"Failed to retrieve: {e}"
@@ -86,8 +105,9 @@ class MemoryAgent:
     """K8s troubleshooting memory agent using S3 Vectors."""
     
     def __init__(self):
-        self.agent = Agent(
+        self.agents = AgentPool("memory", lambda: Agent(
             system_prompt=MEMORY_SYSTEM_PROMPT,
-            model=Config.BEDROCK_MODEL_ID,
-            tools=[store_solution, retrieve_solutions]
-        )
\ No newline at end of file
+            model=create_bedrock_model(),
+            tools=[store_solution, retrieve_solutions],
+            hooks=[ToolCallTelemetry("memory")]
+        ))
\ No newline at end of file
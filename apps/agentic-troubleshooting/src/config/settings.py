@@ -52,6 +52,44 @@ class Config:
     def BEDROCK_MODEL_ID(self) -> str:
         return os.getenv('BEDROCK_MODEL_ID', 'anthropic.claude-3-sonnet-20240229-v1:0')
     
+    @property
+    def ENABLE_PROMPT_CACHE(self) -> bool:
+        return os.getenv('ENABLE_PROMPT_CACHE', 'false').lower() == 'true'
+    
+    @property
+    def BEDROCK_DEFAULT_RATE_LIMIT(self) -> float:
+        return float(os.getenv('BEDROCK_DEFAULT_RATE_LIMIT', '5'))
+    
+    @property
+    def BEDROCK_RATE_LIMITS(self) -> dict:
+        """Per-model requests per second, e.g. "amazon.nova-micro-v1:0=20,amazon.titan-embed-text-v2:0=10"."""
+        limits = {}
+        for entry in os.getenv('BEDROCK_RATE_LIMITS', '').split(','):
+            if '=' in entry:
+                model_id, rate = entry.rsplit('=', 1)
+                limits[model_id.strip()] = float(rate)
+        return limits
+    
+    @property
+    def RATE_LIMIT_BURST_SECONDS(self) -> float:
+        return float(os.getenv('RATE_LIMIT_BURST_SECONDS', '2'))
+    
+    @property
+    def RATE_LIMIT_MAX_WAIT_SECONDS(self) -> float:
+        return float(os.getenv('RATE_LIMIT_MAX_WAIT_SECONDS', '10'))
+    
+    @property
+    def CIRCUIT_FAILURE_THRESHOLD(self) -> int:
+        return int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))
+    
+    @property
+    def CIRCUIT_RECOVERY_SECONDS(self) -> float:
+        return float(os.getenv('CIRCUIT_RECOVERY_SECONDS', '30'))
+    
+    @property
+    def CIRCUIT_HALF_OPEN_MAX_CALLS(self) -> int:
+        return int(os.getenv('CIRCUIT_HALF_OPEN_MAX_CALLS', '1'))
+    
     @property
     def AGENT_NAME(self) -> str:
         return os.getenv('AGENT_NAME', 'strands-slack-agent')
@@ -71,6 +109,18 @@ class Config:
     def LOG_FORMAT(self) -> str:
         return os.getenv('LOG_FORMAT', 'json')
     
+    @property
+    def METRICS_PORT(self) -> int:
+        return int(os.getenv('METRICS_PORT', '8080'))
+    
+    @property
+    def ENABLE_OTEL(self) -> bool:
+        return os.getenv('ENABLE_OTEL', 'false').lower() == 'true'
+    
+    @property
+    def OTEL_SERVICE_NAME(self) -> str:
+        return os.getenv('OTEL_SERVICE_NAME', 'k8s-troubleshooting-agent')
+    
     @property
     def RESPONSE_THRESHOLD(self) -> float:
         return float(os.getenv('RESPONSE_THRESHOLD', '0.7'))
@@ -79,6 +129,14 @@ class Config:
     def MAX_CONTEXT_MESSAGES(self) -> int:
         return int(os.getenv('MAX_CONTEXT_MESSAGES', '10'))
     
+    @property
+    def THREAD_CONTEXT_MAX_THREADS(self) -> int:
+        return int(os.getenv('THREAD_CONTEXT_MAX_THREADS', '500'))
+    
+    @property
+    def THREAD_CONTEXT_REFRESH_SECONDS(self) -> int:
+        return int(os.getenv('THREAD_CONTEXT_REFRESH_SECONDS', '300'))
+    
     @property
     def RESPONSE_DELAY_SECONDS(self) -> int:
         return int(os.getenv('RESPONSE_DELAY_SECONDS', '2'))
@@ -103,10 +161,74 @@ class Config:
     def ENABLE_EKS_MCP(self) -> bool:
         return os.getenv('ENABLE_EKS_MCP', 'false').lower() == 'true'
     
+    @property
+    def EKS_MCP_SERVER_VERSION(self) -> str:
+        return os.getenv('EKS_MCP_SERVER_VERSION', '0.2.1')
+    
+    @property
+    def EKS_MCP_POOL_SIZE(self) -> int:
+        return int(os.getenv('EKS_MCP_POOL_SIZE', '2'))
+    
+    @property
+    def EKS_MCP_SESSION_CONCURRENCY(self) -> int:
+        return int(os.getenv('EKS_MCP_SESSION_CONCURRENCY', '4'))
+    
+    @property
+    def EKS_MCP_HEALTH_INTERVAL_SECONDS(self) -> float:
+        return float(os.getenv('EKS_MCP_HEALTH_INTERVAL_SECONDS', '30'))
+    
+    @property
+    def EKS_MCP_MAX_SESSION_AGE_SECONDS(self) -> float:
+        return float(os.getenv('EKS_MCP_MAX_SESSION_AGE_SECONDS', '3600'))
+    
+    @property
+    def EKS_MCP_CALL_TIMEOUT_SECONDS(self) -> float:
+        return float(os.getenv('EKS_MCP_CALL_TIMEOUT_SECONDS', '120'))
+    
+    @property
+    def EKS_MCP_ACQUIRE_TIMEOUT_SECONDS(self) -> float:
+        return float(os.getenv('EKS_MCP_ACQUIRE_TIMEOUT_SECONDS', '60'))
+    
     @property
     def EKS_MCP_ALLOW_WRITE(self) -> bool:
         return os.getenv('EKS_MCP_ALLOW_WRITE', 'false').lower() == 'true'
     
+    @property
+    def AGENT_POOL_SIZE(self) -> int:
+        """Concurrent invocations per agent role (orchestrator, memory, specialist)."""
+        return int(os.getenv('AGENT_POOL_SIZE', '4'))
+    
+    @property
+    def AGENT_ACQUIRE_TIMEOUT_SECONDS(self) -> float:
+        return float(os.getenv('AGENT_ACQUIRE_TIMEOUT_SECONDS', '5'))
+    
+    @property
+    def AGENT_INIT_ATTEMPTS(self) -> int:
+        """Attempts to build each sub-agent before the liveness probe reports the pod as failed."""
+        return int(os.getenv('AGENT_INIT_ATTEMPTS', '5'))
+    
+    @property
+    def AGENT_INIT_BACKOFF_SECONDS(self) -> float:
+        return float(os.getenv('AGENT_INIT_BACKOFF_SECONDS', '2'))
+    
+    @property
+    def ENABLE_TOOL_CACHE(self) -> bool:
+        return os.getenv('ENABLE_TOOL_CACHE', 'true').lower() == 'true'
+    
+    @property
+    def TOOL_CACHE_DEFAULT_TTL_SECONDS(self) -> float:
+        return float(os.getenv('TOOL_CACHE_DEFAULT_TTL_SECONDS', '30'))
+    
+    @property
+    def TOOL_CACHE_TTLS(self) -> dict:
+        """Per-tool TTL overrides in seconds, e.g. "get_pod_logs=5,describe_pod=60" (0 disables caching)."""
+        ttls = {}
+        for entry in os.getenv('TOOL_CACHE_TTLS', '').split(','):
+            if '=' in entry:
+                tool_name, ttl = entry.rsplit('=', 1)
+                ttls[tool_name.strip()] = float(ttl)
+        return ttls
+    
     @property
     def VECTOR_BUCKET(self) -> str:
         return os.getenv('VECTOR_BUCKET', 'test-vector-s3-bucket-321')
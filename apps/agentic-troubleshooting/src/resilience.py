@@ -0,0 +1,293 @@
+"""Rate limiting and circuit breaking for the AWS services the agents depend on.
+
+Every Bedrock model ID gets its own token bucket, and every dependency (a Bedrock model, S3
+Vectors) its own circuit breaker. Callers guard their requests with `guard()` and provide a
+degraded answer when it raises `DependencyUnavailableError`, instead of each layer retrying on
+its own while the service is throttling.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, Optional
+
+from botocore.exceptions import ClientError, ConnectTimeoutError, EndpointConnectionError, ReadTimeoutError
+from prometheus_client import Counter, Gauge
+
+from src.config.settings import Config
+
+try:
+    from strands.types.exceptions import ModelThrottledException
+except ImportError:  # pragma: no cover - older strands-agents
+    ModelThrottledException = None
+
+logger = logging.getLogger(__name__)
+
+# Bedrock and S3 Vectors error codes that mean the service is busy or degraded
+UNAVAILABLE_ERROR_CODES = {
+    "ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException",
+    "ServiceUnavailable", "SlowDown", "ModelNotReadyException", "ModelTimeoutException",
+    "InternalServerException", "InternalFailure",
+}
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+BREAKER_STATE = Gauge(
+    "agent_circuit_breaker_state",
+    "Circuit breaker state per dependency (0 closed, 1 half-open, 2 open)",
+    ["dependency"],
+)
+BREAKER_TRANSITIONS = Counter(
+    "agent_circuit_breaker_transitions_total",
+    "Circuit breaker state changes per dependency",
+    ["dependency", "state"],
+)
+BREAKER_REJECTIONS = Counter(
+    "agent_circuit_breaker_rejections_total",
+    "Calls rejected without reaching the dependency because its breaker was open",
+    ["dependency"],
+)
+RATE_LIMITED = Counter(
+    "agent_rate_limited_total",
+    "Calls rejected because the model's rate limit was exhausted for longer than RATE_LIMIT_MAX_WAIT_SECONDS",
+    ["model_id"],
+)
+
+
+class DependencyUnavailableError(Exception):
+    """Raised instead of calling a dependency that is known to be unavailable."""
+
+    def __init__(self, dependency: str, message: str):
+        super().__init__(message)
+        self.dependency = dependency
+
+
+class CircuitOpenError(DependencyUnavailableError):
+    """Raised when a dependency's circuit breaker is open."""
+
+
+class RateLimitExceededError(DependencyUnavailableError):
+    """Raised when no rate limit token became available in time."""
+
+
+def is_unavailable_error(error: BaseException) -> bool:
+    """Tell whether an error means the dependency is throttled or down, rather than the request being invalid."""
+    if isinstance(error, DependencyUnavailableError):
+        return True
+    if ModelThrottledException is not None and isinstance(error, ModelThrottledException):
+        return True
+    if isinstance(error, (ReadTimeoutError, ConnectTimeoutError, EndpointConnectionError)):
+        return True
+    if isinstance(error, ClientError):
+        return error.response.get("Error", {}).get("Code") in UNAVAILABLE_ERROR_CODES
+    return False
+
+
+def unavailable_cause(error: BaseException) -> Optional[DependencyUnavailableError]:
+    """Find a `DependencyUnavailableError` in an exception chain (Strands wraps model errors)."""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, DependencyUnavailableError):
+            return error
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return None
+
+
+class TokenBucket:
+    """A thread-safe token bucket allowing `rate` calls per second with bursts of `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """Take a token if one is available.
+
+        Returns:
+            0 when a token was taken, otherwise the seconds until the next token.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for a token."""
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire()
+            if wait == 0:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    async def acquire_async(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for a token without blocking the event loop."""
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire()
+            if wait == 0:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+
+
+class CircuitBreaker:
+    """A circuit breaker with half-open probing.
+
+    After `failure_threshold` consecutive availability failures the breaker opens and rejects
+    calls for `recovery_timeout` seconds. It then lets `half_open_max_calls` probe calls through:
+    a successful probe closes it, a failed one opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, recovery_timeout: float, half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        BREAKER_STATE.labels(dependency=name).set(STATE_VALUES[CLOSED])
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                self._transition(HALF_OPEN)
+            return self._state
+
+    def before_call(self) -> None:
+        """Reserve a call, raising `CircuitOpenError` when the breaker rejects it."""
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                self._transition(HALF_OPEN)
+            if self._state == OPEN or (self._state == HALF_OPEN and self._probes >= self.half_open_max_calls):
+                BREAKER_REJECTIONS.labels(dependency=self.name).inc()
+                retry_in = max(self.recovery_timeout - (time.monotonic() - self._opened_at), 0)
+                raise CircuitOpenError(self.name, f"{self.name} is unavailable, retrying in {retry_in:.0f}s")
+            if self._state == HALF_OPEN:
+                self._probes += 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            if self._state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == OPEN:
+                return
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._transition(OPEN)
+
+    def record_ignored(self) -> None:
+        """Release a reserved call whose error says nothing about the dependency's health."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes = max(self._probes - 1, 0)
+
+    def _transition(self, state: str) -> None:
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        self._probes = 0
+        if state != self._state:
+            logger.warning(f"Circuit breaker {self.name}: {self._state} -> {state}")
+            BREAKER_TRANSITIONS.labels(dependency=self.name, state=state).inc()
+        self._state = state
+        BREAKER_STATE.labels(dependency=self.name).set(STATE_VALUES[state])
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_rate_limiters: Dict[str, TokenBucket] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(dependency: str) -> CircuitBreaker:
+    """Return the shared circuit breaker of a dependency, creating it on first use."""
+    with _registry_lock:
+        if dependency not in _breakers:
+            _breakers[dependency] = CircuitBreaker(
+                dependency,
+                failure_threshold=Config.CIRCUIT_FAILURE_THRESHOLD,
+                recovery_timeout=Config.CIRCUIT_RECOVERY_SECONDS,
+                half_open_max_calls=Config.CIRCUIT_HALF_OPEN_MAX_CALLS,
+            )
+        return _breakers[dependency]
+
+
+def get_rate_limiter(model_id: str) -> TokenBucket:
+    """Return the shared token bucket of a Bedrock model ID, sized from BEDROCK_RATE_LIMITS."""
+    with _registry_lock:
+        if model_id not in _rate_limiters:
+            rate = Config.BEDROCK_RATE_LIMITS.get(model_id, Config.BEDROCK_DEFAULT_RATE_LIMIT)
+            _rate_limiters[model_id] = TokenBucket(rate, max(rate * Config.RATE_LIMIT_BURST_SECONDS, 1))
+        return _rate_limiters[model_id]
+
+
+def bedrock_dependency(model_id: str) -> str:
+    """Breaker name of a Bedrock model."""
+    return f"bedrock:{model_id}"
+
+
+def _rate_limit_exceeded(model_id: str) -> RateLimitExceededError:
+    RATE_LIMITED.labels(model_id=model_id).inc()
+    return RateLimitExceededError(bedrock_dependency(model_id), f"Rate limit for {model_id} exhausted")
+
+
+def _record_outcome(breaker: CircuitBreaker, error: BaseException) -> None:
+    if is_unavailable_error(error) and not isinstance(error, DependencyUnavailableError):
+        breaker.record_failure()
+    else:
+        breaker.record_ignored()
+
+
+@contextmanager
+def guard(dependency: str, model_id: Optional[str] = None) -> Iterator[None]:
+    """Run a call to a dependency under its circuit breaker and, for Bedrock models, its rate limit.
+
+    Raises:
+        DependencyUnavailableError: When the breaker is open or no rate limit token became available.
+    """
+    breaker = get_breaker(dependency)
+    breaker.before_call()
+    try:
+        if model_id and not get_rate_limiter(model_id).acquire(Config.RATE_LIMIT_MAX_WAIT_SECONDS):
+            raise _rate_limit_exceeded(model_id)
+        yield
+    except BaseException as e:
+        _record_outcome(breaker, e)
+        raise
+    breaker.record_success()
+
+
+@asynccontextmanager
+async def async_guard(dependency: str, model_id: Optional[str] = None) -> AsyncIterator[None]:
+    """Async variant of `guard`, waiting for rate limit tokens without blocking the event loop."""
+    breaker = get_breaker(dependency)
+    breaker.before_call()
+    try:
+        if model_id and not await get_rate_limiter(model_id).acquire_async(Config.RATE_LIMIT_MAX_WAIT_SECONDS):
+            raise _rate_limit_exceeded(model_id)
+        yield
+    except BaseException as e:
+        _record_outcome(breaker, e)
+        raise
+    breaker.record_success()
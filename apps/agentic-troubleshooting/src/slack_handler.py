@@ -2,12 +2,15 @@
 
 import logging
 import asyncio
+from threading import Event
 from slack_bolt import App
 from slack_bolt.adapter.socket_mode import SocketModeHandler
 from slack_sdk import WebClient
 
 from src.config.settings import Config
 from src.agents.agent_orchestrator import OrchestratorAgent
+from src.telemetry import span, readiness
+from src.thread_context import ThreadContextCache
 # from src.agents.k8s_orchestrator import K8sOrchestrator
 
 logger = logging.getLogger(__name__)
@@ -20,6 +23,7 @@ class SlackHandler:
         """Initialize Slack handler and K8s agent."""
         # Validate configuration
         Config.validate()
+        readiness.require("slack")
         
         # Initialize Slack app
         self.app = App(
@@ -33,169 +37,171 @@ class SlackHandler:
         # Track threads where bot has responded
         self.active_threads = set()
         
+        # Recent messages of threads, used as context for replies
+        self.thread_context = ThreadContextCache()
+        
         # Register event handlers
         self._register_handlers()
     
     def _register_handlers(self):
         """Register Slack event handlers."""
-        # Get bot user ID once during initialization
-        bot_user_id = self.app.client.auth_test()['user_id']
-        logger.info(f"Bot user ID: {bot_user_id} - Registering event handlers...")
+        # Bolt already calls auth.test when the app is created and passes the bot user ID to
+        # listeners in their context, so no extra round trip is made here
+        logger.info("Registering event handlers...")
         
         # Handle messages (excluding bot messages)
         @self.app.event("message")
-        def handle_message(event, say, client: WebClient):
+        def handle_message(event, say, client: WebClient, context):
             """Handle incoming messages."""
-            try:
-                # Skip if this is a message_changed or message_deleted event
-                subtype = event.get("subtype")
-                if subtype:
-                    logger.info(f"Skipping message with subtype: {subtype}")
-                    return
-                
-                text = event.get("text", "")
-                user = event.get("user", "")
-                channel = event.get("channel", "")
-                thread_ts = event.get("thread_ts", event.get("ts"))
-                bot_id = event.get("bot_id")
-                
-                logger.info(f"Message received - User: {user}, Bot ID: {bot_id}, Channel: {channel}")
-                
-                # Skip if message is from any bot (including this one)
-                if bot_id:
-                    logger.info(f"Skipping message from bot: {bot_id}")
-                    return
-                
-                # Skip if message is from the bot itself (belt and suspenders)
-                if user and user == bot_user_id:
-                    logger.info("Skipping bot's own message (by user ID)")
-                    return
-                
-                # Skip if no user (some bot messages don't have user field)
-                if not user:
-                    logger.info("Skipping message with no user field")
-                    return
-                
-                # Check if bot is mentioned - if so, skip here as app_mention will handle it
-                is_mention = f"<@{bot_user_id}>" in text
-                if is_mention:
-                    logger.info("Message contains mention - will be handled by app_mention event")
-                    return
-                
-                # Check if this is a reply in an active thread
-                is_active_thread = False
-                if thread_ts and thread_ts != event.get("ts"):
-                    # This is a threaded message
+            bot_user_id = context.bot_user_id
+            with span("slack_event", event_type="message", channel=event.get("channel", "")) as event_span:
+                try:
+                    # Skip if this is a message_changed or message_deleted event
+                    subtype = event.get("subtype")
+                    if subtype:
+                        logger.info(f"Skipping message with subtype: {subtype}")
+                        return
+                    
+                    text = event.get("text", "")
+                    user = event.get("user", "")
+                    channel = event.get("channel", "")
+                    thread_ts = event.get("thread_ts", event.get("ts"))
+                    bot_id = event.get("bot_id")
+                    
+                    logger.info(f"Message received - User: {user}, Bot ID: {bot_id}, Channel: {channel}")
+                    
+                    # Keep cached thread context current, including the bot's own replies
+                    if thread_ts != event.get("ts"):
+                        self.thread_context.record(channel, thread_ts, event)
+                    
+                    # Skip if message is from any bot (including this one)
+                    if bot_id:
+                        logger.info(f"Skipping message from bot: {bot_id}")
+                        return
+                    
+                    # Skip if message is from the bot itself (belt and suspenders)
+                    if user and user == bot_user_id:
+                        logger.info("Skipping bot's own message (by user ID)")
+                        return
+                    
+                    # Skip if no user (some bot messages don't have user field)
+                    if not user:
+                        logger.info("Skipping message with no user field")
+                        return
+                    
+                    # Check if bot is mentioned - if so, skip here as app_mention will handle it
+                    is_mention = f"<@{bot_user_id}>" in text
+                    if is_mention:
+                        logger.info("Message contains mention - will be handled by app_mention event")
+                        return
+                    
+                    # Check if this is a reply in an active thread
+                    is_active_thread = False
+                    if thread_ts and thread_ts != event.get("ts"):
+                        # This is a threaded message
+                        thread_key = f"{channel}:{thread_ts}"
+                        is_active_thread = thread_key in self.active_threads
+                        if is_active_thread:
+                            logger.info(f"Message is in active thread: {thread_key}")
+                    
+                    # Check if agent should respond (pass thread info to avoid unnecessary classification)
+                    should_respond = self.orchestrator.should_respond(text, is_mention, is_active_thread) or is_active_thread
+                    logger.info(f"Agent should respond: {should_respond} for message: '{text[:50]}...' (active_thread: {is_active_thread})")
+                    event_span.set(responded=should_respond)
+                    if not should_respond:
+                        logger.info("Agent decided not to respond to this message")
+                        return
+                    
+                    # Get thread context if enabled
+                    context = None
+                    if Config.ENABLE_THREAD_CONTEXT and thread_ts != event.get("ts"):
+                        context = self.thread_context.get_context(client, channel, thread_ts, exclude_ts=event.get("ts")) or None
+                    
+                    # Add delay to avoid appearing too eager
+                    if Config.RESPONSE_DELAY_SECONDS > 0:
+                        asyncio.run(asyncio.sleep(Config.RESPONSE_DELAY_SECONDS))
+                    
+                    # Get response from agent with thread_id for memory
                     thread_key = f"{channel}:{thread_ts}"
-                    is_active_thread = thread_key in self.active_threads
-                    if is_active_thread:
-                        logger.info(f"Message is in active thread: {thread_key}")
-                
-                # Check if agent should respond (pass thread info to avoid unnecessary classification)
-                should_respond = self.orchestrator.should_respond(text, is_mention, is_active_thread) or is_active_thread
-                logger.info(f"Agent should respond: {should_respond} for message: '{text[:50]}...' (active_thread: {is_active_thread})")
-                if not should_respond:
-                    logger.info("Agent decided not to respond to this message")
-                    return
-                
-                # Get thread context if enabled
-                context = None
-                if Config.ENABLE_THREAD_CONTEXT and thread_ts != event.get("ts"):
-                    try:
-                        result = client.conversations_replies(
-                            channel=channel,
-                            ts=thread_ts,
-                            limit=Config.MAX_CONTEXT_MESSAGES
-                        )
-                        messages = result.get("messages", [])
-                        context = "\n".join([
-                            f"{msg.get('user', 'User')}: {msg.get('text', '')}"
-                            for msg in messages[:-1]  # Exclude current message
-                        ])
-                    except Exception as e:
-                        logger.error(f"Error getting thread context: {e}")
-                
-                # Add delay to avoid appearing too eager
-                if Config.RESPONSE_DELAY_SECONDS > 0:
-                    asyncio.run(asyncio.sleep(Config.RESPONSE_DELAY_SECONDS))
-                
-                # Get response from agent with thread_id for memory
-                thread_key = f"{channel}:{thread_ts}"
-                logger.info("Generating response from agent...")
-                response = self.orchestrator.respond(text, thread_key, context)
-                logger.info(f"Agent response generated: {len(response)} characters")
-                
-                # Send response in thread
-                logger.info(f"Sending response to thread: {thread_ts}")
-                say(
-                    text=response,
-                    thread_ts=thread_ts
-                )
-                logger.info("Response sent successfully")
-                
-                # Mark this thread as active
-                thread_key = f"{channel}:{thread_ts}"
-                self.active_threads.add(thread_key)
-                logger.info(f"Added thread to active threads: {thread_key}")
-                
-            except Exception as e:
-                logger.error(f"Error handling message: {e}")
-                say(
-                    text="Sorry, I encountered an error processing your message.",
-                    thread_ts=thread_ts
-                )
+                    logger.info("Generating response from agent...")
+                    response = self.orchestrator.respond(text, thread_key, context)
+                    logger.info(f"Agent response generated: {len(response)} characters")
+                    
+                    # Send response in thread
+                    logger.info(f"Sending response to thread: {thread_ts}")
+                    say(
+                        text=response,
+                        thread_ts=thread_ts
+                    )
+                    logger.info("Response sent successfully")
+                    
+                    # Mark this thread as active
+                    thread_key = f"{channel}:{thread_ts}"
+                    self.active_threads.add(thread_key)
+                    logger.info(f"Added thread to active threads: {thread_key}")
+                
+                except Exception as e:
+                    logger.error(f"Error handling message: {e}")
+                    event_span.set_error(e)
+                    say(
+                        text="Sorry, I encountered an error processing your message.",
+                        thread_ts=thread_ts
+                    )
         
         # Handle app mentions
         @self.app.event("app_mention")
-        def handle_mention(event, say):
+        def handle_mention(event, say, context):
             """Handle direct mentions."""
-            try:
-                text = event.get("text", "")
-                user = event.get("user", "")
-                thread_ts = event.get("thread_ts", event.get("ts"))
-                
-                logger.info(f"App mention received - User: {user}, Text: {text[:50]}...")
-                
-                # Skip if mention is from the bot itself (shouldn't happen, but just in case)
-                if user == bot_user_id:
-                    logger.info("Skipping bot's own mention")
-                    return
-                
-                # Remove mention from text
-                text = text.replace(f"<@{bot_user_id}>", "").strip()
-                
-                # Get response from agent with thread_id for memory
-                channel = event.get("channel", "")
-                thread_key = f"{channel}:{thread_ts}"
-                logger.info("Generating response for mention...")
-                response = self.orchestrator.respond(text, thread_key)
-                logger.info(f"Mention response generated: {len(response)} characters")
-                
-                # Ensure response is not empty
-                if not response or not response.strip():
-                    logger.warning("Empty response detected, using fallback")
-                    response = "I'm here to help with Kubernetes troubleshooting. How can I assist you?"
-                
-                # Send response in thread
-                logger.info(f"Sending mention response to thread: {thread_ts}")
-                say(
-                    text=response,
-                    thread_ts=thread_ts
-                )
-                logger.info("Mention response sent successfully")
-                
-                # Mark this thread as active
-                channel = event.get("channel", "")
-                thread_key = f"{channel}:{thread_ts}"
-                self.active_threads.add(thread_key)
-                logger.info(f"Added thread to active threads: {thread_key}")
-                
-            except Exception as e:
-                logger.error(f"Error handling mention: {e}")
-                say(
-                    text="Sorry, I encountered an error processing your request.",
-                    thread_ts=thread_ts
-                )
+            bot_user_id = context.bot_user_id
+            with span("slack_event", event_type="app_mention", channel=event.get("channel", "")) as event_span:
+                try:
+                    text = event.get("text", "")
+                    user = event.get("user", "")
+                    thread_ts = event.get("thread_ts", event.get("ts"))
+                    
+                    logger.info(f"App mention received - User: {user}, Text: {text[:50]}...")
+                    
+                    # Skip if mention is from the bot itself (shouldn't happen, but just in case)
+                    if user == bot_user_id:
+                        logger.info("Skipping bot's own mention")
+                        return
+                    
+                    # Remove mention from text
+                    text = text.replace(f"<@{bot_user_id}>", "").strip()
+                    
+                    # Get response from agent with thread_id for memory
+                    channel = event.get("channel", "")
+                    thread_key = f"{channel}:{thread_ts}"
+                    logger.info("Generating response for mention...")
+                    response = self.orchestrator.respond(text, thread_key)
+                    logger.info(f"Mention response generated: {len(response)} characters")
+                    
+                    # Ensure response is not empty
+                    if not response or not response.strip():
+                        logger.warning("Empty response detected, using fallback")
+                        response = "I'm here to help with Kubernetes troubleshooting. How can I assist you?"
+                    
+                    # Send response in thread
+                    logger.info(f"Sending mention response to thread: {thread_ts}")
+                    say(
+                        text=response,
+                        thread_ts=thread_ts
+                    )
+                    logger.info("Mention response sent successfully")
+                    
+                    # Mark this thread as active
+                    channel = event.get("channel", "")
+                    thread_key = f"{channel}:{thread_ts}"
+                    self.active_threads.add(thread_key)
+                    logger.info(f"Added thread to active threads: {thread_key}")
+                
+                except Exception as e:
+                    logger.error(f"Error handling mention: {e}")
+                    event_span.set_error(e)
+                    say(
+                        text="Sorry, I encountered an error processing your request.",
+                        thread_ts=thread_ts
+                    )
     
     def start(self):
         """Start the Slack handler."""
@@ -203,7 +209,10 @@ class SlackHandler:
             # Start socket mode handler
             handler = SocketModeHandler(self.app, Config.SLACK_APP_TOKEN)
             logger.info("Starting Slack handler...")
-            handler.start()
+            handler.connect()
+            readiness.set_ready("slack")
+            # Keep the main thread alive while the socket mode client handles events
+            Event().wait()
         except Exception as e:
             logger.error(f"Error starting Slack handler: {e}")
             raise
@@ -0,0 +1,348 @@
+"""Metrics, tracing and structured logging for the K8s troubleshooting agent."""
+
+import json
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+from strands.hooks import HookProvider, HookRegistry
+
+try:
+    from strands.hooks import AfterToolCallEvent, BeforeToolCallEvent
+except ImportError:  # strands-agents < 1.10 exposes the tool events as experimental
+    from strands.experimental.hooks import (
+        AfterToolInvocationEvent as AfterToolCallEvent,
+        BeforeToolInvocationEvent as BeforeToolCallEvent,
+    )
+
+from src.config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+OPERATION_DURATION = Histogram(
+    "agent_operation_duration_seconds",
+    "Latency of each stage of a Slack troubleshooting run",
+    ["operation", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+TOOL_CALL_DURATION = Histogram(
+    "agent_tool_call_duration_seconds",
+    "Latency of individual agent tool calls",
+    ["agent", "tool", "source", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+BEDROCK_TOKENS = Counter(
+    "agent_bedrock_tokens_total",
+    "Bedrock tokens consumed per agent, by token type",
+    ["agent", "type"],
+)
+PROMPT_CACHE_REQUESTS = Counter(
+    "agent_prompt_cache_requests_total",
+    "Agent invocations that read (hit) or wrote (miss) the Bedrock prompt cache",
+    ["agent", "result"],
+)
+OPERATION_ERRORS = Counter(
+    "agent_operation_errors_total",
+    "Errors raised or reported by each stage",
+    ["operation"],
+)
+
+# Usage keys reported by Strands (Bedrock Converse usage) mapped to the `type` label
+USAGE_TYPES = {
+    "inputTokens": "input",
+    "outputTokens": "output",
+    "cacheReadInputTokens": "cache_read",
+    "cacheWriteInputTokens": "cache_write",
+}
+
+_tracer = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format log records as single-line JSON documents."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in getattr(record, "telemetry", {}).items():
+            entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging() -> None:
+    """Configure root logging according to LOG_LEVEL and LOG_FORMAT."""
+    handler = logging.StreamHandler(sys.stdout)
+    if Config.LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    logging.basicConfig(level=getattr(logging, Config.LOG_LEVEL), handlers=[handler], force=True)
+
+
+def configure_tracing() -> None:
+    """Set up OpenTelemetry tracing with an OTLP exporter when ENABLE_OTEL is set.
+
+    Strands emits its own agent, model and tool spans through the global tracer provider, so
+    they nest under the spans created here.
+    """
+    global _tracer
+    if not Config.ENABLE_OTEL:
+        return
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+        provider = TracerProvider(resource=Resource.create({"service.name": Config.OTEL_SERVICE_NAME}))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        trace.set_tracer_provider(provider)
+        _tracer = trace.get_tracer(__name__)
+        logger.info("OpenTelemetry tracing enabled")
+    except Exception as e:
+        logger.warning(f"Failed to initialize OpenTelemetry tracing: {e}")
+
+
+class Span:
+    """A timed stage of a troubleshooting run."""
+
+    def __init__(self, operation: str, attributes: Dict[str, Any], otel_span=None):
+        self.operation = operation
+        self.attributes = dict(attributes)
+        self.status = "ok"
+        self._otel_span = otel_span
+
+    def set(self, **attributes: Any) -> None:
+        """Add attributes to the span."""
+        self.attributes.update(attributes)
+        if self._otel_span is not None:
+            for key, value in attributes.items():
+                if value is not None:
+                    self._otel_span.set_attribute(key, value if isinstance(value, (str, bool, int, float)) else str(value))
+
+    def set_error(self, error: Any) -> None:
+        """Mark the span as failed, for stages that report errors instead of raising."""
+        self.status = "error"
+        self.set(error=str(error))
+
+
+@contextmanager
+def span(operation: str, **attributes: Any) -> Iterator[Span]:
+    """Time an operation, exporting a histogram sample, a log entry and an optional OTel span."""
+    if _tracer is not None:
+        otel_context = _tracer.start_as_current_span(operation)
+    else:
+        otel_context = _null_context()
+
+    start = time.perf_counter()
+    with otel_context as otel_span:
+        current = Span(operation, attributes, otel_span)
+        if otel_span is not None:
+            current.set(**attributes)
+        try:
+            yield current
+        except Exception as e:
+            current.set_error(e)
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            OPERATION_DURATION.labels(operation=operation, status=current.status).observe(duration)
+            if current.status == "error":
+                OPERATION_ERRORS.labels(operation=operation).inc()
+            logger.info(
+                f"{operation} finished in {duration:.3f}s ({current.status})",
+                extra={"telemetry": {
+                    "operation": operation,
+                    "status": current.status,
+                    "duration_ms": round(duration * 1000, 3),
+                    **current.attributes,
+                }},
+            )
+
+
+@contextmanager
+def _null_context() -> Iterator[None]:
+    yield None
+
+
+def result_usage(result) -> Dict[str, int]:
+    """Return the Bedrock token usage of the invocation that produced a Strands `AgentResult`."""
+    try:
+        return dict(result.metrics.latest_agent_invocation.usage)
+    except AttributeError:
+        return {}
+
+
+def record_token_usage(agent_name: str, usage: Dict[str, int], current: Optional[Span] = None) -> Dict[str, int]:
+    """Record Bedrock token usage (Converse usage keys) for an agent.
+
+    Returns:
+        The token counts keyed by the `type` label values.
+    """
+    counts = {}
+    for key, label in USAGE_TYPES.items():
+        used = max(usage.get(key, 0) or 0, 0)
+        if used > 0:
+            BEDROCK_TOKENS.labels(agent=agent_name, type=label).inc(used)
+        counts[label] = used
+    if counts["cache_read"] > 0:
+        PROMPT_CACHE_REQUESTS.labels(agent=agent_name, result="hit").inc()
+    elif counts["cache_write"] > 0:
+        PROMPT_CACHE_REQUESTS.labels(agent=agent_name, result="miss").inc()
+
+    if current is not None:
+        current.set(**{f"{label}_tokens": value for label, value in counts.items()})
+        cacheable = counts["cache_read"] + counts["cache_write"]
+        if cacheable:
+            current.set(cache_hit_ratio=round(counts["cache_read"] / cacheable, 3))
+    return counts
+
+
+def record_agent_usage(agent_name: str, result, current: Optional[Span] = None) -> Dict[str, int]:
+    """Record the tokens of one Strands agent invocation from its `AgentResult`.
+
+    The result's metrics are shared by the agent, read them before the agent is invoked again.
+    """
+    return record_token_usage(agent_name, result_usage(result), current)
+
+
+class ToolCallTelemetry(HookProvider):
+    """Strands hook provider timing every tool call an agent makes (local and MCP tools)."""
+
+    def __init__(self, agent_name: str):
+        self.agent_name = agent_name
+        self._started: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def register_hooks(self, registry: HookRegistry, **kwargs: Any) -> None:
+        registry.add_callback(BeforeToolCallEvent, self._before_tool_call)
+        registry.add_callback(AfterToolCallEvent, self._after_tool_call)
+
+    def _before_tool_call(self, event) -> None:
+        with self._lock:
+            self._started[event.tool_use["toolUseId"]] = time.perf_counter()
+
+    def _after_tool_call(self, event) -> None:
+        with self._lock:
+            start = self._started.pop(event.tool_use["toolUseId"], None)
+        if start is None:
+            return
+        duration = time.perf_counter() - start
+
+        tool_name = event.tool_use["name"]
+        # Look through wrappers such as the tool result cache
+        selected_tool = getattr(event.selected_tool, "wrapped_tool", event.selected_tool)
+        source = "mcp" if "MCP" in type(selected_tool).__name__ else "local"
+        failed = event.exception is not None or (event.result or {}).get("status") == "error"
+        status = "error" if failed else "ok"
+
+        TOOL_CALL_DURATION.labels(agent=self.agent_name, tool=tool_name, source=source, status=status).observe(duration)
+        logger.info(
+            f"Tool {tool_name} finished in {duration:.3f}s ({status})",
+            extra={"telemetry": {
+                "operation": "tool_call",
+                "agent": self.agent_name,
+                "tool": tool_name,
+                "source": source,
+                "status": status,
+                "duration_ms": round(duration * 1000, 3),
+            }},
+        )
+
+
+class Readiness:
+    """Tracks the components that must be initialized before the agent can serve Slack events."""
+
+    def __init__(self):
+        self._components: Dict[str, bool] = {}
+        self._failed: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def require(self, *components: str) -> None:
+        """Declare components that are not ready yet."""
+        with self._lock:
+            for component in components:
+                self._components.setdefault(component, False)
+
+    def set_ready(self, component: str, ready: bool = True) -> None:
+        with self._lock:
+            self._components[component] = ready
+        logger.info(f"Component {component} {'ready' if ready else 'not ready'}")
+
+    def set_failed(self, component: str, error: str) -> None:
+        """Report a component that cannot be initialized, failing the liveness probe so the pod restarts."""
+        with self._lock:
+            self._components[component] = False
+            self._failed[component] = error
+        logger.error(f"Component {component} failed: {error}")
+
+    def failed(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._failed)
+
+    def status(self) -> Dict[str, bool]:
+        with self._lock:
+            return dict(self._components)
+
+    def is_ready(self) -> bool:
+        return all(self.status().values())
+
+
+readiness = Readiness()
+
+
+class _TelemetryRequestHandler(BaseHTTPRequestHandler):
+    """Serve the Prometheus metrics endpoint and the liveness and readiness probes."""
+
+    def do_GET(self) -> None:
+        path = self.path.split("?")[0]
+        if path == "/metrics":
+            self._respond(200, generate_latest(), CONTENT_TYPE_LATEST)
+        elif path == "/healthz":
+            # Liveness only needs the process to be serving requests, unless a component gave up
+            failed = readiness.failed()
+            if failed:
+                self._respond(503, json.dumps({"failed": failed}).encode("utf-8"), "application/json")
+            else:
+                self._respond(200, b"ok\n", "text/plain")
+        elif path == "/readyz":
+            status = readiness.status()
+            body = json.dumps({"ready": all(status.values()), "components": status}).encode("utf-8")
+            self._respond(200 if all(status.values()) else 503, body, "application/json")
+        else:
+            self._respond(404, b"Not found\n", "text/plain")
+
+    def _respond(self, code: int, body: bytes, content_type: str) -> None:
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Scrapes are too frequent for the access log
+        pass
+
+
+def start_metrics_server() -> ThreadingHTTPServer:
+    """Serve /metrics, /healthz and /readyz on METRICS_PORT from a background thread."""
+    server = ThreadingHTTPServer(("0.0.0.0", Config.METRICS_PORT), _TelemetryRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    logger.info(f"Metrics endpoint listening on :{Config.METRICS_PORT}/metrics")
+    return server
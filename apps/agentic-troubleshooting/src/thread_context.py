@@ -0,0 +1,145 @@
+"""Per-thread cache of Slack thread messages used as conversation context."""
+
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Optional
+
+from prometheus_client import Counter
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+
+from src.config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+# Messages per conversations.replies page, the API maximum
+PAGE_SIZE = 200
+
+THREAD_CONTEXT_REQUESTS = Counter(
+    "agent_thread_context_requests_total",
+    "Thread context lookups, by how they were served (cached, incremental, full, rate_limited)",
+    ["result"],
+)
+
+
+class ThreadMessages:
+    """The most recent messages of one thread."""
+
+    def __init__(self, max_messages: int):
+        self.messages: deque = deque(maxlen=max_messages)
+        self.latest_ts = "0"
+        self.synced_at = 0.0
+
+    def add(self, message: Dict[str, Any]) -> None:
+        ts = message.get("ts", "0")
+        # Slack timestamps are fixed-width decimal strings of the same magnitude, so they sort as floats
+        if float(ts) <= float(self.latest_ts):
+            return
+        self.messages.append((ts, message.get("user", "User"), message.get("text", "")))
+        self.latest_ts = ts
+
+
+class ThreadContextCache:
+    """Keeps the last MAX_CONTEXT_MESSAGES messages of recent threads.
+
+    Threads are filled from the message events the bot already receives and only fetched from
+    Slack when they are first seen or were not synced for THREAD_CONTEXT_REFRESH_SECONDS, and then
+    only the messages newer than the last one seen. While Slack rate-limits conversations.replies,
+    the cached messages are served until the Retry-After delay has passed.
+    """
+
+    def __init__(self, max_messages: int = None, max_threads: int = None, refresh_seconds: float = None):
+        self.max_messages = max_messages or Config.MAX_CONTEXT_MESSAGES
+        self.max_threads = max_threads or Config.THREAD_CONTEXT_MAX_THREADS
+        self.refresh_seconds = refresh_seconds if refresh_seconds is not None else Config.THREAD_CONTEXT_REFRESH_SECONDS
+        self._threads: "OrderedDict[str, ThreadMessages]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._rate_limited_until = 0.0
+
+    def record(self, channel: str, thread_ts: str, message: Dict[str, Any]) -> None:
+        """Add a message event to its thread, if the thread is cached."""
+        with self._lock:
+            thread = self._threads.get(f"{channel}:{thread_ts}")
+            if thread is not None:
+                thread.add(message)
+
+    def get_context(self, client: WebClient, channel: str, thread_ts: str, exclude_ts: Optional[str] = None) -> str:
+        """Return the recent messages of a thread as `user: text` lines.
+
+        Args:
+            client: The Slack client.
+            channel: The channel ID.
+            thread_ts: The timestamp of the thread's parent message.
+            exclude_ts: The timestamp of the message being answered, left out of the context.
+        """
+        key = f"{channel}:{thread_ts}"
+        with self._lock:
+            thread = self._threads.get(key)
+            if thread is None:
+                thread = ThreadMessages(self.max_messages)
+                self._threads[key] = thread
+                while len(self._threads) > self.max_threads:
+                    self._threads.popitem(last=False)
+            else:
+                self._threads.move_to_end(key)
+            # A message event arriving first must not hide the older history from the fetch
+            full = thread.synced_at == 0.0
+            needs_sync = full or time.monotonic() - thread.synced_at > self.refresh_seconds
+            rate_limited = time.monotonic() < self._rate_limited_until
+
+        if needs_sync and rate_limited:
+            result = "rate_limited"
+        elif needs_sync:
+            result = "full" if full else "incremental"
+            self._fetch(client, channel, thread_ts, thread, full)
+        else:
+            result = "cached"
+        THREAD_CONTEXT_REQUESTS.labels(result=result).inc()
+
+        with self._lock:
+            messages = list(thread.messages)
+        return "\n".join(f"{user}: {text}" for ts, user, text in messages if ts != exclude_ts)
+
+    def _fetch(self, client: WebClient, channel: str, thread_ts: str, thread: ThreadMessages, full: bool) -> None:
+        """Fetch the thread messages newer than the last one seen, following pagination."""
+        oldest = "0" if full else thread.latest_ts
+        cursor = None
+        fetched = []
+        complete = False
+        try:
+            while True:
+                response = client.conversations_replies(
+                    channel=channel,
+                    ts=thread_ts,
+                    oldest=oldest,
+                    inclusive=False,
+                    limit=PAGE_SIZE,
+                    cursor=cursor,
+                )
+                fetched.extend(response.get("messages", []))
+                cursor = (response.get("response_metadata") or {}).get("next_cursor")
+                if not cursor:
+                    complete = True
+                    break
+        except SlackApiError as e:
+            if e.response.status_code == 429:
+                retry_after = float(e.response.headers.get("Retry-After", 1))
+                with self._lock:
+                    self._rate_limited_until = time.monotonic() + retry_after
+                logger.warning(f"conversations.replies rate limited, serving cached thread context for {retry_after:.0f}s")
+            else:
+                logger.error(f"Error getting thread context: {e}")
+        except Exception as e:
+            logger.error(f"Error getting thread context: {e}")
+        with self._lock:
+            if full and fetched:
+                thread.messages.clear()
+                thread.latest_ts = "0"
+            # Pages come oldest first and the parent message is returned with every page
+            for message in sorted(fetched, key=lambda m: float(m.get("ts", "0"))):
+                thread.add(message)
+            # After a failure the next lookup fetches again
+            if complete:
+                thread.synced_at = time.monotonic()
@@ -0,0 +1,349 @@
+"""Supervised pool of EKS MCP server sessions."""
+
+import asyncio
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import boto3
+from mcp import StdioServerParameters, stdio_client
+from prometheus_client import Counter, Gauge
+from strands.tools.mcp import MCPClient
+from strands.types.tools import AgentTool, ToolSpec, ToolUse
+
+from src.config.settings import Config
+
+try:
+    from strands.types._events import ToolResultEvent
+except ImportError:  # strands-agents < 1.8 expects tools to yield the result itself
+    ToolResultEvent = None
+
+logger = logging.getLogger(__name__)
+
+# Restart sessions this long before their copied credentials expire
+CREDENTIAL_EXPIRY_MARGIN_SECONDS = 300
+
+MCP_SESSIONS = Gauge(
+    "agent_mcp_sessions",
+    "EKS MCP server sessions in the pool, by state",
+    ["state"],
+)
+MCP_IN_FLIGHT = Gauge(
+    "agent_mcp_calls_in_flight",
+    "EKS MCP tool calls currently running",
+)
+MCP_RESTARTS = Counter(
+    "agent_mcp_session_restarts_total",
+    "EKS MCP server sessions restarted by the pool supervisor",
+    ["reason"],
+)
+
+
+def mcp_server_command() -> tuple:
+    """Return the command and base arguments starting the EKS MCP server.
+
+    The container image pre-installs the pinned server with `uv tool install`, so it starts
+    without resolving or downloading anything. Elsewhere uvx runs the same pinned version.
+    """
+    executable = shutil.which("awslabs.eks-mcp-server")
+    if executable:
+        command, args = executable, []
+    else:
+        command, args = "uvx", [f"awslabs.eks-mcp-server@{Config.EKS_MCP_SERVER_VERSION}"]
+    args.append("--allow-sensitive-data-access")
+    if Config.EKS_MCP_ALLOW_WRITE:
+        args.append("--allow-write")
+    return command, args
+
+
+def mcp_server_env() -> tuple:
+    """Build the MCP server environment with the current AWS credentials.
+
+    Returns:
+        The environment and the expiry time (epoch seconds) of the copied credentials, or None
+        when they do not expire.
+    """
+    env_vars = {
+        "AWS_REGION": Config.AWS_REGION,
+        "FASTMCP_LOG_LEVEL": "ERROR",
+        # Use kubeconfig created by init container
+        "KUBECONFIG": "/shared/kubeconfig",
+    }
+    expires_at = None
+
+    # Get AWS credentials from the current session (Pod Identity)
+    credentials = boto3.Session().get_credentials()
+    if credentials:
+        expiry = getattr(credentials, "_expiry_time", None)
+        if expiry is not None:
+            expires_at = expiry.timestamp()
+        frozen = credentials.get_frozen_credentials()
+        env_vars["AWS_ACCESS_KEY_ID"] = frozen.access_key
+        env_vars["AWS_SECRET_ACCESS_KEY"] = frozen.secret_key
+        if frozen.token:
+            env_vars["AWS_SESSION_TOKEN"] = frozen.token
+    else:
+        # Fallback to environment credentials
+        for key in ["AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_SESSION_TOKEN", "AWS_PROFILE"]:
+            if key in os.environ:
+                env_vars[key] = os.environ[key]
+    return env_vars, expires_at
+
+
+class McpSession:
+    """One EKS MCP server subprocess and its stdio client."""
+
+    def __init__(self, session_id: int):
+        self.session_id = session_id
+        self.client: Optional[MCPClient] = None
+        self.started_at = 0.0
+        self.credentials_expire_at: Optional[float] = None
+        self.in_flight = 0
+        self.accepting = False
+        self.restarting = False
+
+    def start(self) -> list:
+        """Start the server subprocess and return its tools."""
+        env_vars, self.credentials_expire_at = mcp_server_env()
+        command, args = mcp_server_command()
+        self.client = MCPClient(lambda: stdio_client(
+            StdioServerParameters(command=command, args=args, env=env_vars)
+        ))
+        self.client.__enter__()
+        self.started_at = time.monotonic()
+        tools = self.client.list_tools_sync()
+        self.accepting = True
+        return tools
+
+    def stop(self) -> None:
+        self.accepting = False
+        if self.client is not None:
+            try:
+                self.client.__exit__(None, None, None)
+            except Exception as e:
+                logger.debug(f"Error stopping MCP session {self.session_id}: {e}")
+            self.client = None
+
+    def ping(self) -> bool:
+        """Liveness check: a round trip to the server."""
+        try:
+            self.client.list_tools_sync()
+            return True
+        except Exception as e:
+            logger.warning(f"MCP session {self.session_id} failed its health check: {e}")
+            return False
+
+    def needs_refresh(self) -> Optional[str]:
+        """Return why the session should be recycled, if it should."""
+        if self.credentials_expire_at is not None and time.time() > self.credentials_expire_at - CREDENTIAL_EXPIRY_MARGIN_SECONDS:
+            return "credentials"
+        if time.monotonic() - self.started_at > Config.EKS_MCP_MAX_SESSION_AGE_SECONDS:
+            return "max_age"
+        return None
+
+
+class McpSessionPool:
+    """A supervised pool of EKS MCP server sessions.
+
+    Tool calls go to the least busy healthy session, each session runs at most
+    EKS_MCP_SESSION_CONCURRENCY calls at once, and a supervisor thread pings idle sessions,
+    restarts dead ones and recycles sessions before their copied AWS credentials expire.
+    """
+
+    def __init__(self, size: int = None, session_concurrency: int = None):
+        self.size = size or Config.EKS_MCP_POOL_SIZE
+        self.session_concurrency = session_concurrency or Config.EKS_MCP_SESSION_CONCURRENCY
+        self._sessions: List[McpSession] = []
+        self._condition = threading.Condition()
+        self._next_id = 0
+        self._starting = 0
+        self._closed = threading.Event()
+        self._supervisor: Optional[threading.Thread] = None
+
+    def start(self) -> List[AgentTool]:
+        """Start the first session synchronously to discover the tools, the others in the background.
+
+        Returns:
+            Pooled wrappers of the EKS MCP tools.
+        """
+        first = self._new_session()
+        tools = first.start()
+        with self._condition:
+            self._sessions.append(first)
+        self._update_gauges()
+
+        for _ in range(self.size - 1):
+            threading.Thread(target=self._add_session, name="mcp-session-start", daemon=True).start()
+        self._supervisor = threading.Thread(target=self._supervise, name="mcp-supervisor", daemon=True)
+        self._supervisor.start()
+        return [PooledMCPTool(self, tool.tool_spec) for tool in tools]
+
+    def close(self) -> None:
+        self._closed.set()
+        with self._condition:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.stop()
+        self._update_gauges()
+
+    def _new_session(self) -> McpSession:
+        with self._condition:
+            self._next_id += 1
+            return McpSession(self._next_id)
+
+    def _add_session(self) -> None:
+        session = self._new_session()
+        with self._condition:
+            self._starting += 1
+        try:
+            session.start()
+        except Exception as e:
+            logger.warning(f"Failed to start MCP session {session.session_id}: {e}")
+            session.stop()
+            return
+        finally:
+            with self._condition:
+                self._starting -= 1
+        with self._condition:
+            if self._closed.is_set():
+                session.stop()
+                return
+            self._sessions.append(session)
+            self._condition.notify_all()
+        self._update_gauges()
+        logger.info(f"MCP session {session.session_id} started")
+
+    @contextmanager
+    def session(self, timeout: float = None) -> Iterator[McpSession]:
+        """Check out the least busy session that has a free slot.
+
+        Raises:
+            TimeoutError: When no session slot frees up within `timeout` seconds.
+        """
+        deadline = time.monotonic() + (timeout if timeout is not None else Config.EKS_MCP_ACQUIRE_TIMEOUT_SECONDS)
+        with self._condition:
+            while True:
+                available = [s for s in self._sessions if s.accepting and s.in_flight < self.session_concurrency]
+                if available:
+                    session = min(available, key=lambda s: s.in_flight)
+                    session.in_flight += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._closed.is_set():
+                    raise TimeoutError("No EKS MCP session available")
+                self._condition.wait(remaining)
+        MCP_IN_FLIGHT.inc()
+        try:
+            yield session
+        finally:
+            with self._condition:
+                session.in_flight -= 1
+                self._condition.notify_all()
+            MCP_IN_FLIGHT.dec()
+
+    def call_tool(self, tool_use_id: str, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Call an MCP tool, retrying once on another session if the session turns out to be dead."""
+        result = None
+        for attempt in range(2):
+            with self.session() as session:
+                result = session.client.call_tool_sync(
+                    tool_use_id=tool_use_id,
+                    name=name,
+                    arguments=arguments,
+                    read_timeout_seconds=Config.EKS_MCP_CALL_TIMEOUT_SECONDS,
+                )
+                # Strands reports transport failures as error results, so check the session is alive
+                if result.get("status") != "error" or session.ping():
+                    return result
+            self._restart_in_background(session, reason="dead")
+        return result
+
+    def _restart_in_background(self, session: McpSession, reason: str) -> None:
+        with self._condition:
+            if session.restarting:
+                return
+            session.restarting = True
+            session.accepting = False
+        threading.Thread(target=self._restart, args=(session, reason), name="mcp-session-restart", daemon=True).start()
+
+    def _restart(self, session: McpSession, reason: str) -> None:
+        """Replace a session with a fresh one, waiting for its in-flight calls to finish first."""
+        with self._condition:
+            if session not in self._sessions:
+                return
+            session.restarting = True
+            session.accepting = False
+        self._update_gauges()
+        MCP_RESTARTS.labels(reason=reason).inc()
+        logger.info(f"Restarting MCP session {session.session_id} ({reason})")
+        self._add_session()
+        with self._condition:
+            self._condition.wait_for(lambda: session.in_flight == 0, timeout=Config.EKS_MCP_CALL_TIMEOUT_SECONDS)
+            if session in self._sessions:
+                self._sessions.remove(session)
+        session.stop()
+        self._update_gauges()
+
+    def _supervise(self) -> None:
+        while not self._closed.wait(Config.EKS_MCP_HEALTH_INTERVAL_SECONDS):
+            with self._condition:
+                sessions = list(self._sessions)
+            for session in sessions:
+                if session.restarting:
+                    continue
+                reason = session.needs_refresh()
+                if reason is None and session.in_flight == 0 and not session.ping():
+                    reason = "dead"
+                if reason is not None:
+                    self._restart(session, reason)
+            # Top the pool up after failed starts
+            with self._condition:
+                missing = self.size - len(self._sessions) - self._starting
+            for _ in range(missing):
+                self._add_session()
+
+    def _update_gauges(self) -> None:
+        with self._condition:
+            healthy = sum(1 for s in self._sessions if s.accepting)
+            total = len(self._sessions)
+        MCP_SESSIONS.labels(state="healthy").set(healthy)
+        MCP_SESSIONS.labels(state="draining").set(total - healthy)
+
+
+class PooledMCPTool(AgentTool):
+    """An EKS MCP tool whose calls go through the session pool."""
+
+    def __init__(self, pool: McpSessionPool, tool_spec: ToolSpec):
+        super().__init__()
+        self._pool = pool
+        self._tool_spec = tool_spec
+
+    @property
+    def tool_name(self) -> str:
+        return self._tool_spec["name"]
+
+    @property
+    def tool_spec(self) -> ToolSpec:
+        return self._tool_spec
+
+    @property
+    def tool_type(self) -> str:
+        return "python"
+
+    async def stream(self, tool_use: ToolUse, invocation_state: Dict[str, Any], **kwargs: Any):
+        try:
+            result = await asyncio.to_thread(
+                self._pool.call_tool, tool_use["toolUseId"], self.tool_name, tool_use["input"]
+            )
+        except Exception as e:
+            logger.error(f"EKS MCP tool {self.tool_name} failed: {e}")
+            result = {
+                "toolUseId": tool_use["toolUseId"],
+                "status": "error",
+                "content": [{"text": f"EKS MCP tool {self.tool_name} failed: {e}"}],
+            }
+        yield ToolResultEvent(result) if ToolResultEvent is not None else result
@@ -0,0 +1,163 @@
+"""Per-investigation memoization of read-only tool results."""
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from prometheus_client import Counter
+from strands.types.tools import AgentTool, ToolSpec, ToolUse
+
+from src.config.settings import Config
+
+try:
+    from strands.types._events import ToolResultEvent
+except ImportError:  # strands-agents < 1.8 expects tools to yield the result itself
+    ToolResultEvent = None
+
+logger = logging.getLogger(__name__)
+
+# Tools whose results only change with cluster state; anything else (manage_*, apply_yaml, ...)
+# is treated as a write, is never cached and invalidates the cache
+READ_ONLY_PREFIXES = ("get_", "list_", "describe_", "search_")
+
+# Default TTLs in seconds, pod state and logs change faster than events or guides
+DEFAULT_TOOL_TTLS = {
+    "get_pods": 15,
+    "describe_pod": 30,
+    "list_k8s_resources": 15,
+    "get_pod_logs": 10,
+    "get_k8s_events": 15,
+    "search_eks_troubleshoot_guide": 300,
+}
+
+# The `invocation_state` key of the cache of the current investigation, each agent invocation
+# gets its own so concurrent investigations never share results
+INVOCATION_STATE_KEY = "tool_result_cache"
+
+TOOL_CACHE_REQUESTS = Counter(
+    "agent_tool_cache_requests_total",
+    "Tool calls answered from (hit) or added to (miss) the per-investigation cache",
+    ["tool", "result"],
+)
+
+
+def normalize_arguments(arguments: Any) -> Any:
+    """Normalize tool arguments so equivalent calls share a cache key."""
+    if isinstance(arguments, dict):
+        return {key: normalize_arguments(value) for key, value in sorted(arguments.items()) if value not in (None, "", [], {})}
+    if isinstance(arguments, list):
+        return [normalize_arguments(value) for value in arguments]
+    if isinstance(arguments, str):
+        return arguments.strip()
+    return arguments
+
+
+class ToolResultCache:
+    """Results of read-only tool calls for the current investigation."""
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], Tuple[float, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._ttls = {**DEFAULT_TOOL_TTLS, **Config.TOOL_CACHE_TTLS}
+
+    def ttl(self, tool_name: str) -> float:
+        """Return the TTL of a tool, 0 for tools that must not be cached."""
+        if tool_name in self._ttls:
+            return self._ttls[tool_name]
+        if tool_name.startswith(READ_ONLY_PREFIXES):
+            return Config.TOOL_CACHE_DEFAULT_TTL_SECONDS
+        return 0
+
+    @staticmethod
+    def key(tool_name: str, arguments: Any) -> Tuple[str, str]:
+        return tool_name, json.dumps(normalize_arguments(arguments), sort_keys=True, default=str)
+
+    def get(self, key: Tuple[str, str], ttl: float) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """Return `(age, result)` of a fresh entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            age = time.monotonic() - entry[0]
+            if age > ttl:
+                del self._entries[key]
+                return None
+            return age, entry[1]
+
+    def put(self, key: Tuple[str, str], result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), result)
+
+    def clear(self) -> None:
+        """Forget results after a write."""
+        with self._lock:
+            self._entries.clear()
+
+
+class CachedTool(AgentTool):
+    """Wrap a Strands tool so identical read-only calls within an investigation reuse the result.
+
+    The cache is taken from the `invocation_state` of the agent invocation, under
+    `INVOCATION_STATE_KEY`; without one the tool is called directly.
+    """
+
+    def __init__(self, tool: AgentTool):
+        super().__init__()
+        self.wrapped_tool = tool
+
+    @property
+    def tool_name(self) -> str:
+        return self.wrapped_tool.tool_name
+
+    @property
+    def tool_spec(self) -> ToolSpec:
+        return self.wrapped_tool.tool_spec
+
+    @property
+    def tool_type(self) -> str:
+        return self.wrapped_tool.tool_type
+
+    async def stream(self, tool_use: ToolUse, invocation_state: Dict[str, Any], **kwargs: Any):
+        cache = (invocation_state or {}).get(INVOCATION_STATE_KEY)
+        ttl = cache.ttl(self.tool_name) if cache is not None else 0
+        if ttl <= 0:
+            if cache is not None:
+                # A write may change what read tools return
+                cache.clear()
+            async for event in self.wrapped_tool.stream(tool_use, invocation_state, **kwargs):
+                yield event
+            return
+
+        key = cache.key(self.tool_name, tool_use.get("input"))
+        cached = cache.get(key, ttl)
+        if cached is not None:
+            age, result = cached
+            TOOL_CACHE_REQUESTS.labels(tool=self.tool_name, result="hit").inc()
+            logger.info(f"Tool {self.tool_name} answered from cache ({age:.0f}s old)")
+            repeat = {
+                "toolUseId": tool_use["toolUseId"],
+                "status": result["status"],
+                "content": [{"text": f"[Repeated call: {self.tool_name} was already called with these "
+                                     f"arguments {age:.0f}s ago in this investigation, same result below]"}]
+                           + list(result["content"]),
+            }
+            yield ToolResultEvent(repeat) if ToolResultEvent is not None else repeat
+            return
+
+        async for event in self.wrapped_tool.stream(tool_use, invocation_state, **kwargs):
+            result = _tool_result(event)
+            if result is not None and result.get("status") == "success":
+                TOOL_CACHE_REQUESTS.labels(tool=self.tool_name, result="miss").inc()
+                cache.put(key, result)
+            yield event
+
+
+def _tool_result(event: Any) -> Optional[Dict[str, Any]]:
+    """Return the tool result carried by a tool stream event, if it is the final one."""
+    if ToolResultEvent is not None and isinstance(event, ToolResultEvent):
+        return event["tool_result"]
+    if isinstance(event, dict) and "toolUseId" in event and "status" in event:
+        return event
+    return None
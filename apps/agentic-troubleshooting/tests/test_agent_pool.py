@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+from src.agents.agent_pool import AgentBusyError, AgentPool
+
+
+def pool(size=2, factory=None):
+    return AgentPool("test", factory or object, size=size, acquire_timeout=0.05)
+
+
+def test_concurrent_requests_get_their_own_agents():
+    agents = pool(size=2)
+    with agents.agent() as first, agents.agent() as second:
+        assert first is not second
+
+
+def test_idle_agents_are_reused():
+    built = []
+    agents = pool(size=2, factory=lambda: built.append(object()) or built[-1])
+    with agents.agent() as first:
+        pass
+    with agents.agent() as second:
+        assert second is first
+    assert len(built) == 1
+
+
+def test_a_full_pool_rejects_after_the_timeout():
+    agents = pool(size=1)
+    with agents.agent():
+        with pytest.raises(AgentBusyError):
+            with agents.agent():
+                pass
+
+
+def test_a_waiting_request_gets_the_released_agent():
+    agents = AgentPool("test", object, size=1, acquire_timeout=5)
+    checked_out = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with agents.agent():
+            checked_out.set()
+            release.wait()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    checked_out.wait()
+    threading.Timer(0.05, release.set).start()
+    with agents.agent() as agent:
+        assert agent is not None
+    holder.join()
+
+
+def test_a_failed_build_frees_its_slot():
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("model unavailable")
+        return object()
+
+    agents = pool(size=1, factory=factory)
+    with pytest.raises(RuntimeError):
+        with agents.agent():
+            pass
+    with agents.agent() as agent:
+        assert agent is not None
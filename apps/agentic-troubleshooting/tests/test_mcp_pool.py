@@ -0,0 +1,112 @@
+import time
+import types
+
+import pytest
+
+from src.tools import mcp_pool
+from src.tools.mcp_pool import McpSessionPool, PooledMCPTool
+
+
+class FakeMCPClient:
+    """Stands in for strands' MCPClient, one per server subprocess."""
+
+    instances = []
+
+    def __init__(self, transport):
+        self.alive = True
+        self.calls = []
+        self.stopped = False
+        FakeMCPClient.instances.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped = True
+
+    def list_tools_sync(self):
+        if not self.alive:
+            raise ConnectionError("server exited")
+        return [types.SimpleNamespace(tool_spec={"name": "list_k8s_resources", "description": "", "inputSchema": {"json": {}}})]
+
+    def call_tool_sync(self, tool_use_id, name, arguments, read_timeout_seconds=None):
+        self.calls.append(name)
+        if not self.alive:
+            return {"toolUseId": tool_use_id, "status": "error", "content": [{"text": "connection closed"}]}
+        return {"toolUseId": tool_use_id, "status": "success", "content": [{"text": f"{name} ok"}]}
+
+
+@pytest.fixture(autouse=True)
+def fake_server(monkeypatch):
+    FakeMCPClient.instances = []
+    monkeypatch.setattr(mcp_pool, "MCPClient", FakeMCPClient)
+    monkeypatch.setattr(mcp_pool, "mcp_server_env", lambda: ({}, None))
+    monkeypatch.setattr(mcp_pool, "mcp_server_command", lambda: ("eks-mcp-server", []))
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def started_pool(size=2, session_concurrency=1):
+    pool = McpSessionPool(size=size, session_concurrency=session_concurrency)
+    tools = pool.start()
+    wait_for(lambda: len(pool._sessions) == size)
+    return pool, tools
+
+
+def test_start_wraps_the_tools_and_fills_the_pool():
+    pool, tools = started_pool(size=3)
+    try:
+        assert [tool.tool_name for tool in tools] == ["list_k8s_resources"]
+        assert isinstance(tools[0], PooledMCPTool)
+        assert len(FakeMCPClient.instances) == 3
+    finally:
+        pool.close()
+    assert all(client.stopped for client in FakeMCPClient.instances)
+
+
+def test_checkout_spreads_calls_and_times_out_when_every_slot_is_busy():
+    pool, _ = started_pool(size=2, session_concurrency=1)
+    try:
+        with pool.session() as first, pool.session() as second:
+            assert first is not second
+            with pytest.raises(TimeoutError):
+                with pool.session(timeout=0.05):
+                    pass
+        with pool.session(timeout=0.05) as session:
+            assert session.in_flight == 1
+    finally:
+        pool.close()
+
+
+def test_a_call_on_a_dead_session_is_retried_on_another_one_and_the_session_restarted():
+    pool, _ = started_pool(size=2, session_concurrency=4)
+    try:
+        dead = pool._sessions[0]
+        dead_client = dead.client
+        dead_client.alive = False
+        # The least busy session is the first one, it fails and the call moves on
+        result = pool.call_tool("call-1", "list_k8s_resources", {})
+        assert result["status"] == "success"
+        assert dead_client.calls == ["list_k8s_resources"]
+        wait_for(lambda: dead not in pool._sessions and len(pool._sessions) == 2)
+        assert dead_client.stopped
+    finally:
+        pool.close()
+
+
+def test_a_session_is_recycled_before_its_credentials_expire():
+    pool, _ = started_pool(size=1)
+    try:
+        session = pool._sessions[0]
+        session.credentials_expire_at = time.time() + 60
+        assert session.needs_refresh() == "credentials"
+        pool._restart(session, reason="credentials")
+        assert session not in pool._sessions and len(pool._sessions) == 1
+        assert pool._sessions[0].needs_refresh() is None
+    finally:
+        pool.close()
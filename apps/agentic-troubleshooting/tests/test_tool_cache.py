@@ -0,0 +1,74 @@
+import asyncio
+
+from strands import tool
+
+from src.tools.tool_cache import INVOCATION_STATE_KEY, CachedTool, ToolResultCache, normalize_arguments
+
+calls = []
+
+
+@tool
+def get_pods(namespace: str) -> str:
+    """List the pods of a namespace."""
+    calls.append(("get_pods", namespace))
+    return f"pods of {namespace} #{len(calls)}"
+
+
+@tool
+def manage_deployment(name: str) -> str:
+    """Restart a deployment."""
+    calls.append(("manage_deployment", name))
+    return f"restarted {name}"
+
+
+def call(cached_tool, arguments, invocation_state):
+    async def run():
+        result = None
+        async for event in cached_tool.stream(
+            {"toolUseId": f"call-{len(calls)}", "name": cached_tool.tool_name, "input": arguments},
+            invocation_state,
+        ):
+            result = event
+        return result
+    result = asyncio.run(run())
+    result = result.get("tool_result", result)
+    return " ".join(block["text"] for block in result["content"])
+
+
+def investigation():
+    return {INVOCATION_STATE_KEY: ToolResultCache()}
+
+
+def test_equivalent_arguments_share_a_key():
+    assert normalize_arguments({"b": " x ", "a": None, "c": []}) == {"b": "x"}
+    assert ToolResultCache.key("get_pods", {"namespace": "default "}) == ToolResultCache.key("get_pods", {"namespace": "default"})
+
+
+def test_repeated_read_calls_reuse_the_result_within_an_investigation():
+    calls.clear()
+    pods = CachedTool(get_pods)
+    state = investigation()
+    first = call(pods, {"namespace": "default"}, state)
+    repeat = call(pods, {"namespace": "default"}, state)
+    assert len(calls) == 1
+    assert repeat.startswith("[Repeated call") and first in repeat
+
+
+def test_investigations_do_not_share_results():
+    calls.clear()
+    pods = CachedTool(get_pods)
+    call(pods, {"namespace": "default"}, investigation())
+    call(pods, {"namespace": "default"}, investigation())
+    call(pods, {"namespace": "default"}, {})
+    assert len(calls) == 3
+
+
+def test_writes_are_not_cached_and_clear_the_cache():
+    calls.clear()
+    pods, deployments = CachedTool(get_pods), CachedTool(manage_deployment)
+    state = investigation()
+    call(pods, {"namespace": "default"}, state)
+    call(deployments, {"name": "web"}, state)
+    call(deployments, {"name": "web"}, state)
+    call(pods, {"namespace": "default"}, state)
+    assert [name for name, _ in calls] == ["get_pods", "manage_deployment", "manage_deployment", "get_pods"]
@@ -1,45 +1,223 @@
+import asyncio
 import gradio as gr
+import os
+from datetime import datetime, timezone
 from utils.logger import logger
 from clients.llm_client import encode_query, construct_prompt
 from clients.opensearch_client import OpenSearchClient
-from clients.kubernetes_client import generate_response_with_kubectl
+from clients.context_builder import truncate_middle
+from clients.kubernetes_client import TOOL_CALLING, generate_response_with_kubectl
+from clients.prefetch import KubectlPrefetcher, extract_references
+from clients.model_router import ModelRequestError, ModelRouterError, model_router
+from clients.response_cache import ResponseCache
+from clients.session_store import SessionStore
+from utils.resilience import DependencyUnavailableError
+from utils.tracing import trace_request, start_metrics_server
 
 opensearch_client = OpenSearchClient()
+response_cache = ResponseCache()
+session_store = SessionStore()
+
+# Top issues of the current day cover the last N minutes, those of past days the whole day
+TOP_ISSUES_WINDOW_MINUTES = int(os.getenv("TOP_ISSUES_WINDOW_MINUTES", "60"))
+
+# Longest wait for pre-fetched kubectl output before the first model call, later results are
+# still reused if the model asks for the same commands
+PREFETCH_WAIT_SECONDS = float(os.getenv("PREFETCH_WAIT_SECONDS", "2"))
+
+# Chat mode: follow-ups this similar to an earlier question of the session reuse its retrieved logs,
+# kubectl output is reused for CHAT_KUBECTL_MAX_AGE_SECONDS, and once the history passes
+# CHAT_HISTORY_TOKEN_BUDGET all but the last CHAT_KEEP_TURNS turns are summarized
+CHAT_REUSE_SIMILARITY = float(os.getenv("CHAT_REUSE_SIMILARITY", "0.85"))
+CHAT_KUBECTL_MAX_AGE_SECONDS = float(os.getenv("CHAT_KUBECTL_MAX_AGE_SECONDS", "120"))
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "2000"))
+CHAT_KEEP_TURNS = int(os.getenv("CHAT_KEEP_TURNS", "2"))
+
+# Queries handled concurrently by one replica, they wait on I/O in the event loop instead of holding a thread
+GRADIO_CONCURRENCY_LIMIT = int(os.getenv("GRADIO_CONCURRENCY_LIMIT", "64"))
+# Queries waiting beyond the concurrency limit before new ones are rejected
+GRADIO_MAX_QUEUE_SIZE = int(os.getenv("GRADIO_MAX_QUEUE_SIZE", "256"))
+
+# Model selection in the UI mapped to the model router's provider names
+MODEL_CHOICES = {
+    "Auto": "auto",
+    "Claude Sonnet": "claude",
+    "DeepSeek": "deepseek"
+}
 
 # Create the chatbot interface that will be called.
-def chatbot_interface(user_input, model_choice, index_date):
+async def chatbot_interface(user_input, model_choice, index_date, session=None):
     """
     Handles the chatbot interface logic, processes the user query, retrieves relevant documents,
     constructs a prompt for the selected model, and returns the response.
 
+    The whole pipeline is asynchronous, so a query waiting on Bedrock, OpenSearch, vLLM or kubectl
+    does not hold a worker thread.
+
     Parameters:
         user_input (str): The user's input query.
-        model_choice (str): The selected model for generating the response ("Claude Sonnet" or "DeepSeek").
+        model_choice (str): The selected model for generating the response ("Auto", "Claude Sonnet" or "DeepSeek").
         index_date (datetime): The date for which to query the logs, used to form the index name.
+        session (ChatSession, optional): The chat the query belongs to. Its history is added to the
+            prompt, and logs and kubectl output fetched earlier in the chat are reused.
 
     Returns:
         str: The model's response to the user's query, or an error message if no match is found.
     """
-    # Transform to the desired format YYYYMMDD
-    formatted_date = index_date.strftime("%Y%m%d")
-    index_name = f"eks-cluster-{formatted_date}"
-    logger.info(f"Received user query for date: {index_date}, model: {model_choice}, and user input:\n {user_input}\n")
-    query_embedding = encode_query(user_input)
-
-    retrieved_docs = opensearch_client.retrieve_documents(query_embedding=query_embedding, index_name=index_name)
-
-    if retrieved_docs is not None:
-        prompt = construct_prompt(query=user_input, retrieved_docs=retrieved_docs)
-        # Choose the model based on the combo box selection
-        if model_choice == "Claude Sonnet":
-            response = generate_response_with_kubectl(prompt, "claude")
-        elif model_choice == "DeepSeek":
-            response = generate_response_with_kubectl(prompt, "deepseek")
-        else:
-            response = "Invalid model selection"
-        return response
-    else:
-        return "No match for the prompt found in the vector database!"
+    with trace_request() as request_span:
+        # Transform to the desired format YYYYMMDD
+        formatted_date = index_date.strftime("%Y%m%d")
+        index_name = f"eks-cluster-{formatted_date}"
+        logger.info(f"Received user query for date: {index_date}, model: {model_choice}, and user input:\n {user_input}\n")
+        request_span.set(index=index_name, model=model_choice)
+        if model_choice not in MODEL_CHOICES:
+            return "Invalid model selection"
+
+        notice = ""
+        query_embedding = None
+        window_minutes = TOP_ISSUES_WINDOW_MINUTES if formatted_date == datetime.now(timezone.utc).strftime("%Y%m%d") else None
+        # Stages that do not need the query embedding start right away
+        prefetcher = KubectlPrefetcher()
+        if session is not None:
+            prefetcher.reuse(session.fresh_kubectl(CHAT_KUBECTL_MAX_AGE_SECONDS))
+        prefetcher.prefetch(extract_references(user_input))
+        # Follow-ups depend on the conversation, only standalone questions use the answer cache
+        use_cache = session is None or session.empty
+        top_issues_task = asyncio.create_task(
+            opensearch_client.top_issues(f"eks-anomalies-{formatted_date}", window_minutes=window_minutes)
+        )
+        try:
+            try:
+                # Older days are served from the weekly index they were compacted into
+                query_embedding, (indices, days) = await asyncio.gather(
+                    encode_query(user_input),
+                    opensearch_client.resolve_indices([formatted_date])
+                )
+
+                # Near-identical questions about the same index and model reuse a recent answer
+                if use_cache:
+                    cached_response, similarity = response_cache.lookup(query_embedding, index_name, model_choice)
+                    if cached_response is not None:
+                        request_span.set(cache="hit", similarity=round(similarity, 4))
+                        if session is not None:
+                            session.add_turn(user_input, cached_response)
+                        return cached_response
+                request_span.set(cache="miss", indices=",".join(indices))
+
+                retrieved_docs = None
+                if session is not None:
+                    retrieved_docs = session.find_retrieval(query_embedding, index_name, CHAT_REUSE_SIMILARITY)
+                    request_span.set(reused_retrieval=retrieved_docs is not None)
+                if retrieved_docs is None:
+                    retrieved_docs = await opensearch_client.retrieve_templates(query_embedding=query_embedding, index_name=indices, days=days)
+                    if session is not None and retrieved_docs:
+                        session.add_retrieval(query_embedding, index_name, retrieved_docs)
+                top_issues = await top_issues_task
+            except DependencyUnavailableError as e:
+                # Degraded mode: answer without log context instead of waiting on a throttled dependency
+                logger.warning(f"Log search unavailable, answering without logs: {e}")
+                request_span.set(degraded=True, dependency=e.dependency)
+                retrieved_docs = []
+                top_issues, window_minutes = [], None
+                notice = "_Log search is temporarily unavailable, this answer is not based on cluster logs._\n\n"
+
+            if retrieved_docs is not None:
+                # Pods of the question and of the retrieved logs, fetched while the prompt is assembled
+                prefetcher.prefetch(extract_references(user_input, retrieved_docs, top_issues))
+                kubectl_output = await prefetcher.outputs(timeout=PREFETCH_WAIT_SECONDS)
+                request_span.set(prefetched=len(kubectl_output))
+                prompt = construct_prompt(query=user_input, retrieved_docs=retrieved_docs,
+                                          top_issues=top_issues, window_minutes=window_minutes,
+                                          kubectl_output=kubectl_output,
+                                          history=session.history() if session is not None else None,
+                                          tool_use=TOOL_CALLING)
+                # Choose the model based on the combo box selection
+                try:
+                    response = await generate_response_with_kubectl(prompt, MODEL_CHOICES[model_choice], prefetcher=prefetcher)
+                except ModelRequestError as e:
+                    logger.error(f"The selected model rejected the request: {e}")
+                    request_span.set_error(e)
+                    return "The selected model could not process this question, please shorten it or choose another model."
+                except ModelRouterError as e:
+                    logger.error(f"No model backend available: {e}")
+                    request_span.set_error(e)
+                    if MODEL_CHOICES[model_choice] != "auto":
+                        return "The selected model is currently unavailable, please try again shortly or choose Auto."
+                    return "All model backends are currently unavailable, please try again shortly."
+
+                # Degraded answers are not cached, the next query should get the full pipeline again
+                if not notice and use_cache:
+                    response_cache.store(query_embedding, index_name, model_choice, response)
+                if session is not None:
+                    session.add_turn(user_input, response)
+                    session.add_kubectl(prefetcher.results())
+                return notice + response
+            else:
+                request_span.set(outcome="no_match")
+                return "No match for the prompt found in the vector database!"
+        finally:
+            top_issues_task.cancel()
+            prefetcher.cancel()
+
+
+async def summarize_conversation(summary, turns):
+    """
+    Folds chat turns into the running summary of a chat session.
+
+    Parameters:
+        summary (str): The current summary, empty for the first compaction.
+        turns (list): The `(question, answer)` tuples to fold in, oldest first.
+
+    Returns:
+        str: The new summary. When no model is available the conversation is truncated instead.
+    """
+    conversation = "\n\n".join(f"User: {question}\nAssistant: {answer}" for question, answer in turns)
+    if summary:
+        conversation = f"Earlier summary: {summary}\n\n{conversation}"
+    prompt = ("Summarize this Kubernetes troubleshooting conversation in a few sentences. Keep the names of "
+              "pods, namespaces, nodes and errors, and what was found or ruled out.\n\n"
+              f"{conversation}\n\nSummary:")
+    try:
+        new_summary, _ = await model_router.invoke(prompt, "auto")
+        return new_summary.strip()
+    except ModelRouterError as e:
+        logger.warning(f"Could not summarize the chat history, truncating it: {e}")
+        return truncate_middle(conversation, CHAT_HISTORY_TOKEN_BUDGET // 2)
+
+
+async def chat_interface(message, chat_history, model_choice, index_date, request: gr.Request):
+    """
+    Handles a message of the chat mode. The conversation is kept server-side per browser session,
+    the `chat_history` sent by the browser is only used for display.
+
+    Parameters:
+        message (str): The new user message.
+        chat_history (list): The displayed messages, as `{"role", "content"}` dicts.
+        model_choice (str): The selected model.
+        index_date (datetime): The date for which to query the logs.
+        request (gr.Request): The Gradio request, identifying the browser session.
+
+    Returns:
+        tuple: An empty string to clear the input box, and the updated displayed messages.
+    """
+    if not message or not message.strip():
+        return "", chat_history
+    session = session_store.get(request.session_hash)
+    async with session.lock:
+        response = await chatbot_interface(message, model_choice, index_date, session=session)
+        if await session.compact(summarize_conversation, CHAT_HISTORY_TOKEN_BUDGET, CHAT_KEEP_TURNS):
+            logger.info(f"Compacted the history of chat session {request.session_hash}")
+        session_store.save(request.session_hash)
+    return "", (chat_history or []) + [
+        {"role": "user", "content": message},
+        {"role": "assistant", "content": response}
+    ]
+
+
+def clear_chat(request: gr.Request):
+    """Forgets the server-side history of the browser session and clears the display."""
+    session_store.clear(request.session_hash)
+    return "", []
 
 
 def create_interface():
@@ -57,40 +235,62 @@ def create_interface():
         )
 
         with gr.Row():
-            with gr.Column():
-                index_date = gr.DateTime(
-                    label="Select Date",
-                    type="datetime",
-                    include_time=False,
-                    info="Select the date to query logs"
-                )
+            index_date = gr.DateTime(
+                label="Select Date",
+                type="datetime",
+                include_time=False,
+                info="Select the date to query logs"
+            )
 
-                # Add the model selection combo box
-                model_dropdown = gr.Dropdown(
-                    choices=["Claude Sonnet", "DeepSeek"],
-                    value="Claude Sonnet",
-                    label="Select Model"
-                )
+            # Add the model selection combo box
+            model_dropdown = gr.Dropdown(
+                choices=list(MODEL_CHOICES),
+                value="Claude Sonnet",
+                label="Select Model"
+            )
 
-                user_input = gr.Textbox(
-                    label="Your Question",
-                    placeholder="Type your question here..."
-                )
-                submit_button = gr.Button("Submit")
+        with gr.Tab("Question"):
+            with gr.Row():
+                with gr.Column():
+                    user_input = gr.Textbox(
+                        label="Your Question",
+                        placeholder="Type your question here..."
+                    )
+                    submit_button = gr.Button("Submit")
+
+                with gr.Column():
+                    output = gr.Markdown(label="Response")
 
-            with gr.Column():
-                output = gr.Markdown(label="Response")
+        # Follow-up questions keep the context of the conversation
+        with gr.Tab("Chat"):
+            chat = gr.Chatbot(type="messages", label="Conversation", height=500)
+            chat_input = gr.Textbox(
+                label="Message",
+                placeholder="Ask a question, then follow up..."
+            )
+            with gr.Row():
+                send_button = gr.Button("Send")
+                clear_button = gr.Button("New conversation")
 
         submit_button.click(
             fn=chatbot_interface,
             inputs=[user_input, model_dropdown, index_date],
             outputs=output
         )
+        for trigger in (chat_input.submit, send_button.click):
+            trigger(
+                fn=chat_interface,
+                inputs=[chat_input, chat, model_dropdown, index_date],
+                outputs=[chat_input, chat]
+            )
+        clear_button.click(fn=clear_chat, inputs=None, outputs=[chat_input, chat])
 
+    demo.queue(default_concurrency_limit=GRADIO_CONCURRENCY_LIMIT, max_size=GRADIO_MAX_QUEUE_SIZE)
     return demo
 
 
 if __name__ == "__main__":
+    start_metrics_server()
     logger.info("Starting Gradio interface...")
     interface = create_interface()
     interface.launch()
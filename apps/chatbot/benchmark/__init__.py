@@ -0,0 +1,6 @@
+"""
+Offline benchmarking tools for the chatbot's retrieval path.
+
+Everything in this package runs without AWS access: embeddings come from a deterministic fake
+embedder and searches run against an in-memory stand-in for the OpenSearch kNN index.
+"""
@@ -0,0 +1,151 @@
+"""
+Local stand-ins for Amazon Bedrock embeddings and the OpenSearch Serverless vector index.
+"""
+import hashlib
+import math
+import re
+
+try:
+    import faiss
+    import numpy as np
+except ImportError:
+    faiss = None
+    np = None
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class FakeEmbedder:
+    """
+    A deterministic embedder that hashes tokens into a fixed-size vector (feature hashing).
+
+    Texts that share tokens end up close to each other, which is enough to exercise the kNN
+    retrieval path and compare retrieval parameters against a labeled dataset.
+
+    Attributes:
+        dimension (int): The size of the generated vectors, matching the index mapping.
+    """
+    def __init__(self, dimension=1024):
+        self.dimension = dimension
+
+    def __call__(self, text):
+        return self.encode(text)
+
+    def encode(self, text):
+        """
+        Generates a normalized embedding for the provided text.
+
+        Parameters:
+            text (str): The text to embed.
+
+        Returns:
+            list: The embedding as a list of floats with unit L2 norm.
+        """
+        vector = [0.0] * self.dimension
+        for token in TOKEN_PATTERN.findall(text.lower()):
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimension
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vector[bucket] += sign
+
+        norm = math.sqrt(sum(value * value for value in vector))
+        if norm == 0:
+            return vector
+        return [value / norm for value in vector]
+
+
+class _FakeIndices:
+    """Implements the subset of the `client.indices` API used by the application."""
+    def __init__(self, store):
+        self._store = store
+
+    async def exists(self, index):
+        return index in self._store.documents
+
+
+class InMemoryVectorStore:
+    """
+    An in-memory stand-in for the async OpenSearch client used by `OpenSearchClient`.
+
+    It accepts the same kNN query body that `retrieve_documents` sends, scores documents the way
+    the faiss engine does for the `l2` space (`1 / (1 + distance^2)`), applies `min_score` and
+    returns a response shaped like an OpenSearch search response. When faiss is installed an exact
+    `IndexFlatL2` is used for the search, otherwise a brute-force scan.
+
+    Attributes:
+        documents (dict): A mapping of index name to the list of indexed documents.
+        indices: The subset of the `client.indices` API used by the application.
+        use_faiss (bool): Whether faiss is used for the nearest-neighbour search.
+    """
+    def __init__(self, use_faiss=True):
+        self.documents = {}
+        self.indices = _FakeIndices(self)
+        self.use_faiss = use_faiss and faiss is not None
+        self._faiss_indices = {}
+
+    def add_documents(self, index_name, documents):
+        """
+        Adds documents to an index, creating it if needed.
+
+        Parameters:
+            index_name (str): The index to add the documents to.
+            documents (list): Dictionaries with at least `id`, `log` and `embedding` keys.
+        """
+        self.documents.setdefault(index_name, []).extend(documents)
+        self._faiss_indices.pop(index_name, None)
+
+    async def search(self, body, index):
+        """
+        Runs a kNN search using the query body format sent by `OpenSearchClient.retrieve_documents`.
+
+        Parameters:
+            body (dict): The OpenSearch query body.
+            index (str): The index to search.
+
+        Returns:
+            dict: A response shaped like the OpenSearch search response.
+        """
+        if index not in self.documents:
+            raise Exception(f"index_not_found_exception: no such index [{index}]")
+
+        knn = body["query"]["bool"]["must"][0]["knn"]["embedding"]
+        k = knn["k"]
+        size = body.get("size", k)
+        min_score = body.get("min_score", 0.0)
+        fields = body.get("fields", ["id", "log"])
+
+        neighbours = self._nearest(index, knn["vector"], k)
+        hits = []
+        for position, distance in neighbours[:size]:
+            score = 1.0 / (1.0 + distance)
+            if score < min_score:
+                continue
+            document = self.documents[index][position]
+            hits.append({
+                "_index": index,
+                "_score": score,
+                "fields": {field: [document[field]] for field in fields if field in document}
+            })
+
+        return {"hits": {"total": {"value": len(hits), "relation": "eq"}, "hits": hits}}
+
+    def _nearest(self, index, vector, k):
+        """Returns `(position, squared_distance)` pairs for the `k` nearest documents."""
+        documents = self.documents[index]
+        if self.use_faiss:
+            faiss_index = self._faiss_indices.get(index)
+            if faiss_index is None:
+                embeddings = np.array([doc["embedding"] for doc in documents], dtype="float32")
+                faiss_index = faiss.IndexFlatL2(embeddings.shape[1])
+                faiss_index.add(embeddings)
+                self._faiss_indices[index] = faiss_index
+            distances, positions = faiss_index.search(np.array([vector], dtype="float32"), k)
+            return [(int(p), float(d)) for p, d in zip(positions[0], distances[0]) if p >= 0]
+
+        scored = []
+        for position, document in enumerate(documents):
+            distance = sum((a - b) ** 2 for a, b in zip(vector, document["embedding"]))
+            scored.append((position, distance))
+        scored.sort(key=lambda item: item[1])
+        return scored[:k]
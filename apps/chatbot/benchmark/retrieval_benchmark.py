@@ -0,0 +1,197 @@
+"""
+Offline benchmark for the chatbot's retrieval path.
+
+Loads a labeled dataset of logs and queries, indexes the logs into the in-memory vector store
+using the deterministic fake embedder and runs every query through
+`OpenSearchClient.retrieve_documents`, reporting retrieval quality (recall@k, MRR) and latency
+(p50/p99, throughput).
+
+Usage (from apps/chatbot):
+    python -m benchmark.retrieval_benchmark --dataset benchmark/data/sample_dataset.json --top-k 5 --min-score 0.4
+"""
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+
+from benchmark.fakes import FakeEmbedder, InMemoryVectorStore
+from clients.opensearch_client import OpenSearchClient
+
+BENCHMARK_INDEX = "eks-cluster-benchmark"
+
+
+def load_dataset(path):
+    """
+    Loads a labeled benchmark dataset.
+
+    The dataset is a JSON document with a `logs` list (`{"id": ..., "log": ...}`) and a `queries`
+    list (`{"query": ..., "relevant": [log ids]}`).
+
+    Parameters:
+        path (str): The path to the dataset file.
+
+    Returns:
+        dict: The parsed dataset.
+    """
+    with open(path, "r", encoding="utf-8") as dataset_file:
+        dataset = json.load(dataset_file)
+
+    known_ids = {log["id"] for log in dataset["logs"]}
+    for query in dataset["queries"]:
+        unknown = set(query["relevant"]) - known_ids
+        if unknown:
+            raise ValueError(f"Query '{query['query']}' references unknown log ids: {sorted(unknown)}")
+    return dataset
+
+
+def build_store(dataset, embedder, use_faiss=True):
+    """
+    Indexes the dataset logs into a fresh in-memory vector store.
+
+    Parameters:
+        dataset (dict): The benchmark dataset.
+        embedder (FakeEmbedder): The embedder used for both logs and queries.
+        use_faiss (bool): Whether to use faiss for the search when it is installed.
+
+    Returns:
+        InMemoryVectorStore: The populated store.
+    """
+    store = InMemoryVectorStore(use_faiss=use_faiss)
+    store.add_documents(BENCHMARK_INDEX, [
+        {"id": log["id"], "log": log["log"], "embedding": embedder.encode(log["log"])}
+        for log in dataset["logs"]
+    ])
+    return store
+
+
+def percentile(values, pct):
+    """
+    Computes a percentile using the nearest-rank method.
+
+    Parameters:
+        values (list): The measured values.
+        pct (float): The percentile to compute, between 0 and 100.
+
+    Returns:
+        float: The percentile value, or 0.0 when there are no values.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def run_benchmark(dataset, top_k=5, min_score=0.4, repeat=1, use_faiss=True):
+    """
+    Runs every dataset query through `retrieve_documents` and aggregates the results.
+
+    Parameters:
+        dataset (dict): The benchmark dataset.
+        top_k (int): The number of documents to retrieve per query.
+        min_score (float): The minimum score threshold passed to the search.
+        repeat (int): How many times to run the query set, to stabilize latency figures.
+        use_faiss (bool): Whether to use faiss for the search when it is installed.
+
+    Returns:
+        dict: Recall@k, MRR, latency percentiles (milliseconds) and throughput (queries/second).
+    """
+    embedder = FakeEmbedder()
+    store = build_store(dataset, embedder, use_faiss=use_faiss)
+    opensearch_client = OpenSearchClient(client=store)
+
+    # Map log text back to ids, several ids can share the same text
+    ids_by_log = {}
+    for log in dataset["logs"]:
+        ids_by_log.setdefault(log["log"], set()).add(log["id"])
+
+    async def retrieve(query_embedding):
+        return await opensearch_client.retrieve_documents(
+            query_embedding=query_embedding,
+            index_name=BENCHMARK_INDEX,
+            top_k=top_k,
+            min_score=min_score
+        ) or []
+
+    recalls, reciprocal_ranks, latencies = [], [], []
+    loop = asyncio.new_event_loop()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for query in dataset["queries"]:
+            query_started = time.perf_counter()
+            query_embedding = embedder.encode(query["query"])
+            retrieved = loop.run_until_complete(retrieve(query_embedding))
+            latencies.append((time.perf_counter() - query_started) * 1000)
+
+            relevant = set(query["relevant"])
+            found = set()
+            first_relevant_rank = None
+            for rank, log in enumerate(retrieved, start=1):
+                matched = ids_by_log.get(log, set()) & relevant
+                if matched and first_relevant_rank is None:
+                    first_relevant_rank = rank
+                found |= matched
+
+            recalls.append(len(found) / len(relevant) if relevant else 1.0)
+            reciprocal_ranks.append(1.0 / first_relevant_rank if first_relevant_rank else 0.0)
+    elapsed = time.perf_counter() - started
+    loop.close()
+
+    return {
+        "top_k": top_k,
+        "min_score": min_score,
+        "queries": len(latencies),
+        "backend": "faiss" if store.use_faiss else "brute-force",
+        f"recall@{top_k}": sum(recalls) / len(recalls) if recalls else 0.0,
+        "mrr": sum(reciprocal_ranks) / len(reciprocal_ranks) if reciprocal_ranks else 0.0,
+        "latency_p50_ms": percentile(latencies, 50),
+        "latency_p99_ms": percentile(latencies, 99),
+        "throughput_qps": len(latencies) / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline recall/latency benchmark for retrieve_documents")
+    parser.add_argument("--dataset", default="benchmark/data/sample_dataset.json",
+                        help="Path to the labeled dataset (JSON)")
+    parser.add_argument("--top-k", type=int, nargs="+", default=[5],
+                        help="One or more k values to benchmark")
+    parser.add_argument("--min-score", type=float, default=0.4, help="Minimum score threshold")
+    parser.add_argument("--repeat", type=int, default=10, help="Number of passes over the query set")
+    parser.add_argument("--no-faiss", action="store_true", help="Force the brute-force search")
+    parser.add_argument("--min-recall", type=float, default=None,
+                        help="Exit with an error if recall@k falls below this value")
+    parser.add_argument("--max-p99-ms", type=float, default=None,
+                        help="Exit with an error if the p99 latency exceeds this value")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    dataset = load_dataset(args.dataset)
+
+    failed = False
+    for top_k in args.top_k:
+        result = run_benchmark(
+            dataset,
+            top_k=top_k,
+            min_score=args.min_score,
+            repeat=args.repeat,
+            use_faiss=not args.no_faiss
+        )
+        print(json.dumps(result))
+
+        if args.min_recall is not None and result[f"recall@{top_k}"] < args.min_recall:
+            print(f"recall@{top_k} {result[f'recall@{top_k}']:.3f} is below {args.min_recall}", file=sys.stderr)
+            failed = True
+        if args.max_p99_ms is not None and result["latency_p99_ms"] > args.max_p99_ms:
+            print(f"p99 latency {result['latency_p99_ms']:.2f}ms exceeds {args.max_p99_ms}ms", file=sys.stderr)
+            failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
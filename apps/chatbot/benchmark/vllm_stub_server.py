@@ -0,0 +1,135 @@
+"""
+A local OpenAI-compatible stub of the vLLM chat completions endpoint.
+
+Useful for exercising `DeepSeekClient` (timeouts, retries on 429/503, streaming) without a GPU
+node. Point the chatbot at it with `VLLM_ENDPOINT=http://localhost:8000`.
+
+Usage (from apps/chatbot):
+    python -m benchmark.vllm_stub_server --port 8000 --latency 0.2 --fail-every 3 --fail-status 429
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubState:
+    """Shared configuration and request counter of the stub server."""
+    def __init__(self, latency=0.0, fail_every=0, fail_status=503, retry_after=None, reply=None):
+        self.latency = latency
+        self.fail_every = fail_every
+        self.fail_status = fail_status
+        self.retry_after = retry_after
+        self.reply = reply
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def next_request_number(self):
+        with self._lock:
+            return next(self._counter)
+
+
+def make_handler(state):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if self.path != "/v1/chat/completions":
+                return self._send_json(404, {"error": "not found"})
+
+            number = state.next_request_number()
+            if state.fail_every and number % state.fail_every == 0:
+                headers = {"Retry-After": str(state.retry_after)} if state.retry_after is not None else {}
+                return self._send_json(state.fail_status, {"error": "stub failure"}, headers)
+
+            payload = json.loads(body or b"{}")
+            prompt = payload.get("messages", [{}])[-1].get("content", "")
+            content = state.reply or f"Stub response to a {len(prompt)} character prompt."
+            usage = {
+                "prompt_tokens": max(1, len(prompt) // 4),
+                "completion_tokens": max(1, len(content) // 4),
+                "total_tokens": max(1, len(prompt) // 4) + max(1, len(content) // 4)
+            }
+
+            time.sleep(state.latency)
+            if payload.get("stream"):
+                return self._send_stream(payload.get("model"), content, usage)
+            return self._send_json(200, {
+                "id": f"chatcmpl-stub-{number}",
+                "object": "chat.completion",
+                "model": payload.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage
+            })
+
+        def _send_json(self, status, document, headers=None):
+            encoded = json.dumps(document).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(encoded)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(encoded)
+
+        def _send_stream(self, model, content, usage):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            words = content.split(" ")
+            for position, word in enumerate(words):
+                piece = word if position == len(words) - 1 else word + " "
+                chunk = {"object": "chat.completion.chunk", "model": model,
+                         "choices": [{"index": 0, "delta": {"content": piece}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.write(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n".encode("utf-8"))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.close_connection = True
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def start_stub_server(port=0, **options):
+    """
+    Starts the stub server in a background thread.
+
+    Parameters:
+        port (int): The port to listen on, 0 picks a free port.
+        **options: `StubState` options (latency, fail_every, fail_status, retry_after, reply).
+
+    Returns:
+        ThreadingHTTPServer: The running server, its URL is `http://127.0.0.1:{server.server_port}`.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(StubState(**options)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub of the vLLM chat completions API")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before answering")
+    parser.add_argument("--fail-every", type=int, default=0, help="Fail every Nth request (0 disables)")
+    parser.add_argument("--fail-status", type=int, default=503, help="Status code of injected failures")
+    parser.add_argument("--retry-after", type=int, default=None, help="Retry-After header on injected failures")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(StubState(
+        latency=args.latency,
+        fail_every=args.fail_every,
+        fail_status=args.fail_status,
+        retry_after=args.retry_after
+    )))
+    print(f"vLLM stub listening on http://127.0.0.1:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import json
+import os
+from urllib.parse import quote
+import boto3
+import httpx
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.exceptions import ClientError
+from utils.logger import logger
+
+
+class AsyncBedrockRuntime:
+    """
+    An asyncio client for the Bedrock Runtime `InvokeModel` and `Converse` APIs.
+
+    Requests are signed with SigV4 from the default boto3 credential chain (refreshed as needed) and
+    sent over a pooled `httpx.AsyncClient`, so waiting on a model does not hold a thread. Error
+    responses are raised as botocore `ClientError`s with the service error code, like the boto3
+    client does, so throttling is recognized by the circuit breakers.
+
+    Attributes:
+        region (str): The AWS region of the Bedrock endpoint.
+        endpoint (str): The Bedrock Runtime URL.
+        client (httpx.AsyncClient): The pooled HTTP client.
+    """
+    def __init__(self, region=None, connect_timeout=None, read_timeout=None, pool_size=None):
+        session = boto3.Session()
+        self.region = region or session.region_name or os.getenv("AWS_DEFAULT_REGION")
+        self.endpoint = f"https://bedrock-runtime.{self.region}.amazonaws.com"
+        self._credentials = session.get_credentials()
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                read_timeout or float(os.getenv("BEDROCK_READ_TIMEOUT", "120")),
+                connect=connect_timeout or float(os.getenv("BEDROCK_CONNECT_TIMEOUT", "3"))
+            ),
+            limits=httpx.Limits(max_connections=pool_size or int(os.getenv("BEDROCK_POOL_SIZE", "50")))
+        )
+
+    async def invoke_model(self, model_id, body):
+        """
+        Invokes a model with a JSON request body.
+
+        Parameters:
+            model_id (str): The Bedrock model ID.
+            body (dict): The model-specific request body.
+
+        Returns:
+            dict: The parsed response body.
+
+        Raises:
+            ClientError: If Bedrock returned an error status.
+            httpx.TransportError: On connection errors and timeouts.
+        """
+        return await self._post(model_id, "invoke", body, "InvokeModel")
+
+    async def converse(self, model_id, messages, system=None, tool_config=None, max_tokens=None):
+        """
+        Sends a conversation through the model-independent `Converse` API, which supports tool use.
+
+        Parameters:
+            model_id (str): The Bedrock model ID.
+            messages (list): The Converse messages, alternating user and assistant.
+            system (str, optional): The system prompt.
+            tool_config (dict, optional): The `toolConfig`, required when the messages contain tool use.
+            max_tokens (int, optional): The completion token limit.
+
+        Returns:
+            dict: The parsed response, with the assistant message under `output.message`, the
+                `stopReason` and the token `usage`.
+
+        Raises:
+            ClientError: If Bedrock returned an error status.
+            httpx.TransportError: On connection errors and timeouts.
+        """
+        body = {"messages": messages}
+        if system:
+            body["system"] = [{"text": system}]
+        if tool_config:
+            body["toolConfig"] = tool_config
+        if max_tokens:
+            body["inferenceConfig"] = {"maxTokens": max_tokens}
+        return await self._post(model_id, "converse", body, "Converse")
+
+    async def _post(self, model_id, action, body, operation):
+        """Sends a SigV4-signed JSON request to a model action and maps error statuses to `ClientError`."""
+        url = f"{self.endpoint}/model/{quote(model_id, safe='')}/{action}"
+        data = json.dumps(body)
+        request = AWSRequest(method="POST", url=url, data=data, headers={
+            "Content-Type": "application/json",
+            "Accept": "application/json"
+        })
+        SigV4Auth(self._credentials.get_frozen_credentials(), "bedrock", self.region).add_auth(request)
+
+        response = await self.client.post(url, content=data, headers=dict(request.headers))
+        if response.status_code >= 400:
+            # The error type header reads "<code>:<namespace>"
+            code = response.headers.get("x-amzn-ErrorType", "").split(":")[0] or str(response.status_code)
+            try:
+                message = response.json().get("message", response.text)
+            except ValueError:
+                message = response.text
+            logger.debug(f"Bedrock {model_id} returned {response.status_code}: {message}")
+            raise ClientError({
+                "Error": {"Code": code, "Message": message},
+                "ResponseMetadata": {"HTTPStatusCode": response.status_code}
+            }, operation)
+        return response.json()
@@ -0,0 +1,300 @@
+import os
+import re
+from utils.logger import logger
+
+# Rough characters-per-token ratio for English text and log lines (Claude and Llama tokenizers
+# both average close to 4 characters per token on this kind of content)
+CHARS_PER_TOKEN = 4
+
+# Fragments that vary between otherwise identical log lines
+VOLATILE_PATTERNS = [
+    re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"),
+    re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.IGNORECASE),
+    re.compile(r"\b(?:\d{1,3}\.){3}\d{1,3}(?::\d+)?\b"),
+    re.compile(r"\b[0-9a-f]{7,}\b", re.IGNORECASE),
+    re.compile(r"-[a-z0-9]{5}\b"),
+    re.compile(r"\d+"),
+]
+
+# Keywords that make a line more useful for troubleshooting
+SIGNAL_KEYWORDS = [
+    "error", "fail", "fatal", "panic", "exception", "denied", "refused", "timeout", "timed out",
+    "oomkilled", "crashloopbackoff", "backoff", "errimagepull", "imagepullbackoff", "evicted",
+    "unhealthy", "probe", "not found", "insufficient", "pending", "warning", "killed", "restart"
+]
+
+
+def estimate_tokens(text):
+    """
+    Estimates the number of tokens in a text without calling a tokenizer.
+
+    Parameters:
+        text (str): The text to measure.
+
+    Returns:
+        int: The estimated token count.
+    """
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def normalize_line(line):
+    """
+    Masks timestamps, IDs, addresses and numbers so near-identical log lines compare equal.
+
+    Parameters:
+        line (str): The log line to normalize.
+
+    Returns:
+        str: The normalized line, used as a deduplication key.
+    """
+    normalized = line.strip().lower()
+    for pattern in VOLATILE_PATTERNS:
+        normalized = pattern.sub("<*>", normalized)
+    return normalized
+
+
+def deduplicate_lines(lines, normalize=True):
+    """
+    Removes repeated lines, keeping the first occurrence and annotating it with the number of repeats.
+
+    Parameters:
+        lines (list): The lines to deduplicate.
+        normalize (bool): Whether lines that only differ by volatile fragments (timestamps, IDs,
+            numbers) count as duplicates. When False only exact repeats are removed.
+
+    Returns:
+        list: The unique lines, in their original order.
+    """
+    unique = []
+    counts = {}
+    positions = {}
+    for line in lines:
+        if not line.strip():
+            continue
+        key = normalize_line(line) if normalize else line.strip()
+        if key in counts:
+            counts[key] += 1
+            continue
+        counts[key] = 1
+        positions[key] = len(unique)
+        unique.append(line)
+
+    for key, count in counts.items():
+        if count > 1:
+            unique[positions[key]] = f"{unique[positions[key]]} (repeated {count} times)"
+    return unique
+
+
+def line_relevance(line, query_terms=None):
+    """
+    Scores how useful a line is likely to be for troubleshooting.
+
+    Parameters:
+        line (str): The line to score.
+        query_terms (set, optional): Lowercase terms from the user query.
+
+    Returns:
+        int: The relevance score, higher is more relevant.
+    """
+    lowered = line.lower()
+    score = sum(2 for keyword in SIGNAL_KEYWORDS if keyword in lowered)
+    if query_terms:
+        score += sum(3 for term in query_terms if term in lowered)
+    return score
+
+
+def query_terms_of(query):
+    """Returns the distinctive lowercase terms of a query (ignoring very short words)."""
+    if not query:
+        return set()
+    return {term for term in re.findall(r"[a-z0-9][a-z0-9\-_.]+", query.lower()) if len(term) > 3}
+
+
+def truncate_middle(text, max_tokens):
+    """
+    Truncates a text to a token budget, keeping its beginning and end.
+
+    Parameters:
+        text (str): The text to truncate.
+        max_tokens (int): The token budget.
+
+    Returns:
+        str: The text, with its middle replaced by a marker if it was over budget.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    head = text[:max_chars * 2 // 3]
+    tail = text[-(max_chars // 3):]
+    omitted = len(text) - len(head) - len(tail)
+    return f"{head}\n... [{omitted} characters truncated] ...\n{tail}"
+
+
+def select_lines(lines, max_tokens, query_terms=None):
+    """
+    Selects the most relevant lines that fit a token budget, preserving their original order.
+
+    Parameters:
+        lines (list): The candidate lines.
+        max_tokens (int): The token budget.
+        query_terms (set, optional): Lowercase terms from the user query.
+
+    Returns:
+        list: The selected lines, with a marker where lines were dropped.
+    """
+    if sum(estimate_tokens(line) + 1 for line in lines) <= max_tokens:
+        return lines
+
+    ranked = sorted(range(len(lines)), key=lambda i: (-line_relevance(lines[i], query_terms), i))
+    selected = set()
+    used = 0
+    for i in ranked:
+        cost = estimate_tokens(lines[i]) + 1
+        if used + cost > max_tokens:
+            continue
+        selected.add(i)
+        used += cost
+
+    result = []
+    dropped = 0
+    for i, line in enumerate(lines):
+        if i in selected:
+            if dropped:
+                result.append(f"... [{dropped} lines omitted] ...")
+                dropped = 0
+            result.append(line)
+        else:
+            dropped += 1
+    if dropped:
+        result.append(f"... [{dropped} lines omitted] ...")
+    return result
+
+
+class ContextBuilder:
+    """
+    Assembles prompt sections under per-section token budgets.
+
+    Attributes:
+        logs_budget (int): Token budget for retrieved log lines.
+        kubectl_budget (int): Token budget for all kubectl outputs of a follow-up prompt.
+        history_budget (int): Token budget for the conversation so far (original prompt and first response).
+    """
+    def __init__(self, logs_budget=None, kubectl_budget=None, history_budget=None):
+        self.logs_budget = logs_budget or int(os.getenv("CONTEXT_LOGS_TOKEN_BUDGET", "3000"))
+        self.kubectl_budget = kubectl_budget or int(os.getenv("CONTEXT_KUBECTL_TOKEN_BUDGET", "4000"))
+        self.history_budget = history_budget or int(os.getenv("CONTEXT_HISTORY_TOKEN_BUDGET", "3000"))
+
+    def build_logs_section(self, retrieved_docs):
+        """
+        Builds the retrieved-logs section. Documents arrive ranked by kNN score, so they are added
+        in order, after deduplication, until the budget is used.
+
+        Parameters:
+            retrieved_docs (list): The retrieved log lines, most relevant first.
+
+        Returns:
+            str: The logs section.
+        """
+        if not retrieved_docs:
+            return "No relevant logs found."
+
+        lines = []
+        used = 0
+        docs = deduplicate_lines(retrieved_docs)
+        for position, doc in enumerate(docs):
+            remaining = self.logs_budget - used
+            if remaining <= 0:
+                lines.append(f"... [{len(docs) - position} less relevant log entries omitted] ...")
+                break
+            doc = truncate_middle(doc, remaining)
+            lines.append(doc)
+            used += estimate_tokens(doc) + 1
+
+        logger.debug(f"Logs context: {len(lines)} entries, ~{used} tokens")
+        return "\n".join(lines)
+
+    def build_top_issues_section(self, top_issues, window_minutes=None):
+        """
+        Builds the top-issues section from the pre-aggregated error signature counts.
+
+        Parameters:
+            top_issues (list): Dicts with `signature`, `namespace`, `pod` and `count`, most frequent first.
+            window_minutes (int, optional): The time window the counts cover, the whole day if not set.
+
+        Returns:
+            str: The top-issues section, empty when there are no issues.
+        """
+        if not top_issues:
+            return ""
+        period = f"last {window_minutes} minutes" if window_minutes else "whole day"
+        lines = [f"Top issues ({period}):"]
+        lines += [f"- {issue['signature']}: {issue['namespace']}/{issue['pod']} ({issue['count']} occurrences)" for issue in top_issues]
+        return "\n".join(lines)
+
+    def build_kubectl_section(self, command_outputs, query=None):
+        """
+        Builds the kubectl-output section. The budget is shared between commands, outputs that need
+        less than their share give the rest to the others, and oversized outputs keep their most
+        relevant lines.
+
+        Parameters:
+            command_outputs (list): `(command, output)` tuples in execution order.
+            query (str, optional): The user query or prompt, used to rank lines.
+
+        Returns:
+            str: The kubectl-output section.
+        """
+        if not command_outputs:
+            return ""
+        return "\n".join(f"{header}\n{body}" for header, body in self._fit_kubectl_outputs(command_outputs, query))
+
+    def build_tool_results(self, command_outputs, query=None):
+        """
+        Fits the outputs of one round of kubectl tool calls into the kubectl budget, the same way as
+        `build_kubectl_section`.
+
+        Parameters:
+            command_outputs (list): `(command, output)` tuples in call order.
+            query (str, optional): The user query or prompt, used to rank lines.
+
+        Returns:
+            list: The outputs, in the same order.
+        """
+        return [body for _, body in self._fit_kubectl_outputs(command_outputs, query)]
+
+    def _fit_kubectl_outputs(self, command_outputs, query=None):
+        """Returns `(header, body)` tuples of the outputs, sharing the kubectl budget."""
+        query_terms = query_terms_of(query)
+        # Only exact repeats are removed, rows of kubectl tables differ by little more than a name
+        prepared = [(command, deduplicate_lines(output.splitlines(), normalize=False)) for command, output in command_outputs]
+
+        # Smallest outputs first, so their unused share is redistributed to the larger ones
+        order = sorted(range(len(prepared)), key=lambda i: sum(estimate_tokens(l) + 1 for l in prepared[i][1]))
+        remaining_budget = self.kubectl_budget
+        sections = {}
+        for rank, i in enumerate(order):
+            command, lines = prepared[i]
+            share = remaining_budget // (len(order) - rank)
+            header = f"Output of '{command}':"
+            selected = select_lines(lines, max(share - estimate_tokens(header), 0), query_terms)
+            body = "\n".join(selected)
+            sections[i] = (header, body)
+            remaining_budget -= estimate_tokens(f"{header}\n{body}")
+
+        return [sections[i] for i in range(len(prepared))]
+
+    def build_history_section(self, *parts):
+        """
+        Builds the history section from the previous prompt and responses, keeping the beginning
+        (instructions and question) and the end (latest response) within the budget.
+
+        Parameters:
+            *parts (str): The history parts in chronological order.
+
+        Returns:
+            str: The history section.
+        """
+        history = "\n\n".join(part for part in parts if part)
+        return truncate_middle(history, self.history_budget)
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import os
+import httpx
+from utils.logger import logger
+
+DEFAULT_VLLM_ENDPOINT = "http://deepseek-gpu-vllm-chart.deepseek.svc.cluster.local:80"
+DEFAULT_DEEPSEEK_MODEL = "deepseek-ai/DeepSeek-R1-Distill-Llama-8B"
+
+# Throttling and overload statuses retried with backoff
+RETRY_STATUSES = (429, 503)
+
+
+class DeepSeekClient:
+    """
+    An asyncio client for the DeepSeek model served by vLLM through its OpenAI-compatible API.
+
+    A single `httpx.AsyncClient` keeps a pool of keep-alive connections to the vLLM service, requests
+    have connect/read timeouts, and throttling or overload responses (429/503) are retried with
+    exponential backoff, honouring `Retry-After`.
+
+    Attributes:
+        base_url (str): The vLLM service URL, without the `/v1/...` path.
+        model (str): The served model name.
+        timeout (httpx.Timeout): The connect and read timeouts.
+        max_retries (int): The number of retries of throttled or overloaded requests.
+        backoff_factor (float): The base of the exponential backoff in seconds.
+        max_tokens (int): The default completion token limit.
+        temperature (float): The default sampling temperature.
+        client (httpx.AsyncClient): The pooled HTTP client.
+    """
+    def __init__(self, base_url=None, model=None, connect_timeout=None, read_timeout=None,
+                 max_retries=None, backoff_factor=None, pool_size=None, max_tokens=None, temperature=None):
+        self.base_url = (base_url or os.getenv("VLLM_ENDPOINT", DEFAULT_VLLM_ENDPOINT)).rstrip("/")
+        self.model = model or os.getenv("DEEPSEEK_MODEL", DEFAULT_DEEPSEEK_MODEL)
+        self.timeout = httpx.Timeout(
+            read_timeout or float(os.getenv("VLLM_READ_TIMEOUT", "120")),
+            connect=connect_timeout or float(os.getenv("VLLM_CONNECT_TIMEOUT", "3"))
+        )
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("VLLM_MAX_RETRIES", "3"))
+        self.backoff_factor = backoff_factor if backoff_factor is not None else float(os.getenv("VLLM_BACKOFF_FACTOR", "0.5"))
+        self.max_tokens = max_tokens or int(os.getenv("DEEPSEEK_MAX_TOKENS", "1000"))
+        self.temperature = temperature if temperature is not None else float(os.getenv("DEEPSEEK_TEMPERATURE", "0.6"))
+
+        pool_size = pool_size or int(os.getenv("VLLM_POOL_SIZE", "10"))
+        self.client = httpx.AsyncClient(
+            headers={"Content-Type": "application/json"},
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+
+    @property
+    def completions_url(self):
+        return f"{self.base_url}/v1/chat/completions"
+
+    async def chat(self, prompt_text, max_tokens=None, temperature=None, stream=False):
+        """
+        Sends a single-turn chat completion request.
+
+        Parameters:
+            prompt_text (str): The user prompt.
+            max_tokens (int, optional): Overrides the default completion token limit.
+            temperature (float, optional): Overrides the default sampling temperature.
+            stream (bool): Whether to stream the completion (server-sent events) instead of waiting
+                for the full response body.
+
+        Returns:
+            dict: `{"content": str, "usage": dict}`, where usage holds the OpenAI-style token counts
+                (empty if the server did not report them).
+
+        Raises:
+            httpx.HTTPError: On connection errors, timeouts or error statuses left after retries.
+        """
+        result = await self.chat_messages([{"role": "user", "content": prompt_text}],
+                                          max_tokens=max_tokens, temperature=temperature, stream=stream)
+        return {"content": result["content"], "usage": result["usage"]}
+
+    async def chat_messages(self, messages, tools=None, max_tokens=None, temperature=None, stream=False):
+        """
+        Sends a chat completion request for a conversation, optionally offering tools. vLLM only
+        accepts tools when it was started with `--enable-auto-tool-choice` and a tool call parser.
+
+        Parameters:
+            messages (list): The OpenAI-style chat messages.
+            tools (list, optional): The OpenAI-style tool definitions.
+            max_tokens (int, optional): Overrides the default completion token limit.
+            temperature (float, optional): Overrides the default sampling temperature.
+            stream (bool): Whether to stream the completion (server-sent events) instead of waiting
+                for the full response body.
+
+        Returns:
+            dict: `{"content": str, "tool_calls": list, "usage": dict}`, where tool calls are in the
+                OpenAI format, with JSON-encoded arguments.
+
+        Raises:
+            httpx.HTTPError: On connection errors, timeouts or error statuses left after retries.
+        """
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens or self.max_tokens,
+            "temperature": self.temperature if temperature is None else temperature
+        }
+        if tools:
+            payload["tools"] = tools
+            payload["tool_choice"] = "auto"
+        if stream:
+            payload["stream"] = True
+            payload["stream_options"] = {"include_usage": True}
+
+        logger.debug(f"Request URL: {self.completions_url}")
+        logger.debug(f"Request Payload: {json.dumps(payload)[:1000]}")
+
+        for attempt in range(self.max_retries + 1):
+            request = self.client.build_request("POST", self.completions_url, json=payload)
+            response = await self.client.send(request, stream=True)
+            try:
+                logger.debug(f"Response Status Code: {response.status_code}")
+                if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                    delay = self._retry_delay(response, attempt)
+                    logger.warning(f"vLLM returned {response.status_code}, retrying in {delay:.1f}s")
+                else:
+                    if response.is_error:
+                        await response.aread()
+                    response.raise_for_status()
+                    if stream:
+                        return await self._read_stream(response)
+
+                    await response.aread()
+                    result = response.json()
+                    logger.debug(f"Response Body: {response.text[:1000]}")
+                    choices = result.get("choices") or []
+                    message = choices[0]["message"] if choices else {}
+                    return {
+                        "content": message.get("content"),
+                        "tool_calls": message.get("tool_calls") or [],
+                        "usage": result.get("usage") or {}
+                    }
+            finally:
+                await response.aclose()
+            await asyncio.sleep(delay)
+
+    def _retry_delay(self, response, attempt):
+        """The `Retry-After` of a response in seconds, or the exponential backoff of the attempt."""
+        try:
+            return float(response.headers["Retry-After"])
+        except (KeyError, ValueError):
+            return self.backoff_factor * (2 ** attempt)
+
+    @staticmethod
+    async def _read_stream(response):
+        """Accumulates the content and tool call deltas of a server-sent events completion stream."""
+        parts = []
+        tool_calls = {}
+        usage = {}
+        async for line in response.aiter_lines():
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            chunk = json.loads(data)
+            for choice in chunk.get("choices") or []:
+                delta = choice.get("delta") or {}
+                if delta.get("content"):
+                    parts.append(delta["content"])
+                # Tool calls arrive as fragments keyed by their index, the arguments in several pieces
+                for fragment in delta.get("tool_calls") or []:
+                    call = tool_calls.setdefault(fragment.get("index", 0), {"id": None, "type": "function", "function": {"name": None, "arguments": ""}})
+                    call["id"] = fragment.get("id") or call["id"]
+                    function = fragment.get("function") or {}
+                    call["function"]["name"] = function.get("name") or call["function"]["name"]
+                    call["function"]["arguments"] += function.get("arguments") or ""
+            if chunk.get("usage"):
+                usage = chunk["usage"]
+        return {
+            "content": "".join(parts) if parts else None,
+            "tool_calls": [tool_calls[index] for index in sorted(tool_calls)],
+            "usage": usage
+        }
@@ -1,8 +1,22 @@
+import asyncio
+import os
 import re
-import subprocess
 import shlex
-from clients.llm_client import invoke_claude, invoke_deepseek_vllm
+from clients.llm_client import context_builder
+from clients.model_router import ModelRequestError, model_router
+from clients.tool_calling import TOOLS, tool_command
 from utils.logger import logger
+from utils.tracing import span
+
+# Use native tool calling (Bedrock Converse, vLLM) instead of parsing 'KUBECTL_COMMAND:' lines
+TOOL_CALLING = os.getenv("TOOL_CALLING", "true").lower() == "true"
+# Rounds of kubectl calls before the model has to answer, and calls run per round
+TOOL_MAX_ITERATIONS = int(os.getenv("TOOL_MAX_ITERATIONS", "4"))
+TOOL_MAX_CALLS_PER_TURN = int(os.getenv("TOOL_MAX_CALLS_PER_TURN", "8"))
+
+TOOL_NAMES = {tool["name"] for tool in TOOLS}
+
+LAST_ROUND_NOTE = "This was the last round of kubectl commands, answer with the information collected so far."
 
 
 def extract_kubectl_commands(response_text):
@@ -23,6 +37,23 @@ def extract_kubectl_commands(response_text):
     return matches if matches else []
 
 
+def normalize_command(command):
+    """
+    Normalizes the whitespace and quoting of a kubectl command, so the same command written by the
+    model and by the pre-fetch stage compare equal.
+
+    Parameters:
+        command (str): The kubectl command.
+
+    Returns:
+        str: The normalized command.
+    """
+    try:
+        return " ".join(shlex.split(command))
+    except ValueError:
+        return command.strip()
+
+
 def validate_kubectl_command(command):
     """
     Validates that the kubectl command contains only allowed operations.
@@ -44,87 +75,189 @@ def validate_kubectl_command(command):
     return operation in ALLOWED_OPERATIONS
 
 
-def execute_kubectl_command(command_str):
+async def execute_kubectl_command(command_str, timeout=None):
     """
-    Executes a single kubectl command and returns the output or error.
+    Executes a single kubectl command as an asyncio subprocess and returns the output or error.
 
     Parameters:
         command_str (str): The kubectl command as a string.
+        timeout (float, optional): Seconds before the command is killed. Default is
+            KUBECTL_TIMEOUT_SECONDS (30).
 
     Returns:
         str: The output of the kubectl command if successful, or an error message if the command fails.
     """
-    try:
-        # Validate command before execution
-        if not validate_kubectl_command(command_str):
-            return "Error: Command not allowed for security reasons"
-
-        # Escape the command string
-        escaped_command = ' '.join(shlex.quote(part)
-                                   for part in shlex.split(command_str))
-        command_parts = shlex.split(escaped_command)
-
-        result = subprocess.run(
-            command_parts,
-            capture_output=True,
-            text=True,
-            check=True,
-            shell=False
-        )
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        return f"Error executing command: {e.stderr}"
-    except Exception as e:
-        return f"Error processing command: {str(e)}"
-
-
-def generate_response_with_kubectl(prompt_text, model_option="claude"):
+    timeout = timeout or float(os.getenv("KUBECTL_TIMEOUT_SECONDS", "30"))
+    with span("execute_kubectl_command", command=command_str) as kubectl_span:
+        try:
+            # Validate command before execution
+            if not validate_kubectl_command(command_str):
+                kubectl_span.set_error("command not allowed")
+                return "Error: Command not allowed for security reasons"
+
+            # Escape the command string
+            escaped_command = ' '.join(shlex.quote(part)
+                                       for part in shlex.split(command_str))
+            command_parts = shlex.split(escaped_command)
+
+            process = await asyncio.create_subprocess_exec(
+                *command_parts,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                kubectl_span.set_error(f"timed out after {timeout}s")
+                return f"Error executing command: timed out after {timeout}s"
+
+            if process.returncode != 0:
+                kubectl_span.set_error(f"exit status {process.returncode}")
+                return f"Error executing command: {stderr.decode(errors='replace')}"
+            output = stdout.decode(errors='replace')
+            kubectl_span.set(output_bytes=len(output))
+            return output
+        except Exception as e:
+            kubectl_span.set_error(e)
+            return f"Error processing command: {str(e)}"
+
+
+def malformed(tool_call):
+    """Tells whether a tool call names no known tool or its arguments are not a JSON object."""
+    return tool_call["name"] not in TOOL_NAMES or not isinstance(tool_call["input"], dict)
+
+
+async def run_tool_calls(tool_calls, prefetcher=None, query=None):
+    """
+    Runs the kubectl tool calls of a model turn concurrently.
+
+    Parameters:
+        tool_calls (list): The `{"id", "name", "input"}` tool calls, in the order the model emitted them.
+        prefetcher (KubectlPrefetcher, optional): The pre-fetch stage of the request, whose output is
+            reused instead of running a command again.
+        query (str, optional): The prompt, used to keep the most relevant lines of large outputs.
+
+    Returns:
+        list: `{"id", "command", "output", "error"}` tool results in the same order. Invalid calls get
+            an error result the model can correct.
+    """
+    results, runnable = [], []
+    for i, call in enumerate(tool_calls):
+        result = {"id": call["id"], "command": None, "output": "", "error": True}
+        results.append(result)
+        if i >= TOOL_MAX_CALLS_PER_TURN:
+            result["output"] = f"Error: at most {TOOL_MAX_CALLS_PER_TURN} kubectl calls are run per turn"
+            continue
+        try:
+            result["command"] = tool_command(call["name"], call["input"])
+        except ValueError as e:
+            result["output"] = f"Error: {e}"
+            continue
+        if prefetcher is not None and prefetcher.in_prompt(result["command"]):
+            result.update(output="Already included under 'Cluster state' in the first message.", error=False)
+            continue
+        runnable.append(result)
+
+    outputs = await asyncio.gather(*(
+        prefetcher.run(result["command"]) if prefetcher is not None else execute_kubectl_command(result["command"])
+        for result in runnable
+    ))
+    fitted = context_builder.build_tool_results([(result["command"], output) for result, output in zip(runnable, outputs)], query=query)
+    for result, output, text in zip(runnable, outputs, fitted):
+        result.update(output=text, error=output.startswith("Error"))
+    return results
+
+
+async def generate_response_with_kubectl(prompt_text, model_option="auto", prefetcher=None, tool_use=None):
     """
-    Generates a response using a model (Claude or Deepseek), executes any kubectl commands found in the response,
-    and sends the kubectl results back to the model for further interpretation.
+    Generates a response using a model (Claude or Deepseek), running the kubectl commands it asks for
+    and returning their output to it until it answers.
+
+    The model calls the typed `kubectl_get`, `kubectl_describe` and `kubectl_logs` tools through the
+    Bedrock Converse API or vLLM tool calling. All calls of a turn run concurrently, and their
+    results are appended to the conversation instead of rebuilding the prompt. Models without tool
+    support write 'KUBECTL_COMMAND:' lines instead, which are run once and returned as text. When a
+    model rejects the tool request or only emits malformed tool calls on the first call, the prompt
+    is sent again without tools and falls back to those lines; later malformed calls end the loop.
 
     Parameters:
         prompt_text (str): The input prompt for the model.
-        model_option (str): The model option to use ("claude" or "deepseek"). Default is "claude".
+        model_option (str): The model to use ("claude", "deepseek" or "auto"). With "auto" the model router
+            picks the backend with the best recent latency and error rate. Default is "auto".
+        prefetcher (KubectlPrefetcher, optional): The pre-fetch stage of the request. Commands whose
+            output is already in the prompt are not run again, and when the model asks for nothing
+            else the second model call is skipped. Commands pre-fetched after the prompt was built
+            reuse their output.
+        tool_use (bool, optional): Whether to offer the kubectl tools, defaults to `TOOL_CALLING`.
 
     Returns:
         str: The final response from the model, including interpretation of kubectl output.
+
+    Raises:
+        ModelRouterError: If no model backend could answer.
     """
-    # Step 1: Invoke Claude with the initial prompt
-    initial_response = ""
-    if model_option == 'claude':
-        initial_response = invoke_claude(prompt_text)
-    else:
-        initial_response = invoke_deepseek_vllm(prompt_text)
-
-    logger.debug(f"Initial Response:\n{initial_response}\n")
-
-    # Step 2: Extract any kubectl commands from the model's response
-    kubectl_commands = extract_kubectl_commands(initial_response)
-    # Step 3: If kubectl commands are found, execute them
-    kubectl_output = []
-    if kubectl_commands:
-        logger.info(f"Parsed commands:\n{kubectl_commands}\n")
-        for command in kubectl_commands:
-            output = execute_kubectl_command(command)
-            kubectl_output.append(f"Output of '{command}':\n{output}")
-
-        # Combine the initial model response with the kubectl output
-        combined_output = prompt_text + "\n\n" + \
-            initial_response + "\n\n" + "\n".join(kubectl_output)
-
-        # Step 4: Pass the combined result back to Claude for interpretation
-        followup_prompt = f"{combined_output}\n\nPlease interpret the kubectl output above without issuing new kubectl commands."
-
-        # Step 5: Invoke Claude again with the combined response and kubectl results
-        final_response = ""
-        if model_option == 'claude':
-            final_response = invoke_claude(followup_prompt)
-        else:
-            final_response = invoke_deepseek_vllm(followup_prompt)
-
-        logger.debug(f"Final Response:\n{initial_response}\n")
-        return final_response
-
-    # If no kubectl commands were found, return the initial response
-    return initial_response
+    tools = TOOLS if (TOOL_CALLING if tool_use is None else tool_use) else None
+    messages = [{"role": "user", "text": prompt_text}]
+    used_model = None
+    parsed_commands = False
+
+    with span("tool_loop", tools=bool(tools)) as loop_span:
+        for iteration in range(TOOL_MAX_ITERATIONS + 1):
+            loop_span.set(iterations=iteration + 1)
+            # The first call is hedged against a slow backend. In "auto" mode the conversation stays on
+            # the model that answered, and the router fails over if it becomes unavailable
+            try:
+                turn, used_model = await model_router.converse(messages, tools, model_option, hedge=iteration == 0, prefer=used_model)
+            except ModelRequestError as e:
+                # e.g. a vLLM started without a tool call parser rejects the tools with a 400
+                if not tools or iteration:
+                    raise
+                logger.warning(f"The model rejected the tool request, retrying without tools: {e}")
+                tools = None
+                turn, used_model = await model_router.converse(messages, None, model_option, prefer=used_model)
+            logger.debug(f"Response ({used_model}, iteration {iteration + 1}):\n{turn['text']}\n")
+
+            if tools and turn["tool_calls"] and all(malformed(call) for call in turn["tool_calls"]):
+                # Once the conversation holds tool turns Bedrock rejects it without a tool config, stop instead
+                if iteration:
+                    logger.warning(f"Only malformed tool calls from {used_model} after {iteration} rounds, stopping")
+                    loop_span.set(malformed=True)
+                    return turn["text"] or "The model could not request more kubectl output, please try again or narrow down the question."
+                logger.warning(f"Only malformed tool calls from {used_model}, retrying without tools")
+                tools = None
+                turn, used_model = await model_router.converse(messages, None, model_option, prefer=used_model)
+            messages.append(turn)
+
+            if turn["tool_calls"]:
+                if iteration == TOOL_MAX_ITERATIONS:
+                    break
+                logger.info(f"Tool calls:\n{[(call['name'], call['input']) for call in turn['tool_calls']]}\n")
+                results = await run_tool_calls(turn["tool_calls"], prefetcher, query=prompt_text)
+                last_round = iteration + 1 == TOOL_MAX_ITERATIONS
+                messages.append({"role": "user", "text": LAST_ROUND_NOTE if last_round else "", "tool_results": results})
+                continue
+
+            # Fallback for models without tool support
+            kubectl_commands = [] if parsed_commands else extract_kubectl_commands(turn["text"])
+            if prefetcher is not None:
+                requested = len(kubectl_commands)
+                kubectl_commands = [command for command in kubectl_commands if not prefetcher.in_prompt(command)]
+                if requested and not kubectl_commands:
+                    logger.info("All requested kubectl output was pre-fetched into the prompt, skipping the follow-up call")
+            if not kubectl_commands or iteration == TOOL_MAX_ITERATIONS:
+                return turn["text"]
+
+            logger.info(f"Parsed commands:\n{kubectl_commands}\n")
+            parsed_commands = True
+            outputs = await asyncio.gather(*(
+                prefetcher.run(command) if prefetcher is not None else execute_kubectl_command(command)
+                for command in kubectl_commands
+            ))
+            kubectl_section = context_builder.build_kubectl_section(list(zip(kubectl_commands, outputs)), query=prompt_text)
+            messages.append({"role": "user", "text": f"{kubectl_section}\n\nPlease interpret the kubectl output above without issuing new kubectl commands."})
+
+        logger.warning(f"The model still requested kubectl commands after {TOOL_MAX_ITERATIONS} rounds")
+        loop_span.set(capped=True)
+        return turn["text"] or f"Stopped after {TOOL_MAX_ITERATIONS} rounds of kubectl commands without a final answer, please narrow down the question."
@@ -1,11 +1,24 @@
-import boto3
+import httpx
 import json
-import requests
 import os
 from utils.logger import logger
+from utils.tracing import span, record_token_usage
+from utils.resilience import bedrock_dependency, guard
+from clients.bedrock_client import AsyncBedrockRuntime
+from clients.context_builder import ContextBuilder
+from clients.deepseek_client import DeepSeekClient
+from clients.tool_calling import (bedrock_tool_config, from_bedrock_message, from_openai_message, openai_tools,
+                                  to_bedrock_messages, to_openai_messages)
 
+context_builder = ContextBuilder()
+deepseek_client = DeepSeekClient()
+bedrock_runtime = AsyncBedrockRuntime()
 
-def encode_query(query):
+CLAUDE_MODEL_ID = 'anthropic.claude-3-sonnet-20240229-v1:0'
+EMBEDDING_MODEL_ID = 'amazon.titan-embed-text-v2:0'
+
+
+async def encode_query(query):
     """
     Generates an embedding for the provided query using Amazon Bedrock's embedding model.
 
@@ -14,27 +27,24 @@ def encode_query(query):
 
     Returns:
         list: The embedding generated by the Bedrock model.
+
+    Raises:
+        DependencyUnavailableError: If the embedding model's circuit breaker is open or its rate
+            limit is exhausted.
     """
-    # Initialize Bedrock client
-    bedrock_runtime = boto3.client(
-        service_name='bedrock-runtime'
-    )
-
-    # Call Bedrock to generate embedding
-    response = bedrock_runtime.invoke_model(
-        modelId="amazon.titan-embed-text-v2:0",
-        contentType="application/json",
-        accept="application/json",
-        body=json.dumps({"inputText": query})
-    )
-
-    # Extract embedding from response
-    embedding = json.loads(response.get('body').read())['embedding']
+    with span("encode_query", model=EMBEDDING_MODEL_ID) as encode_span:
+        # Call Bedrock to generate embedding
+        async with guard(bedrock_dependency(EMBEDDING_MODEL_ID), model_id=EMBEDDING_MODEL_ID):
+            response_body = await bedrock_runtime.invoke_model(EMBEDDING_MODEL_ID, {"inputText": query})
+
+        # Extract embedding from response
+        embedding = response_body['embedding']
+        encode_span.set(input_tokens=response_body.get('inputTextTokenCount'))
 
     return embedding
 
 
-def invoke_claude(prompt_text):
+async def invoke_claude(prompt_text):
     """
     Sends a prompt to the Claude model via Amazon Bedrock and returns the model's response.
 
@@ -43,10 +53,10 @@ def invoke_claude(prompt_text):
 
     Returns:
         str: The text content of the response generated by Claude.
-    """
-    # Initialize the Bedrock client
-    bedrock_client = boto3.client(service_name='bedrock-runtime')
 
+    Raises:
+        DependencyUnavailableError: If Claude's circuit breaker is open or its rate limit is exhausted.
+    """
     # Define the request body for the Claude model
     body = {
         "anthropic_version": "bedrock-2023-05-31",
@@ -64,76 +74,138 @@ def invoke_claude(prompt_text):
         ]
     }
 
-    # Invoke the Claude model through the Bedrock API
-    response = bedrock_client.invoke_model(
-        modelId='anthropic.claude-3-sonnet-20240229-v1:0',
-        contentType='application/json',
-        accept='application/json',
-        body=json.dumps(body)
-    )
+    with span("invoke_llm", model="claude", model_id=CLAUDE_MODEL_ID) as llm_span:
+        # Invoke the Claude model through the Bedrock API
+        async with guard(bedrock_dependency(CLAUDE_MODEL_ID), model_id=CLAUDE_MODEL_ID):
+            response_body = await bedrock_runtime.invoke_model(CLAUDE_MODEL_ID, body)
+
+        # Parse the model's response
+        response_text = response_body['content'][0]['text']
 
-    # Parse the model's response
-    response_body = json.loads(response['body'].read())
-    response_text = response_body['content'][0]['text']
+        usage = response_body.get('usage', {})
+        record_token_usage(llm_span, "claude", usage.get('input_tokens'), usage.get('output_tokens'))
 
     return response_text
 
 
-def invoke_deepseek_vllm(prompt_text):
+async def converse_claude(messages, tools=None):
     """
-    Sends a prompt to the DeepSeek model hosted with vLLM via a POST request and returns the model's response.
+    Sends a conversation to the Claude model through the Bedrock Converse API and returns its next turn.
 
     Parameters:
-        prompt_text (str): The input prompt to be sent to the DeepSeek model.
+        messages (list): The provider-neutral conversation, see `clients.tool_calling`.
+        tools (list, optional): The tools the model may call.
 
     Returns:
-        str: The response content from the DeepSeek model, or an error message if the request fails.
+        dict: The assistant turn, `{"role": "assistant", "text": str, "tool_calls": list}`.
+
+    Raises:
+        DependencyUnavailableError: If Claude's circuit breaker is open or its rate limit is exhausted.
     """
-    url = os.getenv("VLLM_ENDPOINT", "http://deepseek-gpu-vllm-chart.deepseek.svc.cluster.local:80")
-    url_complete = f"{url}/v1/chat/completions"
+    with span("invoke_llm", model="claude", model_id=CLAUDE_MODEL_ID, tools=bool(tools)) as llm_span:
+        async with guard(bedrock_dependency(CLAUDE_MODEL_ID), model_id=CLAUDE_MODEL_ID):
+            response_body = await bedrock_runtime.converse(
+                CLAUDE_MODEL_ID,
+                to_bedrock_messages(messages),
+                tool_config=bedrock_tool_config(tools) if tools else None,
+                max_tokens=1000
+            )
 
-    headers = {
-        "Content-Type": "application/json"
-    }
+        turn = from_bedrock_message(response_body["output"]["message"])
+        usage = response_body.get("usage", {})
+        record_token_usage(llm_span, "claude", usage.get("inputTokens"), usage.get("outputTokens"))
+        llm_span.set(stop_reason=response_body.get("stopReason"), tool_calls=len(turn["tool_calls"]))
 
-    payload = {
-        "model": "deepseek-ai/DeepSeek-R1-Distill-Llama-8B",
-        "messages": [
-            {
-                "role": "user",
-                "content": prompt_text
-            }
-        ]
-    }
+    return turn
 
-    try:
-        response = requests.post(url_complete, headers=headers, json=payload)
 
-        # Log detailed debug information
-        logger.debug(f"Request URL: {url_complete}")
-        logger.debug(f"Request Headers: {headers}")
-        logger.debug(f"Request Payload: {json.dumps(payload, indent=2)}")
-        logger.debug(f"Response Status Code: {response.status_code}")
-        logger.debug(f"Response Headers: {dict(response.headers)}")
+async def converse_deepseek(messages, tools=None, stream=None):
+    """
+    Sends a conversation to the DeepSeek model hosted with vLLM and returns its next turn, raising on failure.
+
+    Parameters:
+        messages (list): The provider-neutral conversation, see `clients.tool_calling`.
+        tools (list, optional): The tools the model may call. Without tools, earlier tool results
+            are sent as text.
+        stream (bool, optional): Whether to stream the completion, defaults to `DEEPSEEK_STREAM`.
+
+    Returns:
+        dict: The assistant turn, `{"role": "assistant", "text": str, "tool_calls": list}`.
+
+    Raises:
+        httpx.HTTPError: If the request fails after retries.
+    """
+    if stream is None:
+        stream = os.getenv("DEEPSEEK_STREAM", "false").lower() == "true"
+
+    with span("invoke_llm", model="deepseek", model_id=deepseek_client.model, stream=stream, tools=bool(tools)) as llm_span:
+        result = await deepseek_client.chat_messages(
+            to_openai_messages(messages, with_tools=bool(tools)),
+            tools=openai_tools(tools) if tools else None,
+            stream=stream
+        )
+
+        usage = result["usage"]
+        record_token_usage(llm_span, "deepseek", usage.get("prompt_tokens"), usage.get("completion_tokens"))
+        turn = from_openai_message(result)
+        llm_span.set(tool_calls=len(turn["tool_calls"]))
+
+    return turn
+
+
+async def complete_deepseek(prompt_text, max_tokens=None, temperature=None, stream=None):
+    """
+    Sends a prompt to the DeepSeek model hosted with vLLM and returns the model's response, raising on failure.
+
+    Requests go through a shared `DeepSeekClient`, which reuses pooled keep-alive connections,
+    applies connect/read timeouts and retries 429/503 responses with backoff.
 
-        try:
-            logger.info(f"Response Body: {response.text}")
-        except:
-            logger.error("Could not print response body")
+    Parameters:
+        prompt_text (str): The input prompt to be sent to the DeepSeek model.
+        max_tokens (int, optional): The completion token limit, defaults to `DEEPSEEK_MAX_TOKENS`.
+        temperature (float, optional): The sampling temperature, defaults to `DEEPSEEK_TEMPERATURE`.
+        stream (bool, optional): Whether to stream the completion, defaults to `DEEPSEEK_STREAM`.
+
+    Returns:
+        str: The response content from the DeepSeek model.
+
+    Raises:
+        httpx.HTTPError: If the request fails after retries.
+    """
+    if stream is None:
+        stream = os.getenv("DEEPSEEK_STREAM", "false").lower() == "true"
 
-        response.raise_for_status()
+    with span("invoke_llm", model="deepseek", model_id=deepseek_client.model, stream=stream) as llm_span:
+        result = await deepseek_client.chat(prompt_text, max_tokens=max_tokens, temperature=temperature, stream=stream)
 
-        result = response.json()
+        usage = result["usage"]
+        record_token_usage(llm_span, "deepseek", usage.get("prompt_tokens"), usage.get("completion_tokens"))
 
-        if "choices" in result and len(result["choices"]) > 0:
-            return result["choices"][0]["message"]["content"]
+        if result["content"] is not None:
+            return result["content"]
         else:
             return "No response content found"
 
-    except requests.exceptions.RequestException as e:
+
+async def invoke_deepseek_vllm(prompt_text, max_tokens=None, temperature=None, stream=None):
+    """
+    Sends a prompt to the DeepSeek model hosted with vLLM and returns the model's response.
+
+    Parameters:
+        prompt_text (str): The input prompt to be sent to the DeepSeek model.
+        max_tokens (int, optional): The completion token limit, defaults to `DEEPSEEK_MAX_TOKENS`.
+        temperature (float, optional): The sampling temperature, defaults to `DEEPSEEK_TEMPERATURE`.
+        stream (bool, optional): Whether to stream the completion, defaults to `DEEPSEEK_STREAM`.
+
+    Returns:
+        str: The response content from the DeepSeek model, or an error message if the request fails.
+    """
+    try:
+        return await complete_deepseek(prompt_text, max_tokens=max_tokens, temperature=temperature, stream=stream)
+    except httpx.HTTPError as e:
         error_msg = f"Error making request to vLLM: {str(e)}"
-        if hasattr(e.response, 'text'):
-            error_msg += f"\nResponse body: {e.response.text}"
+        if getattr(e, 'response', None) is not None:
+            error_msg += f"\nResponse body: {e.response.text[:1000]}"
         logger.error(error_msg)
         return f"Error: {str(e)}"
     except json.JSONDecodeError as e:
@@ -144,21 +216,38 @@ def invoke_deepseek_vllm(prompt_text):
         return f"Unexpected error: {str(e)}"
 
 
-def construct_prompt(query, retrieved_docs):
+def construct_prompt(query, retrieved_docs, top_issues=None, window_minutes=None, kubectl_output=None, history=None,
+                     tool_use=False):
     """
     Constructs a prompt for the model, including a user query and relevant context.
 
     Parameters:
         query (str): The user's query to be included in the prompt.
-        retrieved_docs (list): A list of relevant documents or context to include in the prompt.
+        retrieved_docs (list): A list of relevant documents or context to include in the prompt,
+            deduplicated and capped to the logs token budget.
+        top_issues (list, optional): The most frequent error signatures per pod, listed before the logs.
+        window_minutes (int, optional): The time window of the top issues.
+        kubectl_output (list, optional): `(command, output)` tuples already fetched from the cluster,
+            capped to the kubectl token budget.
+        history (list, optional): The earlier conversation of a chat as text parts, oldest first,
+            capped to the history token budget.
+        tool_use (bool): Whether the model is offered the kubectl tools. Otherwise it is asked to
+            write 'KUBECTL_COMMAND:' lines, which are also parsed as a fallback in tool mode.
 
     Returns:
         str: The constructed prompt, including the user query and any relevant context.
     """
-    if not retrieved_docs:
-        context = "No relevant logs found."
-    else:
-        context = "\n".join(retrieved_docs)
+    context = context_builder.build_logs_section(retrieved_docs)
+    issues = context_builder.build_top_issues_section(top_issues, window_minutes)
+    if issues:
+        context = f"{issues}\n\n{context}"
 
-    kubectl_prompt = "When needed Generate a kubectl command to get more details about the relevant logs, use a key 'KUBECTL_COMMAND: command' if true for to parse, make sure that you have real pod names not templates"
-    return f"Instructions: {kubectl_prompt} \n\nUser Query: {query} \n\nContext:\n{context}\n\nResponse:"
+    if tool_use:
+        kubectl_prompt = "When needed call the kubectl tools to get more details about the relevant logs, several at once when they are independent, make sure that you have real pod names not templates. If no tools are available, use a key 'KUBECTL_COMMAND: command' instead"
+    else:
+        kubectl_prompt = "When needed Generate a kubectl command to get more details about the relevant logs, use a key 'KUBECTL_COMMAND: command' if true for to parse, make sure that you have real pod names not templates"
+    if kubectl_output:
+        context = f"{context}\n\nCluster state:\n{context_builder.build_kubectl_section(kubectl_output, query=query)}"
+        kubectl_prompt += ". The output of the kubectl commands under 'Cluster state' was already collected, only request commands for information that is not there"
+    conversation = f"Conversation so far:\n{context_builder.build_history_section(*history)}\n\n" if history else ""
+    return f"Instructions: {kubectl_prompt} \n\n{conversation}User Query: {query} \n\nContext:\n{context}\n\nResponse:"
@@ -0,0 +1,89 @@
+import io
+import os
+import threading
+from collections import OrderedDict
+import boto3
+from utils.logger import logger
+from utils.tracing import span
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+
+class LogArchive:
+    """
+    Reads full log lines from the Parquet archive written by the ingestion pipeline.
+
+    The vector index keeps a snippet of each archived line and the key of its archive file, so
+    full lines are only loaded for the documents that end up in a prompt. Files come from the
+    ARCHIVE_BUCKET S3 bucket, or from the ARCHIVE_PATH directory when set (local runs and tests),
+    and the most recently used ones are kept in memory.
+
+    Attributes:
+        bucket (str): The S3 bucket of the archive.
+        path (str): The local directory of the archive, used instead of S3 when set.
+        max_files (int): The number of archive files kept in memory.
+    """
+    def __init__(self, bucket=None, path=None, max_files=None):
+        self.bucket = bucket if bucket is not None else os.getenv("ARCHIVE_BUCKET", "")
+        self.path = path if path is not None else os.getenv("ARCHIVE_PATH", "")
+        self.max_files = max_files if max_files is not None else int(os.getenv("ARCHIVE_CACHE_FILES", "32"))
+        self._files = OrderedDict()
+        self._lock = threading.Lock()
+        self._s3 = None
+
+    @property
+    def enabled(self):
+        return pq is not None and bool(self.bucket or self.path)
+
+    def fetch(self, references):
+        """
+        Loads the full lines of archived documents.
+
+        Parameters:
+            references (list): `(archive key, document id)` tuples.
+
+        Returns:
+            dict: Document id to full log line, for the lines that could be loaded.
+        """
+        if not self.enabled or not references:
+            return {}
+
+        ids_by_key = {}
+        for key, doc_id in references:
+            ids_by_key.setdefault(key, set()).add(doc_id)
+
+        lines = {}
+        with span("load_archived_logs", files=len(ids_by_key), lines=len(references)):
+            for key, ids in ids_by_key.items():
+                try:
+                    logs = self._load(key)
+                except Exception as e:
+                    logger.warning(f"Error reading archived logs {key}: {str(e)}")
+                    continue
+                lines.update({doc_id: logs[doc_id] for doc_id in ids if doc_id in logs})
+        return lines
+
+    def _load(self, key):
+        """Returns the id to log mapping of an archive file, reading it on a cache miss."""
+        with self._lock:
+            if key in self._files:
+                self._files.move_to_end(key)
+                return self._files[key]
+
+        if self.path:
+            table = pq.read_table(os.path.join(self.path, key), columns=["id", "log"])
+        else:
+            if self._s3 is None:
+                self._s3 = boto3.client("s3")
+            body = self._s3.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+            table = pq.read_table(io.BytesIO(body), columns=["id", "log"])
+        logs = dict(zip(table.column("id").to_pylist(), table.column("log").to_pylist()))
+
+        with self._lock:
+            self._files[key] = logs
+            while len(self._files) > self.max_files:
+                self._files.popitem(last=False)
+        return logs
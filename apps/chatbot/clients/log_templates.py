@@ -0,0 +1,150 @@
+import os
+import re
+
+WILDCARD = "<*>"
+
+# Tokens that are variables whatever their position: anything containing a digit (timestamps,
+# IDs, pod hashes, IPs, counters), as in Drain's preprocessing step
+VARIABLE_TOKEN = re.compile(r"\d")
+
+# Values not worth listing in a prompt: timestamps, durations and counters
+UNINFORMATIVE_VALUE = re.compile(r'^[\d:.,TZ+\-/"\[\]()ms]*$')
+
+# Token separators, commas included so the fields of compact JSON records become separate tokens
+SEPARATORS = re.compile(r"[\s,]+")
+
+
+def tokenize(line):
+    """Splits a log line into tokens."""
+    return [token for token in SEPARATORS.split(line.strip()) if token]
+
+
+def display_value(token):
+    """Returns the value part of a token, without JSON quoting or a leading `"key":`."""
+    value = token.strip('{}[]"')
+    if '":"' in value:
+        value = value.rsplit('":"', 1)[1]
+    return value
+
+
+class LogTemplate:
+    """
+    A group of log lines sharing a template, e.g. `Liveness probe failed for pod <*> after <*>`.
+
+    Attributes:
+        tokens (list): The template tokens, with `<*>` in the parameter slots.
+        count (int): The number of lines in the group.
+        sample (str): The first line of the group, kept verbatim so real names stay in the prompt.
+        values (dict): Parameter slot position to the distinct values seen there, in order.
+    """
+    def __init__(self, tokens, line):
+        self.tokens = list(tokens)
+        self.count = 1
+        self.sample = line
+        self.values = {}
+
+    @property
+    def template(self):
+        return " ".join(self.tokens)
+
+    def similarity(self, tokens):
+        """Returns the fraction of positions where the tokens match the template's constant tokens."""
+        matches = sum(1 for a, b in zip(self.tokens, tokens) if a == b and a != WILDCARD)
+        return matches / len(tokens) if tokens else 1.0
+
+    def add(self, tokens, raw_tokens, max_values):
+        """Merges a line into the template, turning positions that differ into parameter slots."""
+        self.count += 1
+        sample_tokens = tokenize(self.sample)
+        for position, token in enumerate(tokens):
+            if self.tokens[position] != token:
+                self.tokens[position] = WILDCARD
+            value = display_value(raw_tokens[position])
+            if self.tokens[position] == WILDCARD and raw_tokens[position] != sample_tokens[position] and not UNINFORMATIVE_VALUE.match(value):
+                values = self.values.setdefault(position, [])
+                if value not in values and len(values) < max_values:
+                    values.append(value)
+
+    def describe(self):
+        """
+        Formats the group for a prompt: the sample line, then how many similar lines it stands for
+        and the values that varied.
+
+        Returns:
+            str: The sample line, annotated when the group has more than one line.
+        """
+        if self.count == 1:
+            return self.sample
+        varying = [value for values in self.values.values() for value in values]
+        detail = f", other values: {', '.join(varying)}" if varying else ""
+        return f"{self.sample} [+{self.count - 1} similar lines{detail}]"
+
+
+class TemplateMiner:
+    """
+    An online Drain-style log template miner.
+
+    Lines are split into whitespace tokens and routed by token count and first constant token, then
+    joined to the most similar template of that group when at least `similarity_threshold` of their
+    tokens match, or start a new template otherwise.
+
+    Attributes:
+        similarity_threshold (float): The minimum fraction of matching tokens to join a template.
+        max_values (int): The number of distinct parameter values kept per slot.
+    """
+    def __init__(self, similarity_threshold=None, max_values=3):
+        self.similarity_threshold = similarity_threshold if similarity_threshold is not None else float(os.getenv("LOG_TEMPLATE_SIMILARITY", "0.5"))
+        self.max_values = max_values
+        self.templates = []
+        self._groups = {}
+
+    @staticmethod
+    def _mask(raw_tokens):
+        return [WILDCARD if VARIABLE_TOKEN.search(token) else token for token in raw_tokens]
+
+    def add(self, line):
+        """
+        Adds a log line.
+
+        Parameters:
+            line (str): The log line.
+
+        Returns:
+            LogTemplate: The template the line was grouped into.
+        """
+        raw_tokens = tokenize(line)
+        tokens = self._mask(raw_tokens)
+        first = tokens[0] if tokens else ""
+        group = self._groups.setdefault((len(tokens), first), [])
+
+        best, best_similarity = None, self.similarity_threshold
+        for template in group:
+            similarity = template.similarity(tokens)
+            if similarity >= best_similarity:
+                best, best_similarity = template, similarity
+        if best is not None:
+            best.add(tokens, raw_tokens, self.max_values)
+            return best
+
+        template = LogTemplate(tokens, line)
+        group.append(template)
+        self.templates.append(template)
+        return template
+
+
+def mine_templates(lines, similarity_threshold=None):
+    """
+    Groups log lines into templates.
+
+    Parameters:
+        lines (list): The log lines, most relevant first.
+        similarity_threshold (float, optional): See `TemplateMiner`, LOG_TEMPLATE_SIMILARITY by default.
+
+    Returns:
+        list: The `LogTemplate`s in order of their first line, so retrieval ranking is preserved.
+    """
+    miner = TemplateMiner(similarity_threshold)
+    for line in lines:
+        if line and line.strip():
+            miner.add(line)
+    return miner.templates
@@ -0,0 +1,310 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+import httpx
+from clients.context_builder import estimate_tokens
+from clients.llm_client import invoke_claude, complete_deepseek, converse_claude, converse_deepseek
+from clients.tool_calling import conversation_text
+from utils.logger import logger
+from utils.resilience import UNAVAILABLE_HTTP_STATUSES
+from utils.resilience import is_unavailable_error as is_dependency_unavailable
+
+
+class ModelRouterError(Exception):
+    """Raised when no model backend could answer a prompt."""
+
+
+class ModelRequestError(ModelRouterError):
+    """Raised when the explicitly chosen model rejected the request itself, e.g. a prompt over its context length."""
+
+
+def is_unavailable_error(error):
+    """
+    Tells whether an error means the backend is throttled, overloaded or unreachable, as opposed to
+    the request itself being invalid.
+
+    Parameters:
+        error (Exception): The error raised by a provider.
+
+    Returns:
+        bool: True for timeouts, throttling, connection and 5xx availability errors, and for calls
+            rejected by an open circuit breaker or exhausted rate limit.
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in UNAVAILABLE_HTTP_STATUSES
+    return is_dependency_unavailable(error)
+
+
+class LatencyTracker:
+    """
+    Keeps a sliding window of recent call outcomes for a provider.
+
+    Attributes:
+        window (int): The number of recent calls considered.
+    """
+    def __init__(self, window=50):
+        self.window = window
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency, ok):
+        with self._lock:
+            self._samples.append((latency, ok))
+
+    def p95(self):
+        """Returns the 95th percentile latency of successful calls in seconds, or None without data."""
+        with self._lock:
+            latencies = sorted(latency for latency, ok in self._samples if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+
+    def error_rate(self):
+        """Returns the fraction of failed calls in the window, 0.0 without data."""
+        with self._lock:
+            samples = list(self._samples)
+        if not samples:
+            return 0.0
+        return sum(1 for _, ok in samples if not ok) / len(samples)
+
+
+class ModelProvider:
+    """
+    Common interface of a model backend.
+
+    Attributes:
+        name (str): The provider name used for routing ("claude", "deepseek").
+        max_prompt_tokens (int): The largest prompt the backend accepts, larger prompts are not routed to it.
+        supports_tools (bool): Whether the backend accepts tool definitions, otherwise conversations
+            are sent without them.
+        tracker (LatencyTracker): Recent latency and error statistics.
+    """
+    def __init__(self, name, max_prompt_tokens, supports_tools=False):
+        self.name = name
+        self.max_prompt_tokens = max_prompt_tokens
+        self.supports_tools = supports_tools
+        self.tracker = LatencyTracker(int(os.getenv("ROUTER_STATS_WINDOW", "50")))
+
+    async def complete(self, prompt_text):
+        """Returns the model response for the prompt, raising on failure."""
+        raise NotImplementedError
+
+    async def complete_turn(self, messages, tools=None):
+        """Returns the next assistant turn of a provider-neutral conversation, raising on failure."""
+        raise NotImplementedError
+
+    async def invoke(self, prompt_text):
+        """Calls `complete`, recording its latency and outcome."""
+        return await self._timed(self.complete(prompt_text))
+
+    async def invoke_turn(self, messages, tools=None):
+        """Calls `complete_turn`, recording its latency and outcome. Tools are dropped if unsupported."""
+        return await self._timed(self.complete_turn(messages, tools if self.supports_tools else None))
+
+    async def _timed(self, call):
+        start = time.perf_counter()
+        try:
+            response = await call
+        except asyncio.CancelledError:
+            # A hedged call that lost the race says nothing about the backend
+            raise
+        except Exception:
+            self.tracker.record(time.perf_counter() - start, ok=False)
+            raise
+        self.tracker.record(time.perf_counter() - start, ok=True)
+        return response
+
+    def accepts(self, prompt_text):
+        return estimate_tokens(prompt_text) <= self.max_prompt_tokens
+
+
+class ClaudeProvider(ModelProvider):
+    """Claude on Amazon Bedrock."""
+    def __init__(self):
+        super().__init__("claude", int(os.getenv("CLAUDE_MAX_PROMPT_TOKENS", "180000")), supports_tools=True)
+
+    async def complete(self, prompt_text):
+        return await invoke_claude(prompt_text)
+
+    async def complete_turn(self, messages, tools=None):
+        return await converse_claude(messages, tools)
+
+
+class DeepSeekProvider(ModelProvider):
+    """
+    DeepSeek served by vLLM in the cluster. The R1 distilled models do not reliably emit tool calls
+    and vLLM needs a tool call parser to accept them, so tool calling is off unless
+    `DEEPSEEK_TOOL_CALLING` is set and the model writes 'KUBECTL_COMMAND:' lines instead.
+    """
+    def __init__(self):
+        super().__init__("deepseek", int(os.getenv("DEEPSEEK_MAX_PROMPT_TOKENS", "12000")),
+                         supports_tools=os.getenv("DEEPSEEK_TOOL_CALLING", "false").lower() == "true")
+
+    async def complete(self, prompt_text):
+        return await complete_deepseek(prompt_text)
+
+    async def complete_turn(self, messages, tools=None):
+        return await converse_deepseek(messages, tools)
+
+
+class ModelRouter:
+    """
+    Routes prompts to a registered model provider, failing over to the others when it is degraded.
+
+    In "auto" mode providers are ranked by recent p95 latency, penalized by their error rate, and
+    providers whose context is too small for the prompt are skipped. An explicit model choice is
+    only sent to that provider, so the answer never silently comes from another model.
+
+    Attributes:
+        providers (dict): The registered providers by name, in registration (preference) order.
+        hedge_after (float): Seconds after which a hedged request is sent to the next provider, 0 disables hedging.
+    """
+    def __init__(self, providers=None, hedge_after=None):
+        self.providers = {}
+        for provider in providers or []:
+            self.register(provider)
+        self.hedge_after = hedge_after if hedge_after is not None else float(os.getenv("ROUTER_HEDGE_AFTER_SECONDS", "0"))
+        self.error_penalty = float(os.getenv("ROUTER_ERROR_PENALTY", "4"))
+
+    def register(self, provider):
+        """Registers a provider under its name."""
+        self.providers[provider.name] = provider
+
+    def candidates(self, prompt_text, model="auto", prefer=None):
+        """
+        Orders the providers to try for a prompt.
+
+        Parameters:
+            prompt_text (str): The prompt to route.
+            model (str): A provider name, or "auto".
+            prefer (str, optional): In "auto" mode, a provider to try first, e.g. the one that
+                answered the previous turn of a conversation.
+
+        Returns:
+            list: The providers in the order they should be tried.
+        """
+        eligible = [provider for provider in self.providers.values() if provider.accepts(prompt_text)]
+        if not eligible:
+            eligible = list(self.providers.values())
+
+        if model != "auto":
+            if model not in self.providers:
+                raise ModelRouterError(f"Unknown model: {model}")
+            return [self.providers[model]]
+
+        def score(position_and_provider):
+            position, provider = position_and_provider
+            p95 = provider.tracker.p95()
+            if p95 is None:
+                # No successful calls: untried providers keep the registration order, failing ones go last
+                base = float("inf") if provider.tracker.error_rate() > 0 else 0.0
+            else:
+                base = p95
+            return (base * (1 + self.error_penalty * provider.tracker.error_rate()), position)
+
+        ranked = [provider for _, provider in sorted(enumerate(eligible), key=score)]
+        if prefer in self.providers:
+            ranked = [self.providers[prefer]] + [provider for provider in ranked if provider.name != prefer]
+        return ranked
+
+    async def invoke(self, prompt_text, model="auto", hedge=False, prefer=None):
+        """
+        Sends a prompt to the best available provider.
+
+        Parameters:
+            prompt_text (str): The prompt.
+            model (str): A provider name, or "auto".
+            hedge (bool): Whether to send a hedged request to the second provider if the first has
+                not answered within `hedge_after` seconds. Only applies in "auto" mode.
+            prefer (str, optional): The provider to try first in "auto" mode, see `candidates`.
+
+        Returns:
+            tuple: `(response_text, provider_name)`.
+
+        Raises:
+            ModelRouterError: If every provider failed. Errors of the provider are wrapped, a
+                `ModelRequestError` means the explicitly chosen model rejected the request.
+        """
+        return await self._route(prompt_text, model, hedge, prefer, lambda provider: provider.invoke(prompt_text))
+
+    async def converse(self, messages, tools=None, model="auto", hedge=False, prefer=None):
+        """
+        Sends a conversation to the best available provider and returns its next turn. Failover and
+        hedging work as for `invoke`, the conversation is provider-neutral so another backend can
+        continue it.
+
+        Parameters:
+            messages (list): The provider-neutral conversation, see `clients.tool_calling`.
+            tools (list, optional): The tools the model may call, dropped for providers without tool support.
+            model (str): A provider name, or "auto".
+            hedge (bool): Whether to hedge the call, see `invoke`.
+            prefer (str, optional): The provider to try first in "auto" mode, see `candidates`.
+
+        Returns:
+            tuple: `(turn, provider_name)`, the turn being `{"role": "assistant", "text", "tool_calls"}`.
+
+        Raises:
+            ModelRouterError: If every provider failed.
+        """
+        return await self._route(conversation_text(messages), model, hedge, prefer,
+                                 lambda provider: provider.invoke_turn(messages, tools))
+
+    async def _route(self, prompt_text, model, hedge, prefer, call):
+        """Calls `call(provider)` on the candidates in order until one succeeds."""
+        candidates = self.candidates(prompt_text, model, prefer)
+        if hedge and model == "auto" and self.hedge_after > 0 and len(candidates) > 1:
+            return await self._invoke_hedged(call, candidates)
+
+        errors = []
+        for provider in candidates:
+            try:
+                return await call(provider), provider.name
+            except Exception as e:
+                errors.append(f"{provider.name}: {e}")
+                if model != "auto" and provider.name == model and not is_unavailable_error(e):
+                    raise ModelRequestError(f"{provider.name}: {e}") from e
+                logger.warning(f"Model {provider.name} failed, trying the next backend: {e}")
+        raise ModelRouterError("; ".join(errors))
+
+    async def _invoke_hedged(self, call, candidates):
+        """Starts the first provider, adds the second after `hedge_after` seconds and returns the first success."""
+        first = asyncio.create_task(call(candidates[0]))
+        tasks = {first: candidates[0]}
+        tried = 1
+        errors = []
+        pending = {first}
+        try:
+            done, _ = await asyncio.wait([first], timeout=self.hedge_after)
+            if not done:
+                logger.info(f"{candidates[0].name} slower than {self.hedge_after}s, hedging with {candidates[1].name}")
+                second = asyncio.create_task(call(candidates[1]))
+                tasks[second] = candidates[1]
+                pending.add(second)
+                tried = 2
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.cancelled():
+                        errors.append(f"{tasks[task].name}: cancelled")
+                    elif task.exception() is None:
+                        return task.result(), tasks[task].name
+                    else:
+                        errors.append(f"{tasks[task].name}: {task.exception()}")
+        finally:
+            # The slower call is no longer needed
+            for task in pending:
+                task.cancel()
+
+        # Every started call failed, try the remaining providers one by one
+        for provider in candidates[tried:]:
+            try:
+                return await call(provider), provider.name
+            except Exception as e:
+                errors.append(f"{provider.name}: {e}")
+        raise ModelRouterError("; ".join(errors))
+
+
+model_router = ModelRouter([ClaudeProvider(), DeepSeekProvider()])
@@ -1,77 +1,134 @@
-from opensearchpy import OpenSearch, RequestsHttpConnection
-from requests_aws4auth import AWS4Auth
-import boto3, os
+from opensearchpy import AsyncOpenSearch, AsyncHttpConnection, AWSV4SignerAsyncAuth
+import asyncio, boto3, os, threading, time
+from clients.log_archive import LogArchive
+from clients.log_templates import mine_templates
 from utils.logger import logger
+from utils.tracing import span
+from utils.resilience import DependencyUnavailableError, guard
 
 
 class OpenSearchClient:
     """
-    A client for interacting with OpenSearch, including querying documents with embeddings and credential management.
+    An asyncio client for querying OpenSearch with embeddings.
 
     Attributes:
         region (str): The AWS region in which OpenSearch is located.
         opensearch_endpoint (str): The endpoint URL for the OpenSearch service.
-        client (OpenSearch): The OpenSearch client instance.
-        credentials (boto3.Session.Credentials): The AWS credentials used for authentication.
+        client (AsyncOpenSearch): The OpenSearch client instance.
     """
-    def __init__(self):
+    def __init__(self, client=None, log_archive=None):
         """
         Initializes the OpenSearch client by retrieving necessary environment variables and credentials.
+
+        Parameters:
+            client (optional): A pre-built async search client to use instead of connecting to
+                OpenSearch, such as the in-memory stand-in used by the offline benchmark.
+            log_archive (LogArchive, optional): The archive holding the full lines of documents
+                indexed as snippets. Default is the archive configured by ARCHIVE_BUCKET.
         """
         self.region = os.environ.get('AWS_DEFAULT_REGION')
         self.opensearch_endpoint = os.environ.get('OPENSEARCH_ENDPOINT')
-        self.client = None
-        self.credentials = None
-        self.initialize_client()
+        self.client = client
+        self.log_archive = log_archive or LogArchive()
+        self.index_map = os.getenv("INDEX_MAP_INDEX", "eks-index-map")
+        self.index_map_ttl = int(os.getenv("INDEX_MAP_TTL_SECONDS", "300"))
+        self._resolved_days = {}
+        self._index_map_lock = threading.Lock()
+        if client is None:
+            self.initialize_client()
 
     def initialize_client(self):
         """
-        Initializes the OpenSearch client and sets up AWS authentication using AWS4Auth.
-        Retrieves AWS credentials and refreshes the OpenSearch client connection with the updated credentials.
+        Initializes the OpenSearch client with SigV4 request signing. Requests are signed with the
+        current credentials of the default boto3 credential chain, which refreshes them as needed.
         """
-        self.credentials = boto3.Session().get_credentials()
-        logger.debug("Refreshing OpenSearch credentials")
-        auth = AWS4Auth(
-            self.credentials.access_key,
-            self.credentials.secret_key,
-            self.region,
-            'aoss',
-            session_token=self.credentials.token
-        )
+        auth = AWSV4SignerAsyncAuth(boto3.Session().get_credentials(), self.region, 'aoss')
 
-        self.client = OpenSearch(
+        self.client = AsyncOpenSearch(
             hosts=[{'host': self.opensearch_endpoint, 'port': 443}],
             http_auth=auth,
             use_ssl=True,
             verify_certs=True,
-            connection_class=RequestsHttpConnection
+            connection_class=AsyncHttpConnection,
+            pool_maxsize=int(os.getenv("OPENSEARCH_POOL_SIZE", "50"))
         )
 
-    def check_and_refresh_credentials(self):
+    async def resolve_indices(self, days):
         """
-        Checks whether the AWS credentials need to be refreshed and refreshes them if necessary.
+        Resolves days to the indices holding their logs. Recent days are in their daily
+        `eks-cluster-YYYYMMDD` index, older ones are merged by the ingestion pipeline's lifecycle
+        manager into weekly indices recorded in the index map (OpenSearch Serverless has no aliases).
 
-        This method will automatically call `initialize_client()` if the credentials are determined
-        to be expired or invalid.
+        Parameters:
+            days (list): The days to query, as YYYYMMDD strings.
+
+        Returns:
+            tuple: The index names to query, and the days to filter on when a weekly index is
+                involved (`None` when only daily indices are queried).
         """
-        if self.credentials.refresh_needed():
-            self.initialize_client()
+        now = time.monotonic()
+        with self._index_map_lock:
+            missing = [day for day in days if day not in self._resolved_days or self._resolved_days[day][1] < now]
+
+        if missing:
+            resolved = {day: f"eks-cluster-{day}" for day in missing}
+            try:
+                if await self.client.indices.exists(index=self.index_map):
+                    results = await self.client.search(index=self.index_map, body={
+                        "size": 10 * len(missing),
+                        "query": {"terms": {"day": missing}},
+                        "sort": [{"timestamp": {"order": "asc"}}]
+                    })
+                    # The latest mapping of a day wins
+                    for hit in results["hits"]["hits"]:
+                        resolved[hit["_source"]["day"]] = hit["_source"]["index"]
+            except Exception as e:
+                logger.warning(f"Error reading the index map, using daily indices: {str(e)}")
+            with self._index_map_lock:
+                for day, index_name in resolved.items():
+                    self._resolved_days[day] = (index_name, now + self.index_map_ttl)
+
+        with self._index_map_lock:
+            resolved = {day: self._resolved_days[day][0] for day in days}
+        compacted = any(index_name != f"eks-cluster-{day}" for day, index_name in resolved.items())
+        return list(dict.fromkeys(resolved.values())), (days if compacted else None)
 
-    def retrieve_documents(self, query_embedding, index_name, top_k=5, min_score=0.4):
+    async def retrieve_documents(self, query_embedding, index_name, top_k=5, min_score=0.4, days=None):
         """
         Retrieves documents from OpenSearch based on a query embedding.
 
         Parameters:
             query_embedding (list): The query embedding (vector) used for KNN search.
-            index_name (str): The OpenSearch index to query.
+            index_name (str or list): The OpenSearch index or indices to query.
             top_k (int, optional): The number of top results to retrieve. Default is 5.
             min_score (float, optional): The minimum score threshold for results. Default is 0.4.
+            days (list, optional): Only retrieve documents of these days from weekly indices, as
+                returned by `resolve_indices`.
 
         Returns:
             list: A list of document logs that match the query, or `None` if no results are found or an error occurs.
+                Archived documents are returned with their full line when the archive can be read.
+
+        Raises:
+            DependencyUnavailableError: If the OpenSearch circuit breaker is open.
         """
 
-        self.check_and_refresh_credentials()
+        knn = {
+            "vector": query_embedding,
+            "k": top_k
+        }
+        if days:
+            # Weekly indices tag documents with their days, daily ones have a single day
+            knn["filter"] = {
+                "bool": {
+                    "should": [
+                        {"terms": {"days": days}},
+                        {"bool": {"must_not": {"exists": {"field": "days"}}}}
+                    ]
+                }
+            }
+        if isinstance(index_name, list):
+            index_name = ",".join(index_name)
 
         query_body = {
             "query": {
@@ -79,46 +136,164 @@ class OpenSearchClient:
                     "must": [
                         {
                             "knn": {
-                                "embedding": {
-                                    "vector": query_embedding,
-                                    "k": top_k
-                                }
+                                "embedding": knn
                             }
                         }
                     ]
                 }
             },
             "_source": False,
-            "fields": ["id", "log"],
+            "fields": ["id", "log", "archive"],
             "size": top_k,
             "min_score": min_score
         }
 
-        try:
-            results = self.client.search(
-                body=query_body,
-                index=index_name
-            )
-
-            if results["hits"]["total"]["value"] > 0:
-                context = [hit["fields"]["log"][0] for hit in results["hits"]["hits"]]
-                context_log = "\n".join(context)
-                logger.debug(f"Context found in OpenSearch: \n{context_log}")
-                return context
-            else:
-                logger.error("No match for the prompt found in the vector database")
-                return None
+        with span("retrieve_documents", index=index_name, top_k=top_k, min_score=min_score) as retrieve_span:
+            try:
+                async with guard("opensearch"):
+                    results = await self.client.search(
+                        body=query_body,
+                        index=index_name
+                    )
 
-        except Exception as e:
-            logger.error(f"Error during OpenSearch query: {str(e)}")
-            if "AuthenticationException" in str(e):
-                self.initialize_client()
-                results = self.client.search(
-                    body=query_body,
-                    index=index_name
-                )
                 if results["hits"]["total"]["value"] > 0:
-                    return [hit["fields"]["log"][0] for hit in results["hits"]["hits"]]
-            return None
+                    context = await self.hits_to_logs(results["hits"]["hits"])
+                    retrieve_span.set(hits=len(context))
+                    context_log = "\n".join(context)
+                    logger.debug(f"Context found in OpenSearch: \n{context_log}")
+                    return context
+                else:
+                    logger.error("No match for the prompt found in the vector database")
+                    retrieve_span.set(hits=0)
+                    return None
 
+            except DependencyUnavailableError:
+                retrieve_span.set(degraded=True)
+                raise
+            except Exception as e:
+                logger.error(f"Error during OpenSearch query: {str(e)}")
+                retrieve_span.set_error(e)
+                return None
+
+    async def hits_to_logs(self, hits):
+        """
+        Extracts the log lines of search hits, loading the full line of archived documents from the
+        log archive. Archived documents whose line cannot be loaded keep their indexed snippet.
 
+        Parameters:
+            hits (list): The search hits, with the `id`, `log` and `archive` fields.
+
+        Returns:
+            list: The log lines, in hit order.
+        """
+        references = [
+            (hit["fields"]["archive"][0], hit["fields"]["id"][0])
+            for hit in hits if "archive" in hit["fields"] and "id" in hit["fields"]
+        ]
+        if not references or not self.log_archive.enabled:
+            return [hit["fields"]["log"][0] for hit in hits]
+        # S3 reads and Parquet decoding stay off the event loop
+        full_lines = await asyncio.to_thread(self.log_archive.fetch, references)
+        return [full_lines.get(hit["fields"].get("id", [None])[0], hit["fields"]["log"][0]) for hit in hits]
+
+    async def retrieve_templates(self, query_embedding, index_name, top_k=5, min_score=0.4, oversample=None, days=None):
+        """
+        Retrieves distinct log templates instead of raw documents. Retrieval often returns lines that
+        only differ by timestamps or IDs, so `top_k * oversample` documents are retrieved, grouped
+        into templates, and the `top_k` most relevant templates are returned with their counts and
+        varying values.
+
+        Parameters:
+            query_embedding (list): The query embedding (vector) used for KNN search.
+            index_name (str or list): The OpenSearch index or indices to query.
+            top_k (int, optional): The number of templates to return. Default is 5.
+            min_score (float, optional): The minimum score threshold for results. Default is 0.4.
+            oversample (int, optional): How many documents to retrieve per returned template.
+                Default is RETRIEVAL_OVERSAMPLE (3).
+            days (list, optional): Only retrieve documents of these days from weekly indices.
+
+        Returns:
+            list: One line per template (a sample line annotated with the number of similar lines),
+                most relevant first, or `None` if no results are found or an error occurs.
+
+        Raises:
+            DependencyUnavailableError: If the OpenSearch circuit breaker is open.
+        """
+        oversample = oversample or int(os.getenv("RETRIEVAL_OVERSAMPLE", "3"))
+        documents = await self.retrieve_documents(query_embedding, index_name, top_k=top_k * oversample,
+                                            min_score=min_score, days=days)
+        if not documents:
+            return documents
+
+        with span("mine_templates", documents=len(documents)) as templates_span:
+            templates = mine_templates(documents)
+            templates_span.set(templates=len(templates))
+        logger.debug(f"Grouped {len(documents)} documents into {len(templates)} templates")
+        return [template.describe() for template in templates[:top_k]]
+
+    async def top_issues(self, index_name, window_minutes=None, size=10):
+        """
+        Retrieves the most frequent error signatures (OOMKilled, CrashLoopBackOff, probe failures,
+        image pull errors) per namespace and pod from the anomaly side index maintained by the
+        ingestion pipeline.
+
+        Parameters:
+            index_name (str): The anomaly index to query, e.g. "eks-anomalies-YYYYMMDD".
+            window_minutes (int, optional): Only count occurrences of the last N minutes. Default is
+                the whole day.
+            size (int, optional): The number of issues to return. Default is 10.
+
+        Returns:
+            list: Dicts with `signature`, `namespace`, `pod` and `count`, most frequent first. Empty
+                when the index does not exist or cannot be queried, since top issues only complement
+                the retrieved logs.
+        """
+        query = {"range": {"timestamp": {"gte": f"now-{window_minutes}m"}}} if window_minutes else {"match_all": {}}
+        total = {"total": {"sum": {"field": "count"}}}
+        query_body = {
+            "size": 0,
+            "query": query,
+            "aggs": {
+                "signatures": {
+                    "terms": {"field": "signature", "size": 10},
+                    "aggs": {
+                        "namespaces": {
+                            "terms": {"field": "namespace", "size": size},
+                            "aggs": {
+                                "pods": {
+                                    "terms": {"field": "pod", "size": size, "order": {"total": "desc"}},
+                                    "aggs": total
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        }
+
+        with span("top_issues", index=index_name, window_minutes=window_minutes) as issues_span:
+            try:
+                if not await self.client.indices.exists(index=index_name):
+                    issues_span.set(issues=0)
+                    return []
+                async with guard("opensearch"):
+                    results = await self.client.search(body=query_body, index=index_name)
+            except Exception as e:
+                logger.warning(f"Error retrieving top issues: {str(e)}")
+                issues_span.set_error(e)
+                return []
+
+            issues = [
+                {
+                    "signature": signature["key"],
+                    "namespace": namespace["key"],
+                    "pod": pod["key"],
+                    "count": int(pod["total"]["value"])
+                }
+                for signature in results["aggregations"]["signatures"]["buckets"]
+                for namespace in signature["namespaces"]["buckets"]
+                for pod in namespace["pods"]["buckets"]
+            ]
+            issues.sort(key=lambda issue: issue["count"], reverse=True)
+            issues_span.set(issues=len(issues))
+            return issues[:size]
@@ -0,0 +1,187 @@
+import asyncio
+import os
+import re
+import shlex
+from clients.kubernetes_client import execute_kubectl_command, normalize_command
+from clients.tool_calling import MAX_TAIL_LINES, NAME, tool_command
+from utils.logger import logger
+from utils.tracing import span
+
+# Random suffixes of generated names (ReplicaSet hash, pod ID) use this alphabet: no vowels, no 0, 1 or 3
+SUFFIX = "[bcdfghjklmnpqrstvwxz2456789]"
+GENERATED_POD = re.compile(rf"\b[a-z0-9](?:[a-z0-9-]*[a-z0-9])?-(?:{SUFFIX}{{6,10}}-)?{SUFFIX}{{5}}\b")
+# StatefulSet pods (web-0)
+ORDINAL_POD = re.compile(r"\b[a-z][a-z0-9-]*[a-z0-9]-\d{1,3}\b")
+# "pod web-0", "pod/web-0", "pods `api-7c9d`"
+NAMED_POD = re.compile(r"\bpods?[\s/]+['\"`]?([a-z0-9](?:[a-z0-9.-]*[a-z0-9])?)")
+NAMESPACE_HINT = re.compile(r"(?:\bnamespace|\bns|(?<!\S)-n)[\s=:]+['\"`]?([a-z0-9](?:[a-z0-9-]*[a-z0-9])?)")
+
+# Container logs enriched by the Fluent Bit kubernetes filter, and kubelet messages
+LOG_POD = re.compile(r'"pod_name"\s*:\s*"([^"]+)"')
+LOG_NAMESPACE = re.compile(r'"namespace_name"\s*:\s*"([^"]+)"')
+POD_REFERENCE = re.compile(r'pod="?([a-z0-9-]+)/([a-z0-9.-]+)')
+
+
+def pods_in_query(query):
+    """Returns the pod names mentioned in a question, in order."""
+    names = [match.group(1) for match in NAMED_POD.finditer(query)]
+    names += [match.group(0) for match in GENERATED_POD.finditer(query)]
+    names += [match.group(0) for match in ORDINAL_POD.finditer(query)]
+    # Without a hyphen or digit "pod X" is more likely prose ("pods are ...") than a pod name
+    return list(dict.fromkeys(name for name in names if re.search(r"[-0-9]", name)))
+
+
+def pods_in_logs(documents):
+    """Returns `(namespace, pod)` tuples referenced by log lines, in order."""
+    references = []
+    for document in documents or []:
+        pod = LOG_POD.search(document)
+        if pod:
+            namespace = LOG_NAMESPACE.search(document)
+            references.append((namespace.group(1) if namespace else None, pod.group(1)))
+        references += POD_REFERENCE.findall(document)
+    return references
+
+
+def extract_references(query, documents=None, top_issues=None):
+    """
+    Extracts the pods a question is likely about: pods named in the question first, then pods
+    referenced by the retrieved logs, most relevant first.
+
+    Parameters:
+        query (str): The user question.
+        documents (list, optional): The retrieved log lines.
+        top_issues (list, optional): The top issues, used to find the namespace of pods named in
+            the question.
+
+    Returns:
+        list: `(namespace, pod)` tuples, the namespace is None when it could not be determined.
+    """
+    from_logs = pods_in_logs(documents)
+    known_namespaces = {pod: namespace for namespace, pod in from_logs if namespace}
+    known_namespaces.update({issue["pod"]: issue["namespace"] for issue in top_issues or []})
+
+    hint = NAMESPACE_HINT.search(query)
+    references = [(known_namespaces.get(pod) or (hint.group(1) if hint else None), pod) for pod in pods_in_query(query)]
+    references += from_logs
+
+    unique = {}
+    for namespace, pod in references:
+        # Names come from untrusted log text and end up in kubectl commands, keep valid names only
+        if not NAME.match(pod):
+            continue
+        if namespace is not None and not NAME.match(namespace):
+            namespace = None
+        if pod not in unique or (unique[pod] is None and namespace):
+            unique[pod] = namespace
+    return [(namespace, pod) for pod, namespace in unique.items()]
+
+
+class KubectlPrefetcher:
+    """
+    Speculatively runs `describe` and `logs` for the pods a question is about, concurrently with
+    embedding, retrieval and the first model call, so the first prompt can already include their
+    state. One prefetcher is used per request.
+
+    Attributes:
+        max_pods (int): The largest number of pods fetched per request, 0 disables pre-fetching.
+        log_lines (int): The number of recent log lines fetched per pod.
+    """
+    def __init__(self, max_pods=None, log_lines=None):
+        self.max_pods = max_pods if max_pods is not None else int(os.getenv("PREFETCH_MAX_PODS", "2"))
+        self.log_lines = log_lines or int(os.getenv("PREFETCH_LOG_LINES", "100"))
+        self._pods = {}
+        self._commands = {}
+        self._in_prompt = set()
+
+    def reuse(self, command_outputs):
+        """
+        Adds output fetched earlier, e.g. by a previous turn of a chat, as if it had been pre-fetched.
+
+        Parameters:
+            command_outputs (list): `(command, output)` tuples.
+        """
+        loop = asyncio.get_running_loop()
+        for command, output in command_outputs:
+            future = loop.create_future()
+            future.set_result(output)
+            self._commands[normalize_command(command)] = future
+
+    def prefetch(self, references):
+        """
+        Starts fetching pods that are not being fetched yet, up to `max_pods`.
+
+        Parameters:
+            references (list): `(namespace, pod)` tuples, pods with an unknown namespace are looked
+                up across namespaces first.
+        """
+        for namespace, pod in references:
+            if len(self._pods) >= self.max_pods:
+                break
+            if not NAME.match(pod) or (namespace is not None and not NAME.match(namespace)):
+                logger.warning(f"Not pre-fetching invalid pod reference {namespace!r}/{pod!r}")
+                continue
+            if pod not in self._pods:
+                self._pods[pod] = asyncio.create_task(self._fetch(namespace, pod))
+
+    async def _fetch(self, namespace, pod):
+        with span("prefetch_kubectl", pod=pod, namespace=namespace) as prefetch_span:
+            if namespace is None:
+                namespace = (await execute_kubectl_command(shlex.join([
+                    "kubectl", "get", "pods", "-A", "--field-selector", f"metadata.name={pod}",
+                    "--no-headers", "-o", "custom-columns=:metadata.namespace"
+                ]))).strip().splitlines()[:1]
+                if not namespace or not NAME.match(namespace[0].strip()):
+                    prefetch_span.set(found=False)
+                    return
+                namespace = namespace[0].strip()
+                prefetch_span.set(namespace=namespace)
+
+            commands = [
+                tool_command("kubectl_describe", {"resource": "pod", "name": pod, "namespace": namespace}),
+                tool_command("kubectl_logs", {"pod": pod, "namespace": namespace, "tail": min(self.log_lines, MAX_TAIL_LINES)})
+            ]
+            for command in commands:
+                self._commands[normalize_command(command)] = asyncio.create_task(execute_kubectl_command(command))
+            await asyncio.gather(*(self._commands[normalize_command(command)] for command in commands))
+
+    async def outputs(self, timeout):
+        """
+        Waits up to `timeout` seconds for the pre-fetch to finish and returns what was fetched. The
+        returned commands are considered part of the prompt from then on.
+
+        Parameters:
+            timeout (float): The longest time to wait in seconds.
+
+        Returns:
+            list: `(command, output)` tuples of the successful commands.
+        """
+        if self._pods:
+            await asyncio.wait(list(self._pods.values()), timeout=timeout)
+        fetched = self.results()
+        self._in_prompt.update(command for command, _ in fetched)
+        logger.debug(f"Pre-fetched {len(fetched)} kubectl outputs for {list(self._pods)}")
+        return fetched
+
+    def in_prompt(self, command):
+        """Tells whether the output of a command was already included in the prompt."""
+        return normalize_command(command) in self._in_prompt
+
+    async def run(self, command):
+        """Returns the output of a command, reusing the pre-fetched one when there is one."""
+        key = normalize_command(command)
+        if key not in self._commands:
+            self._commands[key] = asyncio.create_task(execute_kubectl_command(command))
+        return await self._commands[key]
+
+    def results(self):
+        """Returns the `(command, output)` tuples of every successful command of the request."""
+        return [
+            (command, task.result()) for command, task in self._commands.items()
+            if task.done() and not task.cancelled() and not task.result().startswith("Error")
+        ]
+
+    def cancel(self):
+        """Stops fetches whose results are no longer needed."""
+        for task in list(self._pods.values()) + list(self._commands.values()):
+            task.cancel()
@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from prometheus_client import Counter
+from utils.logger import logger
+
+CACHE_REQUESTS = Counter(
+    "chatbot_response_cache_requests_total",
+    "Response cache lookups, by result",
+    ["result"]
+)
+
+
+def normalized(vector):
+    """
+    Scales a vector to unit length.
+
+    Parameters:
+        vector (list): The vector.
+
+    Returns:
+        numpy.ndarray: The float32 unit vector, all zeros if the vector is all zeros.
+    """
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm else array
+
+
+def cosine_similarity(a, b):
+    """
+    Computes the cosine similarity of two vectors.
+
+    Parameters:
+        a (list): The first vector.
+        b (list): The second vector, of the same dimension.
+
+    Returns:
+        float: The similarity, between -1 and 1 (0 if either vector is all zeros).
+    """
+    return float(np.dot(normalized(a), normalized(b)))
+
+
+class ResponseCache:
+    """
+    A semantic cache of complete chatbot answers.
+
+    Answers are stored with the query embedding, and a new query reuses a stored answer when it was
+    asked against the same index with the same model choice and its embedding is similar enough.
+    Entries expire after a short TTL, since cluster state and logs keep changing, and the least
+    recently used entries are evicted beyond `max_entries`.
+
+    The normalized embeddings of each index and model are kept as one matrix, so a lookup is a
+    single matrix-vector product over the entries it can match.
+
+    Attributes:
+        threshold (float): The minimum cosine similarity for a hit.
+        ttl (float): Seconds an answer stays valid.
+        max_entries (int): The largest number of cached answers, 0 disables the cache.
+    """
+    def __init__(self, threshold=None, ttl=None, max_entries=None):
+        self.threshold = threshold if threshold is not None else float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.95"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+        self._entries = OrderedDict()
+        # (index, model) to (entry ids, matrix of their unit embeddings), rebuilt after changes
+        self._matrices = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        self._matrices.pop(entry["key"], None)
+
+    def _matrix(self, key):
+        """The entry ids and embedding matrix of an index and model, built on first use."""
+        if key not in self._matrices:
+            ids = [entry_id for entry_id, entry in self._entries.items() if entry["key"] == key]
+            matrix = np.stack([self._entries[entry_id]["embedding"] for entry_id in ids]) if ids else None
+            self._matrices[key] = (ids, matrix)
+        return self._matrices[key]
+
+    def lookup(self, query_embedding, index_name, model):
+        """
+        Finds a cached answer for a similar query.
+
+        Parameters:
+            query_embedding (list): The embedding of the new query.
+            index_name (str): The index the query runs against.
+            model (str): The selected model.
+
+        Returns:
+            tuple: `(response, similarity)` for the most similar live entry above the threshold, or
+                `(None, None)` on a miss.
+        """
+        if not self.enabled:
+            return None, None
+
+        query = normalized(query_embedding)
+        now = time.monotonic()
+        with self._lock:
+            for entry_id in [entry_id for entry_id, entry in self._entries.items() if now - entry["created"] > self.ttl]:
+                self._remove(entry_id)
+
+            ids, matrix = self._matrix((index_name, model))
+            best_id = None
+            if matrix is not None:
+                similarities = matrix @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    best_id, best_similarity = ids[best], float(similarities[best])
+
+            if best_id is None:
+                CACHE_REQUESTS.labels(result="miss").inc()
+                return None, None
+            self._entries.move_to_end(best_id)
+            CACHE_REQUESTS.labels(result="hit").inc()
+            return self._entries[best_id]["response"], best_similarity
+
+    def store(self, query_embedding, index_name, model, response):
+        """
+        Caches an answer.
+
+        Parameters:
+            query_embedding (list): The embedding of the query.
+            index_name (str): The index the query ran against.
+            model (str): The selected model.
+            response (str): The answer to cache.
+        """
+        if not self.enabled:
+            return
+        embedding = normalized(query_embedding)
+        with self._lock:
+            key = (index_name, model)
+            self._entries[self._next_id] = {
+                "embedding": embedding,
+                "key": key,
+                "response": response,
+                "created": time.monotonic()
+            }
+            self._matrices.pop(key, None)
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+        logger.debug(f"Cached response for {index_name}/{model}, {len(self._entries)} entries")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrices.clear()
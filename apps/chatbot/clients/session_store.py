@@ -0,0 +1,180 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from prometheus_client import Counter, Gauge
+from clients.context_builder import estimate_tokens
+from clients.response_cache import cosine_similarity
+from utils.logger import logger
+
+SESSIONS = Gauge(
+    "chatbot_chat_sessions",
+    "Chat sessions kept in memory"
+)
+SESSION_EVICTIONS = Counter(
+    "chatbot_chat_session_evictions_total",
+    "Chat sessions dropped before they expired, to stay within SESSION_MAX_SESSIONS or SESSION_MAX_MEMORY_MB"
+)
+
+
+class ChatSession:
+    """
+    The server-side memory of one chat: recent turns, a summary of older ones, and the retrieved
+    logs and kubectl output already fetched during the conversation.
+
+    Attributes:
+        turns (list): `(question, answer)` tuples not summarized yet, oldest first.
+        summary (str): A summary of the older turns, empty until the history is first compacted.
+        retrievals (deque): `(query_embedding, index_name, documents)` of recent retrievals.
+        kubectl (OrderedDict): Command to `(output, fetched_at)` of recent kubectl output.
+        updated (float): When the session was last used (`time.monotonic()`).
+        lock (asyncio.Lock): Held while a message of the chat is handled, so messages sent before
+            the previous answer arrived are handled in order, each seeing the turns before it.
+    """
+    def __init__(self, max_retrievals=None, max_commands=None):
+        self.turns = []
+        self.summary = ""
+        self.retrievals = deque(maxlen=max_retrievals or int(os.getenv("CHAT_MAX_RETRIEVALS", "5")))
+        self.kubectl = OrderedDict()
+        self.max_commands = max_commands or int(os.getenv("CHAT_MAX_KUBECTL_OUTPUTS", "10"))
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    @property
+    def empty(self):
+        return not self.turns and not self.summary
+
+    def history(self):
+        """Returns the summary and the recent turns as prompt text parts, oldest first."""
+        parts = [f"Summary of the earlier conversation: {self.summary}"] if self.summary else []
+        parts += [f"User: {question}\nAssistant: {answer}" for question, answer in self.turns]
+        return parts
+
+    def find_retrieval(self, query_embedding, index_name, threshold):
+        """
+        Finds documents retrieved earlier in the session for a similar question.
+
+        Parameters:
+            query_embedding (list): The embedding of the new question.
+            index_name (str): The index the question runs against.
+            threshold (float): The minimum cosine similarity with the earlier question.
+
+        Returns:
+            list: The documents of the most similar earlier retrieval, or None.
+        """
+        best, best_similarity = None, threshold
+        for embedding, index, documents in self.retrievals:
+            if index != index_name:
+                continue
+            similarity = cosine_similarity(query_embedding, embedding)
+            if similarity >= best_similarity:
+                best, best_similarity = documents, similarity
+        return best
+
+    def add_retrieval(self, query_embedding, index_name, documents):
+        self.retrievals.append((list(query_embedding), index_name, documents))
+
+    def fresh_kubectl(self, max_age):
+        """Returns the `(command, output)` tuples fetched less than `max_age` seconds ago."""
+        now = time.monotonic()
+        return [(command, output) for command, (output, fetched_at) in self.kubectl.items() if now - fetched_at <= max_age]
+
+    def add_kubectl(self, command_outputs):
+        now = time.monotonic()
+        for command, output in command_outputs:
+            self.kubectl.pop(command, None)
+            self.kubectl[command] = (output, now)
+        while len(self.kubectl) > self.max_commands:
+            self.kubectl.popitem(last=False)
+
+    def add_turn(self, question, answer):
+        self.turns.append((question, answer))
+
+    async def compact(self, summarize, token_budget, keep_turns):
+        """
+        Folds the oldest turns into the summary once the history is over its token budget.
+
+        Parameters:
+            summarize (callable): An async function `(summary, turns) -> str` returning the new summary.
+            token_budget (int): The history size that triggers compaction.
+            keep_turns (int): The number of most recent turns kept verbatim.
+
+        Returns:
+            bool: Whether the history was compacted.
+        """
+        if len(self.turns) <= keep_turns or sum(estimate_tokens(part) for part in self.history()) <= token_budget:
+            return False
+        older = self.turns[:len(self.turns) - keep_turns]
+        self.summary = await summarize(self.summary, older)
+        # Turns added while the summary was generated are kept
+        self.turns = self.turns[len(older):]
+        return True
+
+    def size(self):
+        """Returns the approximate memory used by the session in bytes."""
+        text = sum(len(question) + len(answer) for question, answer in self.turns) + len(self.summary)
+        text += sum(sum(len(document) for document in documents) for _, _, documents in self.retrievals)
+        text += sum(len(command) + len(output) for command, (output, _) in self.kubectl.items())
+        # Embeddings are lists of floats, about 32 bytes per element
+        return text + sum(32 * len(embedding) for embedding, _, _ in self.retrievals)
+
+
+class SessionStore:
+    """
+    Keeps chat sessions in memory, by Gradio session ID.
+
+    Sessions expire after `ttl` seconds without use, and the least recently used ones are dropped
+    when there are more than `max_sessions` or together they use more than `max_bytes`.
+
+    Attributes:
+        max_sessions (int): The largest number of sessions.
+        max_bytes (int): The approximate memory cap of all sessions.
+        ttl (float): Seconds an idle session is kept.
+    """
+    def __init__(self, max_sessions=None, max_bytes=None, ttl=None):
+        self.max_sessions = max_sessions or int(os.getenv("SESSION_MAX_SESSIONS", "500"))
+        self.max_bytes = max_bytes or int(float(os.getenv("SESSION_MAX_MEMORY_MB", "64")) * 1024 * 1024)
+        self.ttl = ttl or float(os.getenv("SESSION_TTL_SECONDS", "3600"))
+        self._sessions = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        """Returns the session of an ID, starting a new one if it does not exist or expired."""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or now - session.updated > self.ttl:
+                session = ChatSession()
+                self._sessions[session_id] = session
+                self._sizes[session_id] = 0
+            session.updated = now
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def save(self, session_id):
+        """Records the current size of a session after it changed and enforces the caps."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            self._sizes[session_id] = session.size()
+            now = time.monotonic()
+            for expired in [key for key, other in self._sessions.items() if now - other.updated > self.ttl]:
+                self._remove(expired)
+            while len(self._sessions) > 1 and (len(self._sessions) > self.max_sessions or sum(self._sizes.values()) > self.max_bytes):
+                evicted, _ = self._sessions.popitem(last=False)
+                self._sizes.pop(evicted, None)
+                SESSION_EVICTIONS.inc()
+                logger.info(f"Evicted chat session {evicted} to stay within the session memory cap")
+            SESSIONS.set(len(self._sessions))
+
+    def clear(self, session_id):
+        with self._lock:
+            self._remove(session_id)
+            SESSIONS.set(len(self._sessions))
+
+    def _remove(self, session_id):
+        self._sessions.pop(session_id, None)
+        self._sizes.pop(session_id, None)
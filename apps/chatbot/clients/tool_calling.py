@@ -0,0 +1,229 @@
+import json
+import re
+import shlex
+
+# Names, namespaces and resource types the tools accept. Anything else, flags and shell syntax
+# included, is rejected before a command is built
+NAME = re.compile(r"^[a-z0-9](?:[a-z0-9.-]{0,251}[a-z0-9])?$")
+RESOURCE = re.compile(r"^[a-z][a-z0-9.-]{0,62}$")
+SELECTOR = re.compile(r"^[A-Za-z0-9=!,._/() -]{1,256}$")
+MAX_TAIL_LINES = 1000
+
+# Typed kubectl tools, described with JSON Schema. Converted to the Bedrock Converse and OpenAI
+# (vLLM) formats by `bedrock_tool_config` and `openai_tools`
+TOOLS = [
+    {
+        "name": "kubectl_get",
+        "description": "List Kubernetes resources or get one resource, like `kubectl get`. Use it to find pods, their status, restarts and nodes, or recent events.",
+        "schema": {
+            "type": "object",
+            "properties": {
+                "resource": {"type": "string", "description": "The resource type, e.g. pods, nodes, events, deployments."},
+                "name": {"type": "string", "description": "The name of one resource, omit to list them."},
+                "namespace": {"type": "string", "description": "The namespace, defaults to 'default'."},
+                "all_namespaces": {"type": "boolean", "description": "List the resources of every namespace."},
+                "selector": {"type": "string", "description": "A label selector, e.g. app=web."},
+                "output": {"type": "string", "enum": ["wide", "yaml"], "description": "The output format."}
+            },
+            "required": ["resource"]
+        }
+    },
+    {
+        "name": "kubectl_describe",
+        "description": "Describe a Kubernetes resource, like `kubectl describe`, including its conditions and recent events.",
+        "schema": {
+            "type": "object",
+            "properties": {
+                "resource": {"type": "string", "description": "The resource type, e.g. pod, node, deployment."},
+                "name": {"type": "string", "description": "The real name of the resource, not a template."},
+                "namespace": {"type": "string", "description": "The namespace, defaults to 'default'."}
+            },
+            "required": ["resource", "name"]
+        }
+    },
+    {
+        "name": "kubectl_logs",
+        "description": "Get the recent logs of a pod, like `kubectl logs`.",
+        "schema": {
+            "type": "object",
+            "properties": {
+                "pod": {"type": "string", "description": "The real name of the pod, not a template."},
+                "namespace": {"type": "string", "description": "The namespace, defaults to 'default'."},
+                "container": {"type": "string", "description": "The container, required for pods with several containers."},
+                "tail": {"type": "integer", "description": f"The number of recent lines, 100 by default, at most {MAX_TAIL_LINES}."},
+                "previous": {"type": "boolean", "description": "Get the logs of the previous, crashed container instead."}
+            },
+            "required": ["pod"]
+        }
+    }
+]
+
+
+def _checked(value, pattern, field):
+    if not isinstance(value, str) or not pattern.match(value):
+        raise ValueError(f"Invalid {field}: {value!r}")
+    return value
+
+
+def tool_command(name, arguments):
+    """
+    Builds the kubectl command of a tool call.
+
+    Parameters:
+        name (str): The tool name.
+        arguments (dict): The tool input generated by the model.
+
+    Returns:
+        str: The kubectl command.
+
+    Raises:
+        ValueError: If the tool is unknown or an argument is invalid, the message is returned to the model.
+    """
+    if not isinstance(arguments, dict):
+        raise ValueError("The tool input must be a JSON object")
+    namespace = ["-n", _checked(arguments["namespace"], NAME, "namespace")] if arguments.get("namespace") else []
+
+    if name == "kubectl_get":
+        args = ["kubectl", "get", _checked(arguments.get("resource"), RESOURCE, "resource")]
+        if arguments.get("name"):
+            args.append(_checked(arguments["name"], NAME, "name"))
+        args += ["-A"] if arguments.get("all_namespaces") else namespace
+        if arguments.get("selector"):
+            args += ["-l", _checked(arguments["selector"], SELECTOR, "selector")]
+        if arguments.get("output"):
+            if arguments["output"] not in ("wide", "yaml"):
+                raise ValueError(f"Invalid output: {arguments['output']!r}")
+            args += ["-o", arguments["output"]]
+    elif name == "kubectl_describe":
+        args = ["kubectl", "describe", _checked(arguments.get("resource"), RESOURCE, "resource"),
+                _checked(arguments.get("name"), NAME, "name")] + namespace
+    elif name == "kubectl_logs":
+        tail = arguments.get("tail", 100)
+        if not isinstance(tail, int) or isinstance(tail, bool) or not 0 < tail <= MAX_TAIL_LINES:
+            raise ValueError(f"Invalid tail: {tail!r}, use 1 to {MAX_TAIL_LINES} lines")
+        args = ["kubectl", "logs", _checked(arguments.get("pod"), NAME, "pod")] + namespace
+        if arguments.get("container"):
+            args += ["-c", _checked(arguments["container"], NAME, "container")]
+        args.append(f"--tail={tail}")
+        if arguments.get("previous"):
+            args.append("--previous")
+    else:
+        raise ValueError(f"Unknown tool: {name}")
+    return shlex.join(args)
+
+
+def bedrock_tool_config(tools):
+    """The `toolConfig` of a Bedrock Converse request."""
+    return {
+        "tools": [
+            {"toolSpec": {"name": tool["name"], "description": tool["description"], "inputSchema": {"json": tool["schema"]}}}
+            for tool in tools
+        ],
+        "toolChoice": {"auto": {}}
+    }
+
+
+def openai_tools(tools):
+    """The `tools` of an OpenAI-compatible chat completion request."""
+    return [
+        {"type": "function", "function": {"name": tool["name"], "description": tool["description"], "parameters": tool["schema"]}}
+        for tool in tools
+    ]
+
+
+# Conversations are kept in a provider-neutral form, so a failover can continue them on another model:
+#   {"role": "user", "text": str, "tool_results": [{"id", "command", "output", "error"}]}
+#   {"role": "assistant", "text": str, "tool_calls": [{"id", "name", "input"}]}
+
+def conversation_text(messages):
+    """The text of a conversation, used to size it."""
+    parts = []
+    for message in messages:
+        parts.append(message.get("text") or "")
+        parts += [result["output"] for result in message.get("tool_results", [])]
+        parts += [json.dumps(call["input"]) for call in message.get("tool_calls", [])]
+    return "\n".join(parts)
+
+
+def to_bedrock_messages(messages):
+    """Converts a conversation to Bedrock Converse messages."""
+    converted = []
+    for message in messages:
+        content = []
+        if message["role"] == "user":
+            content += [
+                {"toolResult": {
+                    "toolUseId": result["id"],
+                    "content": [{"text": result["output"] or "(no output)"}],
+                    "status": "error" if result["error"] else "success"
+                }}
+                for result in message.get("tool_results", [])
+            ]
+        if message.get("text"):
+            content.append({"text": message["text"]})
+        if message["role"] == "assistant":
+            content += [
+                {"toolUse": {"toolUseId": call["id"], "name": call["name"], "input": call["input"] if isinstance(call["input"], dict) else {}}}
+                for call in message.get("tool_calls", [])
+            ]
+        converted.append({"role": message["role"], "content": content or [{"text": "(empty)"}]})
+    return converted
+
+
+def from_bedrock_message(message):
+    """Converts the output message of a Bedrock Converse response to an assistant turn."""
+    text = "".join(block["text"] for block in message.get("content", []) if "text" in block)
+    calls = [
+        {"id": block["toolUse"]["toolUseId"], "name": block["toolUse"]["name"], "input": block["toolUse"].get("input")}
+        for block in message.get("content", []) if "toolUse" in block
+    ]
+    return {"role": "assistant", "text": text, "tool_calls": calls}
+
+
+def to_openai_messages(messages, with_tools=True):
+    """
+    Converts a conversation to OpenAI chat messages.
+
+    Parameters:
+        messages (list): The conversation.
+        with_tools (bool): Whether the server accepts tool messages. Without tools, tool calls are
+            dropped and their results sent as text, e.g. after a failover from a model with tools.
+
+    Returns:
+        list: The chat messages.
+    """
+    converted = []
+    for message in messages:
+        if message["role"] == "user":
+            results = message.get("tool_results", [])
+            text = message.get("text") or ""
+            if with_tools:
+                converted += [{"role": "tool", "tool_call_id": result["id"], "content": result["output"]} for result in results]
+            elif results:
+                outputs = "\n".join(f"Output of '{result['command'] or 'invalid command'}':\n{result['output']}" for result in results)
+                text = f"{outputs}\n\n{text}" if text else outputs
+            if text:
+                converted.append({"role": "user", "content": text})
+        else:
+            assistant = {"role": "assistant", "content": message.get("text") or ""}
+            if with_tools and message.get("tool_calls"):
+                assistant["tool_calls"] = [
+                    {"id": call["id"], "type": "function", "function": {"name": call["name"], "arguments": json.dumps(call["input"])}}
+                    for call in message["tool_calls"]
+                ]
+            converted.append(assistant)
+    return converted
+
+
+def from_openai_message(message):
+    """Converts the message of an OpenAI chat completion choice to an assistant turn."""
+    calls = []
+    for i, call in enumerate(message.get("tool_calls") or []):
+        function = call.get("function") or {}
+        try:
+            arguments = json.loads(function.get("arguments") or "{}")
+        except json.JSONDecodeError:
+            # Reported back to the model by `tool_command`
+            arguments = None
+        calls.append({"id": call.get("id") or f"call_{i}", "name": function.get("name"), "input": arguments})
+    return {"role": "assistant", "text": message.get("content") or "", "tool_calls": calls}
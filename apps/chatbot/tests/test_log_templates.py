@@ -0,0 +1,24 @@
+from clients.log_templates import WILDCARD, mine_templates
+
+
+def test_lines_differing_by_variables_share_a_template():
+    templates = mine_templates([
+        "Liveness probe failed for pod web-5d8f-x1 after 3s",
+        "Liveness probe failed for pod web-5d8f-y2 after 5s",
+        "OOMKilled container worker in pod batch-1",
+    ])
+    assert [template.count for template in templates] == [2, 1]
+    assert templates[0].template == f"Liveness probe failed for pod {WILDCARD} after {WILDCARD}"
+
+
+def test_descriptions_keep_the_sample_and_informative_values():
+    templates = mine_templates([
+        "connection refused by payments-db",
+        "connection refused by ledger",
+    ])
+    assert templates[0].describe() == "connection refused by payments-db [+1 similar lines, other values: ledger]"
+
+
+def test_blank_lines_are_ignored_and_ranking_is_kept():
+    templates = mine_templates(["", "second error happened", "  ", "first error happened twice"])
+    assert [template.sample for template in templates] == ["second error happened", "first error happened twice"]
@@ -0,0 +1,47 @@
+import asyncio
+
+import httpx
+import pytest
+
+from clients.model_router import ModelProvider, ModelRequestError, ModelRouter, ModelRouterError
+
+
+class FakeProvider(ModelProvider):
+    def __init__(self, name, error=None):
+        super().__init__(name, 10 ** 6)
+        self.error = error
+        self.calls = 0
+
+    async def complete(self, prompt_text):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return f"{self.name} answer"
+
+
+def unavailable():
+    request = httpx.Request("POST", "http://model")
+    return httpx.HTTPStatusError("busy", request=request, response=httpx.Response(503, request=request))
+
+
+def test_an_explicit_choice_only_uses_that_model():
+    claude, deepseek = FakeProvider("claude", error=unavailable()), FakeProvider("deepseek")
+    router = ModelRouter([claude, deepseek])
+    assert router.candidates("question", "claude") == [claude]
+    with pytest.raises(ModelRouterError) as raised:
+        asyncio.run(router.invoke("question", "claude"))
+    assert not isinstance(raised.value, ModelRequestError)
+    assert deepseek.calls == 0
+
+
+def test_an_explicit_model_rejecting_the_request_raises_a_request_error():
+    router = ModelRouter([FakeProvider("claude", error=ValueError("prompt too long")), FakeProvider("deepseek")])
+    with pytest.raises(ModelRequestError):
+        asyncio.run(router.invoke("question", "claude"))
+
+
+def test_auto_fails_over_and_keeps_the_preferred_model_first():
+    claude, deepseek = FakeProvider("claude", error=unavailable()), FakeProvider("deepseek")
+    router = ModelRouter([claude, deepseek])
+    assert asyncio.run(router.invoke("question", "auto")) == ("deepseek answer", "deepseek")
+    assert router.candidates("question", "auto", prefer="claude")[0] is claude
@@ -0,0 +1,37 @@
+import asyncio
+
+from clients.log_archive import LogArchive
+from clients.opensearch_client import OpenSearchClient
+
+
+class RecordingArchive(LogArchive):
+    def __init__(self, lines):
+        super().__init__(bucket="archive", path="")
+        self.lines = lines
+        self.references = None
+
+    def fetch(self, references):
+        self.references = references
+        return self.lines
+
+
+def hit(doc_id, log, archive=None):
+    fields = {"id": [doc_id], "log": [log]}
+    if archive:
+        fields["archive"] = [archive]
+    return {"fields": fields}
+
+
+def test_hits_without_archive_references_keep_their_lines():
+    archive = RecordingArchive({})
+    client = OpenSearchClient(client=object(), log_archive=archive)
+    assert asyncio.run(client.hits_to_logs([hit("1", "a"), hit("2", "b")])) == ["a", "b"]
+    assert archive.references is None
+
+
+def test_archived_hits_are_replaced_by_their_full_line():
+    archive = RecordingArchive({"2": "b full line"})
+    client = OpenSearchClient(client=object(), log_archive=archive)
+    hits = [hit("1", "a"), hit("2", "b", "logs/b.parquet"), hit("3", "c", "logs/c.parquet")]
+    assert asyncio.run(client.hits_to_logs(hits)) == ["a", "b full line", "c"]
+    assert archive.references == [("logs/b.parquet", "2"), ("logs/c.parquet", "3")]
@@ -0,0 +1,51 @@
+import asyncio
+
+from clients import prefetch
+from clients.prefetch import KubectlPrefetcher, extract_references
+
+
+def recorder(monkeypatch):
+    commands = []
+
+    async def execute(command):
+        commands.append(command)
+        return "output"
+
+    monkeypatch.setattr(prefetch, "execute_kubectl_command", execute)
+    return commands
+
+
+def test_pods_referenced_by_logs_are_extracted():
+    documents = ['{"pod_name": "web-0", "namespace_name": "prod", "log": "OOMKilled"}']
+    assert extract_references("why does it crash?", documents) == [("prod", "web-0")]
+
+
+def test_hostile_pod_names_are_not_fetched(monkeypatch):
+    commands = recorder(monkeypatch)
+    documents = [
+        '{"pod_name": "x --server=https://attacker", "namespace_name": "prod"}',
+        '{"pod_name": "web-0", "namespace_name": "prod; rm -rf /"}'
+    ]
+    assert extract_references("why does it crash?", documents) == [(None, "web-0")]
+
+    async def fetch():
+        prefetcher = KubectlPrefetcher(max_pods=2)
+        prefetcher.prefetch([("prod", "x --server=https://attacker"), ("-A", "web-0")])
+        return await prefetcher.outputs(timeout=1)
+
+    assert asyncio.run(fetch()) == []
+    assert commands == []
+
+
+def test_commands_match_the_tool_calls(monkeypatch):
+    commands = recorder(monkeypatch)
+
+    async def fetch():
+        prefetcher = KubectlPrefetcher(max_pods=1, log_lines=100)
+        prefetcher.prefetch([("prod", "web-0")])
+        await prefetcher.outputs(timeout=1)
+        return prefetcher
+
+    prefetcher = asyncio.run(fetch())
+    assert commands == ["kubectl describe pod web-0 -n prod", "kubectl logs web-0 -n prod --tail=100"]
+    assert prefetcher.in_prompt("kubectl logs web-0 -n prod --tail=100")
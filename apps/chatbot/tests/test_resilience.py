@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+import pytest
+
+from utils.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, TokenBucket
+
+
+def test_token_bucket_allows_a_burst_then_waits_for_the_rate():
+    bucket = TokenBucket(rate=20, capacity=2)
+
+    async def take(count, timeout):
+        return [await bucket.acquire(timeout) for _ in range(count)]
+
+    assert asyncio.run(take(2, timeout=0)) == [True, True]
+    assert asyncio.run(take(1, timeout=0)) == [False]
+    started = time.monotonic()
+    assert asyncio.run(take(1, timeout=1)) == [True]
+    assert time.monotonic() - started < 0.5
+
+
+def test_circuit_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test-open", failure_threshold=2, recovery_timeout=60)
+    breaker.before_call()
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_circuit_breaker_probes_once_when_half_open():
+    breaker = CircuitBreaker("test-probe", failure_threshold=1, recovery_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.state == HALF_OPEN
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_circuit_breaker_reopens_when_the_probe_fails():
+    breaker = CircuitBreaker("test-reopen", failure_threshold=1, recovery_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == OPEN
@@ -0,0 +1,36 @@
+import time
+
+import pytest
+
+from clients.response_cache import ResponseCache, cosine_similarity
+
+
+def test_cosine_similarity():
+    assert cosine_similarity([1, 0], [2, 0]) == pytest.approx(1.0)
+    assert cosine_similarity([1, 0], [0, 1]) == pytest.approx(0.0)
+    assert cosine_similarity([0, 0], [1, 1]) == 0.0
+
+
+def test_similar_queries_of_the_same_index_and_model_hit():
+    cache = ResponseCache(threshold=0.95, ttl=60, max_entries=8)
+    cache.store([1.0, 0.0, 0.0], "eks-cluster-20261019", "auto", "answer")
+    response, similarity = cache.lookup([0.99, 0.05, 0.0], "eks-cluster-20261019", "auto")
+    assert response == "answer" and similarity > 0.95
+    assert cache.lookup([0.99, 0.05, 0.0], "eks-cluster-20261018", "auto") == (None, None)
+    assert cache.lookup([0.99, 0.05, 0.0], "eks-cluster-20261019", "claude") == (None, None)
+    assert cache.lookup([0.0, 1.0, 0.0], "eks-cluster-20261019", "auto") == (None, None)
+
+
+def test_entries_expire_and_the_least_recently_used_are_evicted():
+    cache = ResponseCache(threshold=0.95, ttl=60, max_entries=2)
+    cache.store([1.0, 0.0], "index", "auto", "first")
+    cache.store([0.0, 1.0], "index", "auto", "second")
+    assert cache.lookup([1.0, 0.0], "index", "auto")[0] == "first"
+    cache.store([1.0, 1.0], "index", "auto", "third")
+    assert cache.lookup([0.0, 1.0], "index", "auto") == (None, None)
+    assert cache.lookup([1.0, 0.0], "index", "auto")[0] == "first"
+
+    expiring = ResponseCache(threshold=0.95, ttl=0.01, max_entries=2)
+    expiring.store([1.0, 0.0], "index", "auto", "stale")
+    time.sleep(0.02)
+    assert expiring.lookup([1.0, 0.0], "index", "auto") == (None, None)
@@ -0,0 +1,48 @@
+import asyncio
+
+from clients import kubernetes_client
+from clients.model_router import ModelProvider, ModelRouter
+
+
+class ScriptedProvider(ModelProvider):
+    def __init__(self, turns):
+        super().__init__("claude", 10 ** 6, supports_tools=True)
+        self.turns = list(turns)
+        self.tools = []
+
+    async def complete_turn(self, messages, tools=None):
+        self.tools.append(tools)
+        return self.turns.pop(0)
+
+
+def turn(text="", *tool_calls):
+    return {"role": "assistant", "text": text, "tool_calls": list(tool_calls)}
+
+
+def call(name, arguments):
+    return {"id": name, "name": name, "input": arguments}
+
+
+def run(provider, monkeypatch):
+    async def execute(command):
+        return "output"
+
+    monkeypatch.setattr(kubernetes_client, "model_router", ModelRouter([provider]))
+    monkeypatch.setattr(kubernetes_client, "execute_kubectl_command", execute)
+    return asyncio.run(kubernetes_client.generate_response_with_kubectl("question", "claude", tool_use=True))
+
+
+def test_malformed_calls_on_the_first_turn_retry_without_tools(monkeypatch):
+    provider = ScriptedProvider([turn("", call("kubectl_exec", {})), turn("answer")])
+    assert run(provider, monkeypatch) == "answer"
+    assert provider.tools == [kubernetes_client.TOOLS, None]
+
+
+def test_malformed_calls_after_tool_rounds_stop_the_loop(monkeypatch):
+    provider = ScriptedProvider([
+        turn("", call("kubectl_get", {"resource": "pods"})),
+        turn("partial answer", call("kubectl_exec", {}))
+    ])
+    assert run(provider, monkeypatch) == "partial answer"
+    # Every call of a conversation with tool turns keeps the tool config
+    assert provider.tools == [kubernetes_client.TOOLS, kubernetes_client.TOOLS]
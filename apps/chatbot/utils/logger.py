@@ -18,3 +18,12 @@ console_handler.setFormatter(formatter)
 # Add the handler to the logger
 logger.addHandler(console_handler)
 
+
+# Separate logger for structured trace events, one JSON document per line without the text prefix
+trace_logger = logging.getLogger("trace")
+trace_logger.setLevel(logging.INFO)
+trace_logger.propagate = False
+
+trace_handler = logging.StreamHandler()
+trace_handler.setFormatter(logging.Formatter('%(message)s'))
+trace_logger.addHandler(trace_handler)
@@ -0,0 +1,282 @@
+import asyncio
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+import httpx
+from botocore.exceptions import ClientError, ConnectTimeoutError, EndpointConnectionError, ReadTimeoutError
+from opensearchpy.exceptions import ConnectionError as OpenSearchConnectionError
+from prometheus_client import Counter, Gauge
+from utils.logger import logger
+
+# Bedrock error codes that mean the model is busy or degraded rather than the request being invalid
+UNAVAILABLE_ERROR_CODES = {
+    "ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException",
+    "ModelNotReadyException", "ModelTimeoutException", "InternalServerException"
+}
+UNAVAILABLE_HTTP_STATUSES = {429, 502, 503, 504}
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+BREAKER_STATE = Gauge(
+    "chatbot_circuit_breaker_state",
+    "Circuit breaker state per dependency (0 closed, 1 half-open, 2 open)",
+    ["dependency"]
+)
+BREAKER_REJECTIONS = Counter(
+    "chatbot_circuit_breaker_rejections_total",
+    "Calls rejected without reaching the dependency because its breaker was open",
+    ["dependency"]
+)
+RATE_LIMITED = Counter(
+    "chatbot_rate_limited_total",
+    "Calls rejected because the model's rate limit was exhausted for longer than RATE_LIMIT_MAX_WAIT_SECONDS",
+    ["model_id"]
+)
+
+
+class DependencyUnavailableError(Exception):
+    """Raised instead of calling a dependency that is known to be unavailable."""
+    def __init__(self, dependency, message):
+        super().__init__(message)
+        self.dependency = dependency
+
+
+class CircuitOpenError(DependencyUnavailableError):
+    """Raised when a dependency's circuit breaker is open."""
+
+
+class RateLimitExceededError(DependencyUnavailableError):
+    """Raised when no rate limit token became available in time."""
+
+
+def is_unavailable_error(error):
+    """
+    Tells whether an error from Bedrock or OpenSearch means the service is throttled, overloaded or
+    unreachable, as opposed to the request itself being invalid.
+
+    Parameters:
+        error (Exception): The error raised by the call.
+
+    Returns:
+        bool: True for timeouts, throttling, connection and 5xx availability errors.
+    """
+    if isinstance(error, DependencyUnavailableError):
+        return True
+    if isinstance(error, (ReadTimeoutError, ConnectTimeoutError, EndpointConnectionError, OpenSearchConnectionError,
+                          httpx.TransportError, asyncio.TimeoutError)):
+        return True
+    if isinstance(error, ClientError):
+        return error.response.get("Error", {}).get("Code") in UNAVAILABLE_ERROR_CODES
+    # opensearch-py TransportError carries the HTTP status
+    return getattr(error, "status_code", None) in UNAVAILABLE_HTTP_STATUSES
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket, waited on without blocking the event loop.
+
+    Attributes:
+        rate (float): Tokens added per second.
+        capacity (float): The largest burst allowed.
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    async def acquire(self, timeout):
+        """
+        Takes a token, waiting for one if necessary.
+
+        Parameters:
+            timeout (float): The longest time to wait in seconds.
+
+        Returns:
+            bool: True if a token was taken, False if none became available in time.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    A circuit breaker with half-open probing.
+
+    After `failure_threshold` consecutive availability failures the breaker opens and rejects calls
+    for `recovery_timeout` seconds. It then lets `half_open_max_calls` probe calls through: a
+    successful probe closes it, a failed one opens it again.
+
+    Attributes:
+        name (str): The dependency name, used as the metric label.
+        failure_threshold (int): Consecutive failures that open the breaker.
+        recovery_timeout (float): Seconds the breaker stays open before probing.
+        half_open_max_calls (int): Concurrent probe calls allowed while half-open.
+    """
+    def __init__(self, name, failure_threshold, recovery_timeout, half_open_max_calls=1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        BREAKER_STATE.labels(dependency=name).set(STATE_VALUES[CLOSED])
+
+    @property
+    def state(self):
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def before_call(self):
+        """Reserves a call, raising `CircuitOpenError` when the breaker rejects it."""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == OPEN or (self._state == HALF_OPEN and self._probes >= self.half_open_max_calls):
+                BREAKER_REJECTIONS.labels(dependency=self.name).inc()
+                raise CircuitOpenError(self.name, f"{self.name} is temporarily unavailable")
+            if self._state == HALF_OPEN:
+                self._probes += 1
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self._state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._transition(OPEN)
+
+    def record_ignored(self):
+        """Releases a reserved call whose error says nothing about the dependency's health."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes = max(self._probes - 1, 0)
+
+    def _maybe_half_open(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._transition(HALF_OPEN)
+
+    def _transition(self, state):
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        self._probes = 0
+        logger.warning(f"Circuit breaker {self.name}: {self._state} -> {state}")
+        self._state = state
+        BREAKER_STATE.labels(dependency=self.name).set(STATE_VALUES[state])
+
+
+def _parse_rate_limits(value):
+    """Parses "model_id=requests_per_second" pairs separated by commas."""
+    limits = {}
+    for entry in value.split(","):
+        if "=" in entry:
+            model_id, rate = entry.rsplit("=", 1)
+            limits[model_id.strip()] = float(rate)
+    return limits
+
+
+_breakers = {}
+_rate_limiters = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(dependency):
+    """
+    Returns the shared circuit breaker of a dependency, creating it on first use.
+
+    Parameters:
+        dependency (str): The dependency name, e.g. "bedrock:<model id>" or "opensearch".
+
+    Returns:
+        CircuitBreaker: The breaker, configured from CIRCUIT_FAILURE_THRESHOLD,
+            CIRCUIT_RECOVERY_SECONDS and CIRCUIT_HALF_OPEN_MAX_CALLS.
+    """
+    with _registry_lock:
+        if dependency not in _breakers:
+            _breakers[dependency] = CircuitBreaker(
+                dependency,
+                failure_threshold=int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5")),
+                recovery_timeout=float(os.getenv("CIRCUIT_RECOVERY_SECONDS", "30")),
+                half_open_max_calls=int(os.getenv("CIRCUIT_HALF_OPEN_MAX_CALLS", "1"))
+            )
+        return _breakers[dependency]
+
+
+def get_rate_limiter(model_id):
+    """
+    Returns the shared token bucket of a Bedrock model ID, creating it on first use.
+
+    The rate comes from BEDROCK_RATE_LIMITS ("model_id=rps,...") or BEDROCK_DEFAULT_RATE_LIMIT, with
+    bursts of RATE_LIMIT_BURST_SECONDS worth of tokens. Limits apply per chatbot replica.
+
+    Parameters:
+        model_id (str): The Bedrock model ID.
+
+    Returns:
+        TokenBucket: The model's token bucket.
+    """
+    with _registry_lock:
+        if model_id not in _rate_limiters:
+            limits = _parse_rate_limits(os.getenv("BEDROCK_RATE_LIMITS", ""))
+            rate = limits.get(model_id, float(os.getenv("BEDROCK_DEFAULT_RATE_LIMIT", "5")))
+            burst = float(os.getenv("RATE_LIMIT_BURST_SECONDS", "2"))
+            _rate_limiters[model_id] = TokenBucket(rate, max(rate * burst, 1))
+        return _rate_limiters[model_id]
+
+
+def bedrock_dependency(model_id):
+    """Returns the breaker name of a Bedrock model."""
+    return f"bedrock:{model_id}"
+
+
+@asynccontextmanager
+async def guard(dependency, model_id=None):
+    """
+    Runs a call to a dependency under its circuit breaker and, for Bedrock models, its rate limit.
+
+    Availability errors raised inside the block count as breaker failures; other errors (invalid
+    requests, parsing) leave the breaker untouched.
+
+    Parameters:
+        dependency (str): The dependency name.
+        model_id (str, optional): The Bedrock model ID whose rate limit applies.
+
+    Raises:
+        CircuitOpenError: If the breaker is open.
+        RateLimitExceededError: If no rate limit token became available within RATE_LIMIT_MAX_WAIT_SECONDS.
+    """
+    breaker = get_breaker(dependency)
+    breaker.before_call()
+    try:
+        if model_id and not await get_rate_limiter(model_id).acquire(float(os.getenv("RATE_LIMIT_MAX_WAIT_SECONDS", "10"))):
+            RATE_LIMITED.labels(model_id=model_id).inc()
+            raise RateLimitExceededError(dependency, f"Rate limit for {model_id} exhausted")
+        yield
+    except BaseException as e:
+        if is_unavailable_error(e) and not isinstance(e, DependencyUnavailableError):
+            breaker.record_failure()
+        else:
+            breaker.record_ignored()
+        raise
+    breaker.record_success()
@@ -0,0 +1,146 @@
+import contextvars
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from prometheus_client import Counter, Histogram, start_http_server
+from utils.logger import logger, trace_logger
+
+# Request ID shared by every span emitted while handling a single chatbot query
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+REQUEST_DURATION = Histogram(
+    "chatbot_request_duration_seconds",
+    "End-to-end latency of a chatbot query",
+    ["status"],
+    buckets=LATENCY_BUCKETS
+)
+STAGE_DURATION = Histogram(
+    "chatbot_stage_duration_seconds",
+    "Latency of each stage of the chatbot request pipeline",
+    ["stage", "status"],
+    buckets=LATENCY_BUCKETS
+)
+LLM_TOKENS = Counter(
+    "chatbot_llm_tokens_total",
+    "Tokens consumed by LLM invocations",
+    ["model", "direction"]
+)
+
+
+class Span:
+    """
+    A timed stage of a chatbot request.
+
+    Attributes:
+        stage (str): The pipeline stage name, used as the `stage` metric label.
+        attributes (dict): Additional fields written to the structured log entry.
+        status (str): "ok" or "error".
+    """
+    def __init__(self, stage, attributes):
+        self.stage = stage
+        self.attributes = dict(attributes)
+        self.status = "ok"
+
+    def set(self, **attributes):
+        """Adds attributes to the span."""
+        self.attributes.update(attributes)
+
+    def set_error(self, error):
+        """Marks the span as failed without raising, for stages that return error messages."""
+        self.status = "error"
+        self.attributes["error"] = str(error)
+
+
+def _emit(event, stage, status, duration, attributes):
+    record = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "event": event,
+        "request_id": request_id_var.get(),
+        "stage": stage,
+        "status": status,
+        "duration_ms": round(duration * 1000, 3),
+    }
+    record.update(attributes)
+    trace_logger.info(json.dumps(record, default=str))
+
+
+@contextmanager
+def trace_request(**attributes):
+    """
+    Starts a new traced request, assigning the request ID used by all nested spans.
+
+    Parameters:
+        **attributes: Additional fields written to the request's structured log entry.
+
+    Yields:
+        Span: The request span, attributes can be added while the request is processed.
+    """
+    token = request_id_var.set(uuid.uuid4().hex)
+    request_span = Span("request", attributes)
+    start = time.perf_counter()
+    try:
+        yield request_span
+    except Exception as e:
+        request_span.set_error(e)
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        REQUEST_DURATION.labels(status=request_span.status).observe(duration)
+        _emit("request", "request", request_span.status, duration, request_span.attributes)
+        request_id_var.reset(token)
+
+
+@contextmanager
+def span(stage, **attributes):
+    """
+    Times a pipeline stage, exporting it as a structured JSON log entry and a Prometheus histogram sample.
+
+    Parameters:
+        stage (str): The stage name (e.g. "encode_query", "retrieve_documents").
+        **attributes: Additional fields written to the structured log entry.
+
+    Yields:
+        Span: The stage span, attributes can be added while the stage runs.
+    """
+    stage_span = Span(stage, attributes)
+    start = time.perf_counter()
+    try:
+        yield stage_span
+    except Exception as e:
+        stage_span.set_error(e)
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_DURATION.labels(stage=stage, status=stage_span.status).observe(duration)
+        _emit("span", stage, stage_span.status, duration, stage_span.attributes)
+
+
+def record_token_usage(llm_span, model, input_tokens, output_tokens):
+    """
+    Records the token usage of an LLM invocation on its span and in the token counter.
+
+    Parameters:
+        llm_span (Span): The span of the LLM invocation.
+        model (str): The model identifier used as the metric label.
+        input_tokens (int): The number of prompt tokens, or None if unknown.
+        output_tokens (int): The number of completion tokens, or None if unknown.
+    """
+    llm_span.set(input_tokens=input_tokens, output_tokens=output_tokens)
+    if input_tokens is not None:
+        LLM_TOKENS.labels(model=model, direction="input").inc(input_tokens)
+    if output_tokens is not None:
+        LLM_TOKENS.labels(model=model, direction="output").inc(output_tokens)
+
+
+def start_metrics_server():
+    """
+    Starts the Prometheus metrics HTTP endpoint on the port set by `METRICS_PORT` (default 9090).
+    """
+    port = int(os.getenv("METRICS_PORT", "9090"))
+    start_http_server(port)
+    logger.info(f"Prometheus metrics available on port {port}")
@@ -509,6 +509,7 @@ module "agentic_chatbot" {
   name = var.name
   collection_name = var.opensearch_collection_name
   collection_arn = module.ingestion_pipeline[0].collection_arn
+  archive_bucket_arn = module.ingestion_pipeline[0].archive_bucket_arn
   region = local.region
   eks_cluster_oidc_arn = module.eks.oidc_provider_arn
   container_builder = local.container_builder
@@ -540,6 +541,7 @@ resource "helm_release" "agentic-chatbot" {
       region: ${local.region}
       role: ${module.agentic_chatbot[0].chatbot_role_arn}
       opensearch_endpoint: ${replace(module.ingestion_pipeline[0].collection_endpoint,"/(^https://)|(/$)/","")}
+      archive_bucket: ${module.ingestion_pipeline[0].archive_bucket_name}
     resources:
       limits:
         cpu: "1000m"
@@ -43,6 +43,26 @@ resource "aws_iam_role_policy" "bedrock_invoke_policy" {
   depends_on = [module.irsa_role]
 }
 
+# Permission to read the raw log archive
+resource "aws_iam_role_policy" "log_archive_read_policy" {
+  name = "${var.name}-log-archive-read-policy"
+  role = module.irsa_role.iam_role_name
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:GetObject"
+        ]
+        Resource = ["${var.archive_bucket_arn}/logs/*"]
+      }
+    ]
+  })
+  depends_on = [module.irsa_role]
+}
+
 # IAM policy for ChatBot to use OpenSearch
 resource "aws_iam_policy" "chatbot_opensearch_policy" {
   name        = "${var.name}-chatbot-opensearch-policy"
@@ -21,3 +21,7 @@ variable "eks_cluster_oidc_arn" {
 variable "container_builder" {
   type        = string
 }
+
+variable "archive_bucket_arn" {
+  type        = string
+}
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import re
+from collections import Counter
+from datetime import datetime, timezone
+
+ANOMALY_INDEX_PREFIX = "eks-anomalies"
+
+# Error signatures tracked per namespace/pod, matched against the raw record (container log line,
+# Kubernetes event or kubelet journal entry)
+SIGNATURES = {
+    "OOMKilled": re.compile(r"OOMKilled|oom-kill|Out of memory|OOM killer", re.IGNORECASE),
+    "CrashLoopBackOff": re.compile(r"CrashLoopBackOff|Back-off restarting failed container", re.IGNORECASE),
+    "ProbeFailure": re.compile(r"(?:Liveness|Readiness|Startup) probe failed|\"reason\":\s*\"Unhealthy\"", re.IGNORECASE),
+    "ImagePullError": re.compile(r"ErrImagePull|ImagePullBackOff|Failed to pull image", re.IGNORECASE),
+}
+
+# Fallback for records without Kubernetes metadata, e.g. kubelet messages
+POD_REFERENCE = re.compile(r'pod="?(?P<namespace>[a-z0-9-]+)/(?P<pod>[a-z0-9.-]+)')
+
+SAMPLE_LENGTH = 500
+
+# Lines differing only by timestamps, IDs or counters are considered repeats of each other
+VARIABLE_PARTS = re.compile(r"[0-9a-f]{8,}|\d+", re.IGNORECASE)
+
+
+def anomaly_index_name(day):
+    return f"{ANOMALY_INDEX_PREFIX}-{day}"
+
+
+def pod_of(text):
+    """Return the (namespace, pod) a record refers to, or ("unknown", "unknown")."""
+    try:
+        record = json.loads(text)
+    except (ValueError, TypeError):
+        record = None
+
+    if isinstance(record, dict):
+        # Container logs enriched by the Fluent Bit kubernetes filter
+        kubernetes = record.get("kubernetes")
+        if isinstance(kubernetes, dict) and kubernetes.get("pod_name"):
+            return kubernetes.get("namespace_name", "unknown"), kubernetes["pod_name"]
+        # Kubernetes events
+        involved = record.get("involvedObject")
+        if isinstance(involved, dict) and involved.get("name"):
+            return involved.get("namespace", "unknown"), involved["name"]
+
+    match = POD_REFERENCE.search(text)
+    if match:
+        return match.group("namespace"), match.group("pod")
+    return "unknown", "unknown"
+
+
+def line_hash(text):
+    """
+    A hex digest of a record that is the same for repeats of a line from the same pod. The pod is
+    hashed separately, masking the variable parts would otherwise merge pods of a ReplicaSet.
+    """
+    namespace, pod = pod_of(text)
+    masked = VARIABLE_PARTS.sub("#", text)
+    return hashlib.blake2b(f"{namespace}/{pod}\0{masked}".encode('utf-8'), digest_size=16).hexdigest()
+
+
+def detect_signatures(text):
+    """Return the names of the error signatures found in a record."""
+    return [name for name, pattern in SIGNATURES.items() if pattern.search(text)]
+
+
+def aggregate(logs):
+    """
+    Count error signatures per namespace/pod in a batch of records.
+
+    Returns:
+        counts (Counter): (namespace, pod, signature) -> occurrences
+        samples (dict): (namespace, pod, signature) -> first matching record
+    """
+    counts = Counter()
+    samples = {}
+    for text in logs:
+        signatures = detect_signatures(text)
+        if not signatures:
+            continue
+        namespace, pod = pod_of(text)
+        for signature in signatures:
+            key = (namespace, pod, signature)
+            counts[key] += 1
+            samples.setdefault(key, text[:SAMPLE_LENGTH])
+    return counts, samples
+
+
+def anomaly_documents(counts, samples, index_name, timestamp=None):
+    """Build one compact bulk document per namespace/pod/signature of the batch."""
+    timestamp = (timestamp or datetime.now(timezone.utc)).isoformat()
+    return [
+        {
+            "_index": index_name,
+            "_source": {
+                "timestamp": timestamp,
+                "namespace": namespace,
+                "pod": pod,
+                "signature": signature,
+                "count": count,
+                "sample": samples[(namespace, pod, signature)]
+            }
+        }
+        for (namespace, pod, signature), count in counts.items()
+    ]
+
+
+ANOMALY_INDEX_BODY = {
+    "mappings": {
+        "properties": {
+            "timestamp": {"type": "date"},
+            "namespace": {"type": "keyword"},
+            "pod": {"type": "keyword"},
+            "signature": {"type": "keyword"},
+            "count": {"type": "integer"},
+            "sample": {"type": "text", "index": False}
+        }
+    }
+}
@@ -0,0 +1,113 @@
+import io
+import logging
+import os
+from collections import defaultdict
+
+import boto3
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from anomalies import pod_of
+
+logger = logging.getLogger()
+
+ARCHIVE_PREFIX = "logs"
+
+ARCHIVE_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("namespace", pa.string()),
+    ("pod", pa.string()),
+    ("log", pa.string()),
+])
+
+
+class S3Backend:
+    """Writes archive files to an S3 bucket"""
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.s3 = boto3.client('s3')
+
+    def write(self, key, data):
+        self.s3.put_object(Bucket=self.bucket, Key=key, Body=data)
+
+    def delete(self, key):
+        self.s3.delete_object(Bucket=self.bucket, Key=key)
+
+
+class LocalBackend:
+    """Writes archive files under a local directory, for tests and the load test"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def write(self, key, data):
+        path = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as archive_file:
+            archive_file.write(data)
+
+    def delete(self, key):
+        path = os.path.join(self.root, key)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def archive_backend():
+    """The backend configured by ARCHIVE_PATH (local) or ARCHIVE_BUCKET (S3), None if archiving is off"""
+    if os.environ.get('ARCHIVE_PATH'):
+        return LocalBackend(os.environ['ARCHIVE_PATH'])
+    if os.environ.get('ARCHIVE_BUCKET'):
+        return S3Backend(os.environ['ARCHIVE_BUCKET'])
+    return None
+
+
+def record_id(record):
+    """A stable ID of a Kinesis record, the same when the record is re-driven"""
+    return record.get('eventID') or record['kinesis']['sequenceNumber']
+
+
+def archive_logs(backend, records, logs, day):
+    """
+    Write the raw logs of a batch as zstd-compressed Parquet, one file per namespace under
+    logs/date=YYYYMMDD/namespace=<namespace>/.
+
+    Files are named after the first record of the batch. A batch retried after an error starts
+    at the same record and overwrites its files, a batch re-driven from a failed record starts
+    at that record and gets new files, holding the records that `trim_archive` removed from
+    the failed batch's files. Returns the archive key of each record position.
+    """
+    rows = defaultdict(list)
+    for position, (record, log) in enumerate(zip(records, logs)):
+        if log:
+            namespace, pod = pod_of(log)
+            rows[namespace].append((position, record_id(record), pod, log))
+
+    batch_name = records[0]['kinesis']['sequenceNumber']
+    keys = {}
+    for namespace, entries in rows.items():
+        table = pa.Table.from_pydict({
+            "id": [entry[1] for entry in entries],
+            "namespace": [namespace] * len(entries),
+            "pod": [entry[2] for entry in entries],
+            "log": [entry[3] for entry in entries],
+        }, schema=ARCHIVE_SCHEMA)
+        buffer = io.BytesIO()
+        pq.write_table(table, buffer, compression='zstd')
+        key = f"{ARCHIVE_PREFIX}/date={day}/namespace={namespace}/{batch_name}.parquet"
+        backend.write(key, buffer.getvalue())
+        for entry in entries:
+            keys[entry[0]] = key
+    logger.info(f"Archived {sum(len(entries) for entries in rows.values())} logs in {len(rows)} files")
+    return keys
+
+
+def trim_archive(backend, records, logs, day, failed_position, keys):
+    """
+    Rewrite the archive files of a batch with the records before `failed_position`, the records
+    Lambda checkpoints, so the files do not overlap the files of the re-driven records. `keys`
+    are the files written by `archive_logs`, those left without records are deleted.
+    """
+    kept = set(archive_logs(backend, records, logs[:failed_position], day).values()) if failed_position else set()
+    for key in keys - kept:
+        backend.delete(key)
@@ -0,0 +1,69 @@
+import logging
+import os
+import threading
+
+logger = logging.getLogger()
+
+
+class AdaptiveController:
+    """
+    Sizes embedding concurrency and bulk requests from the latency observed by a warm container.
+
+    Embedding concurrency follows additive increase / multiplicative decrease: it grows by one
+    after each batch that was not throttled and halves when Bedrock throttles. Bulk requests are
+    sized so one request takes about `bulk_target_seconds`, from an exponentially weighted
+    average of the per-document bulk latency, capped by the largest batch seen, and halve when
+    OpenSearch throttles. With `adaptive` off both stay at their initial values.
+    """
+
+    def __init__(self, concurrency=None, max_concurrency=None, bulk_size=None, min_bulk_size=None,
+                 max_bulk_size=None, bulk_target_seconds=None, adaptive=None):
+        self.adaptive = adaptive if adaptive is not None else os.environ.get('ADAPTIVE_BATCHING', 'true').lower() == 'true'
+        self.max_concurrency = max_concurrency or int(os.environ.get('EMBEDDING_MAX_CONCURRENCY', '16'))
+        self.concurrency = min(concurrency or int(os.environ.get('EMBEDDING_CONCURRENCY', '4')), self.max_concurrency)
+        self.min_bulk_size = min_bulk_size or int(os.environ.get('BULK_MIN_DOCS', '20'))
+        self.max_bulk_size = max_bulk_size or int(os.environ.get('BULK_MAX_DOCS', '500'))
+        self.bulk_size = bulk_size or int(os.environ.get('BULK_DOCS', '100'))
+        self.bulk_target_seconds = bulk_target_seconds or float(os.environ.get('BULK_TARGET_SECONDS', '2'))
+        self._seconds_per_doc = None
+        self._largest_batch = 0
+        self._lock = threading.Lock()
+
+    def observe_embeddings(self, throttled):
+        """Adjust concurrency after a batch of embedding calls"""
+        if not self.adaptive:
+            return
+        with self._lock:
+            if throttled:
+                self.concurrency = max(1, self.concurrency // 2)
+            else:
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+        logger.info(f"Embedding concurrency: {self.concurrency}")
+
+    def observe_bulk(self, docs, seconds, batch_docs=None):
+        """
+        Adjust the bulk request size after indexing `docs` documents in `seconds`. Every request
+        is observed, and the size never grows past the largest batch seen (`batch_docs`, the
+        documents of the invocation), which no request could fill.
+        """
+        if not self.adaptive or docs <= 0:
+            return
+        with self._lock:
+            seconds_per_doc = seconds / docs
+            if self._seconds_per_doc is None:
+                self._seconds_per_doc = seconds_per_doc
+            else:
+                self._seconds_per_doc = 0.7 * self._seconds_per_doc + 0.3 * seconds_per_doc
+            self._largest_batch = max(self._largest_batch, batch_docs or docs)
+            target = int(self.bulk_target_seconds / self._seconds_per_doc) if self._seconds_per_doc > 0 else self.max_bulk_size
+            upper = max(self.min_bulk_size, min(self.max_bulk_size, self._largest_batch))
+            self.bulk_size = max(self.min_bulk_size, min(upper, target))
+        logger.info(f"Bulk request size: {self.bulk_size}")
+
+    def observe_bulk_throttled(self):
+        """Halve the bulk request size after OpenSearch throttled (429) or failed a request"""
+        if not self.adaptive:
+            return
+        with self._lock:
+            self.bulk_size = max(self.min_bulk_size, self.bulk_size // 2)
+        logger.info(f"Bulk request size: {self.bulk_size}")
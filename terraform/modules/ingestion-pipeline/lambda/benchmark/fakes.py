@@ -0,0 +1,117 @@
+"""
+Local stand-ins for Amazon Bedrock and OpenSearch Serverless used by the ingestion load test.
+"""
+import hashlib
+import io
+import json
+import random
+import threading
+import time
+
+from botocore.exceptions import ClientError
+from opensearchpy.serializer import JSONSerializer
+
+
+class FakeBedrockRuntime:
+    """
+    Implements `invoke_model` of the bedrock-runtime client with a deterministic embedder.
+
+    Each call sleeps for `latency` seconds (plus up to `jitter`) and fails with a
+    ThrottlingException with probability `throttle_rate`, like Bedrock does past its quota.
+    """
+    def __init__(self, dimension=1024, latency=0.05, jitter=0.0, throttle_rate=0.0, seed=0):
+        self.dimension = dimension
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.calls = 0
+        self.throttled = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def invoke_model(self, modelId, body, contentType=None, accept=None):
+        with self._lock:
+            self.calls += 1
+            throttled = self._random.random() < self.throttle_rate
+            delay = self.latency + self._random.random() * self.jitter
+            if throttled:
+                self.throttled += 1
+        time.sleep(delay)
+        if throttled:
+            raise ClientError(
+                {"Error": {"Code": "ThrottlingException", "Message": "Too many requests"}},
+                "InvokeModel"
+            )
+        text = json.loads(body)["inputText"]
+        return {"body": io.BytesIO(json.dumps({"embedding": self.embed(text)}).encode("utf-8"))}
+
+    def embed(self, text):
+        """Expands a hash of the text into a vector, identical texts get identical vectors."""
+        seed = int.from_bytes(hashlib.md5(text.encode("utf-8")).digest()[:8], "little")
+        generator = random.Random(seed)
+        return [generator.uniform(-1, 1) for _ in range(self.dimension)]
+
+
+class _FakeIndices:
+    def __init__(self, sink):
+        self._sink = sink
+
+    def exists(self, index):
+        return index in self._sink.documents
+
+    def create(self, index, body=None):
+        self._sink.documents.setdefault(index, {})
+        return {"acknowledged": True, "index": index}
+
+
+class InMemoryBulkSink:
+    """
+    An in-memory stand-in for the OpenSearch client used by the processor.
+
+    It implements `indices.exists`, `indices.create` and the `bulk` API that `helpers.bulk` and
+    `helpers.streaming_bulk` call, keeping the indexed documents per index by generated `_id`.
+    Each bulk request sleeps for `latency` seconds. `item_status`, a function of the document
+    source, can return an error status to reject single documents of a request.
+    """
+    def __init__(self, latency=0.0, item_status=None):
+        self.documents = {}
+        self.indices = _FakeIndices(self)
+        self.transport = type("Transport", (), {"serializer": JSONSerializer()})()
+        self.latency = latency
+        self.item_status = item_status
+        self.requests = 0
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def bulk(self, body=None, index=None, **kwargs):
+        if isinstance(body, bytes):
+            body = body.decode("utf-8")
+        lines = iter([json.loads(line) for line in body.splitlines() if line.strip()])
+        time.sleep(self.latency)
+        items = []
+        errors = False
+        with self._lock:
+            self.requests += 1
+            for action in lines:
+                op_type, metadata = next(iter(action.items()))
+                index_name = metadata.get("_index", index)
+                documents = self.documents.setdefault(index_name, {})
+                if op_type == "delete":
+                    found = documents.pop(metadata["_id"], None) is not None
+                    items.append({"delete": {"_index": index_name, "_id": metadata["_id"], "status": 200 if found else 404}})
+                    errors = errors or not found
+                    continue
+                source = next(lines)
+                status = self.item_status(source) if self.item_status else None
+                if status:
+                    items.append({op_type: {"_index": index_name, "status": status, "error": {"type": "fake_error"}}})
+                    errors = True
+                    continue
+                self._next_id += 1
+                document_id = metadata.get("_id") or str(self._next_id)
+                documents[document_id] = source
+                items.append({op_type: {"_index": index_name, "_id": document_id, "status": 201, "result": "created"}})
+        return {"took": 0, "errors": errors, "items": items}
+
+    def count(self, prefix=""):
+        return sum(len(docs) for index, docs in self.documents.items() if index.startswith(prefix))
@@ -0,0 +1,254 @@
+"""
+Local replay and load test for the ingestion Lambda.
+
+Replays recorded or synthetic Fluent Bit records through `processor.handler` in Kinesis-sized
+batches, with Bedrock and OpenSearch replaced by local stand-ins, and reports throughput, Bedrock
+calls per record, peak memory and batch latency percentiles for each batch size and embedding
+pool size. Batches that report item failures are re-driven from the failed record, as Kinesis
+does, so throttling shows up as extra Bedrock calls and latency.
+
+Usage (from terraform/modules/ingestion-pipeline/lambda, with requirements.txt installed):
+    python -m benchmark.load_test --records 2000 --batch-sizes 50 100 200 --pool-sizes 1 4 8 \
+        --bedrock-latency-ms 60 --throttle-rate 0.02
+"""
+import argparse
+import base64
+import json
+import logging
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+import types
+
+# processor reads its configuration and AWS credentials at import time
+os.environ.setdefault("OPENSEARCH_ENDPOINT", "https://localhost")
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ.setdefault("AWS_DEFAULT_REGION", os.environ["AWS_REGION"])
+os.environ.setdefault("EMBEDDING_MODEL", "amazon.titan-embed-text-v2:0")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "load-test")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "load-test")
+
+import opensearch_client  # noqa: E402
+import processor  # noqa: E402
+from batching import AdaptiveController  # noqa: E402
+from benchmark.fakes import FakeBedrockRuntime, InMemoryBulkSink  # noqa: E402
+
+NAMESPACES = ["payments", "checkout", "catalog", "kube-system"]
+CONTAINER_MESSAGES = [
+    "GET /api/v1/orders/{n} 200 {n}ms",
+    "Connection to postgres:5432 refused, retrying in {n}s",
+    "java.lang.OutOfMemoryError: Java heap space",
+    "Processed {n} ledger entries",
+    "upstream request timeout after {n}ms",
+]
+EVENT_REASONS = [
+    ("BackOff", "Back-off restarting failed container api in pod {pod}"),
+    ("Unhealthy", "Readiness probe failed: HTTP probe failed with statuscode: 503"),
+    ("Failed", "Failed to pull image \"registry.local/api:{n}\": ErrImagePull"),
+    ("OOMKilling", "Memory cgroup out of memory: Killed process {n} (java)"),
+]
+
+
+def synthetic_records(count, seed=0):
+    """
+    Generates Fluent Bit records shaped like the ones the cluster ships to Kinesis: container logs
+    enriched with Kubernetes metadata (70%) and Kubernetes events (30%).
+
+    Parameters:
+        count (int): The number of records.
+        seed (int): The random seed, the same seed gives the same records.
+
+    Returns:
+        list: The records as JSON strings.
+    """
+    generator = random.Random(seed)
+    records = []
+    for _ in range(count):
+        namespace = generator.choice(NAMESPACES)
+        pod = f"{namespace}-api-7d9f8c6b5-{generator.randrange(16 ** 5):05x}"
+        n = generator.randrange(1, 5000)
+        if generator.random() < 0.7:
+            record = {
+                "kubernetes": {"namespace_name": namespace, "pod_name": pod, "container_name": "api"},
+                "log": generator.choice(CONTAINER_MESSAGES).format(n=n)
+            }
+        else:
+            reason, message = generator.choice(EVENT_REASONS)
+            record = {
+                "involvedObject": {"kind": "Pod", "namespace": namespace, "name": pod},
+                "reason": reason,
+                "message": message.format(n=n, pod=pod),
+                "type": "Warning"
+            }
+        records.append(json.dumps(record, separators=(",", ":")))
+    return records
+
+
+def load_records(path):
+    """
+    Loads recorded Fluent Bit records, one JSON record per line (for example the decoded `Data` of
+    `aws kinesis get-records`).
+
+    Parameters:
+        path (str): The path to the JSON lines file.
+
+    Returns:
+        list: The records as strings.
+    """
+    with open(path, "r", encoding="utf-8") as records_file:
+        return [line.rstrip("\n") for line in records_file if line.strip()]
+
+
+def kinesis_event(records, first_sequence):
+    """Wraps records into a Kinesis event as delivered by the event source mapping."""
+    return {"Records": [
+        {
+            "kinesis": {
+                "data": base64.b64encode(record.encode("utf-8")).decode("ascii"),
+                "sequenceNumber": str(first_sequence + offset),
+                "partitionKey": "load-test"
+            },
+            "eventSource": "aws:kinesis"
+        }
+        for offset, record in enumerate(records)
+    ]}
+
+
+def percentile(values, pct):
+    """Computes a percentile using the nearest-rank method, 0.0 when there are no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def run_load_test(records, batch_size, pool_size, bedrock, sink, adaptive=True, max_redrives=20):
+    """
+    Replays records through `processor.handler` in batches of `batch_size`.
+
+    Parameters:
+        records (list): The Fluent Bit records.
+        batch_size (int): The records per invocation, as `batch_size` of the event source mapping.
+        pool_size (int): The initial embedding concurrency, as EMBEDDING_CONCURRENCY.
+        bedrock (FakeBedrockRuntime): The Bedrock stand-in.
+        sink (InMemoryBulkSink): The OpenSearch stand-in.
+        adaptive (bool): Whether concurrency and bulk size adapt to latency, as ADAPTIVE_BATCHING.
+        max_redrives (int): Consecutive re-drives of the same record before giving up on it.
+
+    Returns:
+        dict: Throughput, Bedrock calls per record, peak memory and batch latency percentiles.
+    """
+    processor.bedrock_runtime = bedrock
+    opensearch_client.client = sink
+    # Every configuration starts from a cold container
+    processor.controller = AdaptiveController(concurrency=pool_size, adaptive=adaptive)
+    processor.get_cached_embedding.cache_clear()
+    requests_before = sink.requests
+
+    latencies = []
+    invocations = redriven = dropped = 0
+    position = 0
+    redrives = 0
+    tracemalloc.start()
+    started = time.perf_counter()
+    while position < len(records):
+        batch = records[position:position + batch_size]
+        context = types.SimpleNamespace(
+            aws_request_id=f"load-test-{invocations}",
+            get_remaining_time_in_millis=lambda: 300000
+        )
+        batch_started = time.perf_counter()
+        response = processor.handler(kinesis_event(batch, position), context)
+        latencies.append((time.perf_counter() - batch_started) * 1000)
+        invocations += 1
+
+        failures = response.get("batchItemFailures") or []
+        if not failures:
+            position += len(batch)
+            redrives = 0
+            continue
+        failed = int(failures[0]["itemIdentifier"])
+        redriven += position + len(batch) - failed
+        redrives = redrives + 1 if failed == position else 0
+        if redrives > max_redrives:
+            # The record exhausted its retries, Kinesis would move past it after maximum_retry_attempts
+            dropped += 1
+            failed += 1
+            redrives = 0
+        position = failed
+    elapsed = time.perf_counter() - started
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    indexed = sink.count("eks-cluster-")
+    return {
+        "batch_size": batch_size,
+        "pool_size": pool_size,
+        "adaptive": adaptive,
+        "records": len(records),
+        "invocations": invocations,
+        "docs_indexed": indexed,
+        "docs_per_second": indexed / elapsed if elapsed > 0 else 0.0,
+        "bedrock_calls_per_record": bedrock.calls / len(records) if records else 0.0,
+        "bedrock_throttled": bedrock.throttled,
+        "records_redriven": redriven,
+        "records_dropped": dropped,
+        "anomaly_docs": sink.count("eks-anomalies-"),
+        "bulk_requests": sink.requests - requests_before,
+        "final_concurrency": processor.controller.concurrency,
+        "final_bulk_size": processor.controller.bulk_size,
+        "peak_memory_mb": peak_memory / (1024 * 1024),
+        "batch_latency_p50_ms": percentile(latencies, 50),
+        "batch_latency_p99_ms": percentile(latencies, 99)
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Local replay and load test for the ingestion Lambda")
+    parser.add_argument("--records", default="1000",
+                        help="A JSON lines file of recorded Fluent Bit records, or a number of synthetic records")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100],
+                        help="One or more event source mapping batch sizes to test")
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[int(os.environ.get("EMBEDDING_CONCURRENCY", "4"))],
+                        help="One or more initial embedding concurrencies (EMBEDDING_CONCURRENCY) to test")
+    parser.add_argument("--fixed", action="store_true",
+                        help="Keep concurrency and bulk size fixed (ADAPTIVE_BATCHING=false)")
+    parser.add_argument("--bedrock-latency-ms", type=float, default=50, help="Latency of each embedding call")
+    parser.add_argument("--bedrock-jitter-ms", type=float, default=20, help="Extra random latency of each embedding call")
+    parser.add_argument("--throttle-rate", type=float, default=0.0,
+                        help="Probability that an embedding call is throttled")
+    parser.add_argument("--bulk-latency-ms", type=float, default=20, help="Latency of each bulk request")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic records and the throttling")
+    parser.add_argument("--verbose", action="store_true", help="Keep the processor's INFO logs")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.CRITICAL)
+    if args.records.isdigit():
+        records = synthetic_records(int(args.records), seed=args.seed)
+    else:
+        records = load_records(args.records)
+
+    for batch_size in args.batch_sizes:
+        for pool_size in args.pool_sizes:
+            bedrock = FakeBedrockRuntime(
+                latency=args.bedrock_latency_ms / 1000,
+                jitter=args.bedrock_jitter_ms / 1000,
+                throttle_rate=args.throttle_rate,
+                seed=args.seed
+            )
+            sink = InMemoryBulkSink(latency=args.bulk_latency_ms / 1000)
+            result = run_load_test(records, batch_size, pool_size, bedrock, sink, adaptive=not args.fixed)
+            print(json.dumps(result))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+import hashlib
+import logging
+import os
+import re
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from opensearchpy import helpers
+
+import opensearch_client
+from anomalies import ANOMALY_INDEX_PREFIX, line_hash
+from opensearch_client import create_index, index_exists
+
+logger = logging.getLogger()
+
+DAILY_INDEX = re.compile(r"^eks-cluster-(\d{8})$")
+WEEKLY_INDEX = re.compile(r"^eks-cluster-weekly-(\d{4})w(\d{2})$")
+ANOMALY_INDEX = re.compile(rf"^{ANOMALY_INDEX_PREFIX}-(\d{{8}})$")
+
+# OpenSearch Serverless has no index aliases, the physical index of each day is kept as
+# documents of this index and resolved by the chatbot
+INDEX_MAP = os.environ.get('INDEX_MAP_INDEX', 'eks-index-map')
+
+retention_days = int(os.environ.get('RETENTION_DAYS', '30'))
+# Weeks whose last day is older than this are merged into a weekly index, 0 disables compaction
+compact_after_days = int(os.environ.get('COMPACT_AFTER_DAYS', '7'))
+page_size = int(os.environ.get('COMPACTION_PAGE_SIZE', '500'))
+# Distinct lines counted per day, lines beyond it are copied without deduplication
+max_distinct_lines = int(os.environ.get('COMPACTION_MAX_DISTINCT_LINES', '500000'))
+# No new day is started this long before the Lambda timeout, the next run continues
+stop_margin_seconds = float(os.environ.get('COMPACTION_STOP_MARGIN_SECONDS', '300'))
+# How long to wait for the copied documents of a day to be searchable before giving up
+verify_seconds = float(os.environ.get('COMPACTION_VERIFY_SECONDS', '120'))
+
+INDEX_MAP_BODY = {
+    "mappings": {
+        "properties": {
+            "day": {"type": "keyword"},
+            "index": {"type": "keyword"},
+            "timestamp": {"type": "date"}
+        }
+    }
+}
+
+# Same vectors as the daily indices, stored as fp16 to halve the memory of the graph
+WEEKLY_INDEX_BODY = {
+    "settings": {
+        "index": {
+            "knn": True,
+            "knn.algo_param.ef_search": 100
+        }
+    },
+    "mappings": {
+        "properties": {
+            "embedding": {
+                "type": "knn_vector",
+                "dimension": 1024,
+                "method": {
+                    "name": "hnsw",
+                    "space_type": "l2",
+                    "engine": "faiss",
+                    "parameters": {
+                        "ef_construction": 128,
+                        "m": 16,
+                        "encoder": {
+                            "name": "sq",
+                            "parameters": {"type": "fp16"}
+                        }
+                    }
+                }
+            },
+            "log": {"type": "text"},
+            "id": {"type": "keyword"},
+            "archive": {"type": "keyword"},
+            "log_hash": {"type": "keyword"},
+            "count": {"type": "integer"},
+            "days": {"type": "keyword"}
+        }
+    }
+}
+
+
+def weekly_index_name(day):
+    """The weekly index of a YYYYMMDD day, named after its ISO week"""
+    year, week, _ = datetime.strptime(day, "%Y%m%d").isocalendar()
+    return f"eks-cluster-weekly-{year}w{week:02d}"
+
+
+def last_day_of_week(index_name):
+    """The last day (Sunday) of the ISO week of a weekly index"""
+    year, week = WEEKLY_INDEX.match(index_name).groups()
+    return datetime.fromisocalendar(int(year), int(week), 7).strftime("%Y%m%d")
+
+
+def dedupe_key(day, source):
+    """
+    Repeats of a line are merged per pod and day, each weekly document belongs to one day. The
+    hash of the full line stored at ingestion is used, archived documents only index a snippet.
+    """
+    log_hash = source.get("log_hash") or line_hash(source.get("log", ""))
+    return hashlib.blake2b(f"{day}\0{log_hash}".encode('utf-8'), digest_size=16).digest()
+
+
+def list_indices(pattern):
+    """The names of the indices matching `pattern`"""
+    return sorted(opensearch_client.client.indices.get(index=pattern, ignore_unavailable=True, allow_no_indices=True))
+
+
+def delete_index(index_name):
+    logger.info(f"Deleting index: {index_name}")
+    opensearch_client.client.indices.delete(index=index_name)
+
+
+def matching_ids(index_name, query):
+    """The IDs of the documents of `index_name` matching `query`"""
+    return [hit["_id"] for hit in helpers.scan(opensearch_client.client, index=index_name, query={"query": query, "_source": False}, size=page_size)]
+
+
+def delete_documents(index_name, document_ids):
+    if not document_ids:
+        return
+    helpers.bulk(
+        opensearch_client.client,
+        ({"_op_type": "delete", "_index": index_name, "_id": document_id} for document_id in document_ids),
+        chunk_size=page_size,
+        raise_on_error=True,
+        request_timeout=60,
+    )
+
+
+def count_documents(index_name, query):
+    return opensearch_client.client.count(index=index_name, body={"query": query})["count"]
+
+
+def mapped_days():
+    """The days already resolved to a weekly index by the index map"""
+    if not index_exists(INDEX_MAP):
+        return set()
+    return {hit["_source"]["day"] for hit in helpers.scan(opensearch_client.client, index=INDEX_MAP, query={"query": {"match_all": {}}}, size=page_size)}
+
+
+def unmap_index(index_name):
+    """Remove the index map entries pointing at a deleted weekly index"""
+    if not index_exists(INDEX_MAP):
+        return
+    document_ids = matching_ids(INDEX_MAP, {"term": {"index": index_name}})
+    delete_documents(INDEX_MAP, document_ids)
+    logger.info(f"Removed {len(document_ids)} index map entries of {index_name}")
+
+
+def enforce_retention(today):
+    """Delete daily, weekly and anomaly indices whose days are all older than the retention"""
+    oldest = (today - timedelta(days=retention_days)).strftime("%Y%m%d")
+    deleted = []
+    for index_name in list_indices("eks-cluster-*") + list_indices(f"{ANOMALY_INDEX_PREFIX}-*"):
+        daily = DAILY_INDEX.match(index_name) or ANOMALY_INDEX.match(index_name)
+        if daily:
+            expired = daily.group(1) < oldest
+        elif WEEKLY_INDEX.match(index_name):
+            expired = last_day_of_week(index_name) < oldest
+        else:
+            continue
+        if expired:
+            delete_index(index_name)
+            if WEEKLY_INDEX.match(index_name):
+                unmap_index(index_name)
+            deleted.append(index_name)
+    return deleted
+
+
+def count_lines(day, daily_index):
+    """
+    First pass: occurrences of each distinct line of a day, without loading embeddings. At most
+    `max_distinct_lines` lines are counted, the others are copied as they are.
+    """
+    counts = {}
+    for hit in helpers.scan(opensearch_client.client, index=daily_index, query={"_source": ["log", "log_hash"]}, size=page_size):
+        key = dedupe_key(day, hit["_source"])
+        if key in counts:
+            counts[key] += 1
+        elif len(counts) < max_distinct_lines:
+            counts[key] = 1
+    return counts
+
+
+def compacted_documents(day, daily_index, weekly_index, counts):
+    """Second pass: the first document of each distinct line with its count, `counts` is consumed"""
+    for hit in helpers.scan(opensearch_client.client, index=daily_index, size=page_size):
+        source = hit["_source"]
+        key = dedupe_key(day, source)
+        count = counts.get(key)
+        if count == 0:
+            # Already written
+            continue
+        if count is not None:
+            counts[key] = 0
+        document = {
+            "embedding": source["embedding"],
+            "log": source.get("log", ""),
+            "id": source.get("id"),
+            "count": count or 1,
+            "days": [day]
+        }
+        if source.get("archive"):
+            document["archive"] = source["archive"]
+        if source.get("log_hash"):
+            document["log_hash"] = source["log_hash"]
+        yield {"_index": weekly_index, "_source": document}
+
+
+def wait_for_count(index_name, query, expected):
+    """Wait until `expected` documents match `query`, OpenSearch Serverless makes writes searchable with a delay"""
+    deadline = time.monotonic() + verify_seconds
+    while True:
+        found = count_documents(index_name, query)
+        if found == expected or time.monotonic() > deadline:
+            return found
+        time.sleep(5)
+
+
+def compact_day(weekly_index, day, daily_index):
+    """
+    Copy the deduplicated documents of one daily index into `weekly_index`, then point the day at
+    it in the index map and delete the daily index.
+
+    Documents of the day left in the weekly index by an interrupted run are removed first. The
+    daily index is only deleted once its copy is searchable in full, otherwise it is kept and
+    the day is retried by the next run. Returns whether the day was compacted.
+    """
+    day_query = {"term": {"days": day}}
+    leftovers = matching_ids(weekly_index, day_query)
+    if leftovers:
+        logger.info(f"Removing {len(leftovers)} documents of {day} left in {weekly_index} by an interrupted run")
+        delete_documents(weekly_index, leftovers)
+
+    counts = count_lines(day, daily_index)
+    written, _ = helpers.bulk(
+        opensearch_client.client,
+        compacted_documents(day, daily_index, weekly_index, counts),
+        chunk_size=page_size,
+        raise_on_error=True,
+        request_timeout=60,
+    )
+    del counts
+
+    found = wait_for_count(weekly_index, day_query, written)
+    if found != written:
+        logger.error(f"{weekly_index} has {found} documents of {day} instead of {written}, keeping {daily_index}")
+        return False
+    logger.info(f"Compacted {daily_index} into {written} documents in {weekly_index}")
+
+    if not index_exists(INDEX_MAP):
+        create_index(INDEX_MAP, body=INDEX_MAP_BODY)
+    opensearch_client.client.index(index=INDEX_MAP, body={
+        "day": day,
+        "index": weekly_index,
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    })
+    delete_index(daily_index)
+    return True
+
+
+def compact(today, deadline=None):
+    """
+    Compact the days of every week whose last day is older than `compact_after_days`, one day at
+    a time, until `deadline` (time.monotonic()). Days left over are compacted by the next run.
+    """
+    if compact_after_days <= 0:
+        return []
+    newest = (today - timedelta(days=compact_after_days)).strftime("%Y%m%d")
+    weeks = defaultdict(dict)
+    for index_name in list_indices("eks-cluster-*"):
+        daily = DAILY_INDEX.match(index_name)
+        if daily:
+            weeks[weekly_index_name(daily.group(1))][daily.group(1)] = index_name
+
+    already_mapped = mapped_days()
+    compacted = []
+    for weekly_index, daily_indices in sorted(weeks.items()):
+        if last_day_of_week(weekly_index) > newest:
+            continue
+        if not index_exists(weekly_index):
+            create_index(weekly_index, body=WEEKLY_INDEX_BODY)
+        for day, daily_index in sorted(daily_indices.items()):
+            # A previous run mapped the day but did not finish deleting its daily index
+            if day in already_mapped:
+                delete_index(daily_index)
+                continue
+            if deadline is not None and time.monotonic() > deadline:
+                logger.info("Stopping before the invocation times out, the next run continues")
+                return compacted
+            if compact_day(weekly_index, day, daily_index):
+                compacted.append(day)
+    return compacted
+
+
+def handler(event, context):
+    """Scheduled Lambda handler enforcing retention, then compacting older weeks"""
+    today = datetime.now(timezone.utc)
+    deadline = time.monotonic() + context.get_remaining_time_in_millis() / 1000 - stop_margin_seconds
+    deleted = enforce_retention(today)
+    compacted = compact(today, deadline)
+    logger.info(f"Deleted {len(deleted)} expired indices, compacted {len(compacted)} days")
+    return {
+        'statusCode': 200,
+        'deleted': deleted,
+        'compacted': compacted
+    }
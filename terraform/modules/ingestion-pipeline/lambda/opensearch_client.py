@@ -0,0 +1,80 @@
+import logging
+import os
+
+import boto3
+from opensearchpy import OpenSearch, RequestsAWSV4SignerAuth, RequestsHttpConnection
+
+logger = logging.getLogger()
+
+opensearch_endpoint = os.environ.get('OPENSEARCH_ENDPOINT').replace('https://', '')
+region = os.environ.get('AWS_REGION')
+
+# Each request is signed with the current (refreshable) credentials, so a warm container keeps
+# one client and its pooled connections
+auth = RequestsAWSV4SignerAuth(boto3.Session().get_credentials(), region, 'aoss')
+
+client = OpenSearch(
+    hosts=[{'host': opensearch_endpoint, 'port': 443}],
+    http_auth=auth,
+    use_ssl=True,
+    verify_certs=True,
+    connection_class=RequestsHttpConnection,
+    pool_maxsize=int(os.environ.get('OPENSEARCH_POOL_SIZE', '10'))
+)
+
+DAILY_INDEX_BODY = {
+    "settings": {
+        "index": {
+            "knn": True,
+            "knn.algo_param.ef_search": 100
+        }
+    },
+    "mappings": {
+        "properties": {
+            "embedding": {
+                "type": "knn_vector",
+                "dimension": 1024,
+                "method": {
+                    "name": "hnsw",
+                    "space_type": "l2",
+                    "engine": "faiss",
+                    "parameters": {
+                        "ef_construction": 128,
+                        "m": 24
+                    }
+                }
+            },
+            "log": {
+                "type": "text"
+            },
+            "id": {
+                "type": "keyword"
+            },
+            "archive": {
+                "type": "keyword"
+            },
+            "log_hash": {
+                "type": "keyword"
+            }
+        }
+    }
+}
+
+
+def index_exists(index_name):
+    try:
+        return client.indices.exists(index=index_name)
+    except Exception as e:
+        logger.error(f"Error checking index existence: {e}")
+        return False
+
+
+def create_index(index_name, body=None):
+    logger.info(f"Creating index: {index_name}")
+    try:
+        response = client.indices.create(index=index_name, body=body or DAILY_INDEX_BODY)
+        if not response.get('acknowledged', False):
+            logger.error(f"Failed to create index: {response}")
+    except Exception as e:
+        logger.error(f"Error creating index: {e}")
+        raise
@@ -2,10 +2,18 @@ import base64
 import json
 import logging
 import boto3
-from opensearchpy import OpenSearch, RequestsHttpConnection, helpers
-from requests_aws4auth import AWS4Auth
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from opensearchpy import helpers
 from datetime import datetime
 import os
+import time
+from anomalies import ANOMALY_INDEX_BODY, aggregate, anomaly_documents, anomaly_index_name, line_hash
+from archive import archive_backend, archive_logs, record_id, trim_archive
+from batching import AdaptiveController
+import opensearch_client
+from opensearch_client import create_index, index_exists
 
 # Set up logging
 logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s')
@@ -13,9 +21,13 @@ logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 # Get configuration from environment variables
-opensearch_endpoint = os.environ.get('OPENSEARCH_ENDPOINT').replace('https://', '')
 region = os.environ.get('AWS_REGION')
 model = os.environ.get('EMBEDDING_MODEL')
+embedding_cache_size = int(os.environ.get('EMBEDDING_CACHE_SIZE', '1000'))
+# Stop embedding this long before the Lambda timeout, so what was embedded can still be indexed
+flush_margin_seconds = float(os.environ.get('FLUSH_MARGIN_SECONDS', '30'))
+# Characters of archived logs kept in the vector index
+snippet_chars = int(os.environ.get('ARCHIVE_SNIPPET_CHARS', '300'))
 
 
 # Initialize clients
@@ -24,22 +36,10 @@ bedrock_runtime = boto3.client(
     region_name=region
 )
 
-credentials = boto3.Session().get_credentials()
-auth = AWS4Auth(
-    credentials.access_key,
-    credentials.secret_key,
-    region,
-    'aoss',
-    session_token=credentials.token
-)
-
-client = OpenSearch(
-    hosts=[{'host': opensearch_endpoint, 'port': 443}],
-    http_auth=auth,
-    use_ssl=True,
-    verify_certs=True,
-    connection_class=RequestsHttpConnection
-)
+# Reused across invocations of a warm container, which keeps tuning them from observed latency
+controller = AdaptiveController()
+embedding_executor = ThreadPoolExecutor(max_workers=controller.max_concurrency)
+archive = archive_backend()
 
 
 def get_embedding(text):
@@ -63,119 +63,276 @@ def get_embedding(text):
         raise
 
 
-def encode_data(data):
+@lru_cache(maxsize=embedding_cache_size)
+def get_cached_embedding(text):
+    """Embeddings of a warm container are kept, so repeated lines and re-driven records are not paid twice"""
+    return get_embedding(text)
+
+
+def decode_record(record):
+    """Decode the base64 payload of a Kinesis record, None if it is not valid UTF-8"""
     try:
-        logger.info(f"Encoding {len(data)} items")
-        embeddings = []
-        for record in data:
-            d = base64.b64decode(record['kinesis']['data']).decode('utf-8')
-            embedding = get_embedding(str(d))
-            embeddings.append({"log": str(d), "embedding": embedding})
-        return embeddings
-    except Exception as e:
-        logger.error(f"Error while embedding data: {e}")
-        raise
+        return base64.b64decode(record['kinesis']['data']).decode('utf-8')
+    except (ValueError, UnicodeDecodeError) as e:
+        logger.error(f"Skipping undecodable record {record['kinesis'].get('sequenceNumber')}: {e}")
+        return None
+
+
+def decode_records(data):
+    """Decode the base64 payload of Kinesis records"""
+    return [decode_record(record) for record in data]
+
+
+def is_retryable(error):
+    """Invalid input (e.g. a record over the model's input limit) fails again on every retry"""
+    if isinstance(error, ClientError):
+        return error.response.get('Error', {}).get('Code') != 'ValidationException'
+    return True
+
+
+def encode_data(logs, deadline=None):
+    """
+    Embed logs concurrently, keeping their order.
+
+    Up to `controller.concurrency` embedding calls run ahead of the log being consumed.
+    Returns the embeddings of the logs before the first one that failed with a retryable
+    error or was reached after `deadline` (time.monotonic()), and the position of that log
+    (None if all succeeded). Logs that cannot be embedded on any retry are skipped.
+    """
+    logger.info(f"Encoding {len(logs)} items with concurrency {controller.concurrency}")
+    futures = {}
+    submitted = 0
+    embeddings = []
+    for position, log in enumerate(logs):
+        while submitted < len(logs) and submitted < position + controller.concurrency:
+            if logs[submitted]:
+                futures[submitted] = embedding_executor.submit(get_cached_embedding, logs[submitted])
+            submitted += 1
+        future = futures.pop(position, None)
+        if future is None:
+            continue
+        if deadline is not None and time.monotonic() > deadline:
+            logger.warning(f"Stopping at record {position} to index before the invocation times out")
+            cancel(futures)
+            return embeddings, position
+        try:
+            embeddings.append({"log": log, "embedding": future.result(), "position": position})
+        except Exception as e:
+            if not is_retryable(e):
+                logger.error(f"Skipping record {position} that cannot be embedded: {e}")
+                continue
+            logger.error(f"Error while embedding data: {e}")
+            # Records after a failure are re-driven with it, avoid paying for them now
+            cancel(futures)
+            controller.observe_embeddings(throttled=True)
+            return embeddings, position
+    controller.observe_embeddings(throttled=False)
+    return embeddings, None
+
+
+def cancel(futures):
+    for future in futures.values():
+        future.cancel()
+
+
+def is_retryable_status(status):
+    """Throttled (429) and server-side (5xx) item failures can succeed on a retry, other 4xx never will"""
+    if not isinstance(status, int):
+        # Connection errors and timeouts carry no HTTP status
+        return True
+    return status == 429 or status >= 500
 
 
 def index_data(embeddings, index_name):
+    """
+    Bulk index embedded logs. Logs archived to S3 are indexed as a snippet with the key of
+    their archive file, each document keeps the hash of its full line for the compaction.
+
+    Bulk requests are sent one at a time and indexing stops at the first document that failed
+    with a retryable (429/5xx) error. Documents after it that were already indexed by the same
+    request are deleted again, so the records re-driven from the failure are indexed only once.
+    Documents rejected with another 4xx error (e.g. a mapping error) would fail on every retry,
+    they are logged and dropped.
+
+    Returns the record position of the first document that failed with a retryable error,
+    None if all were indexed or dropped.
+    """
+    if not embeddings:
+        return None
     if not index_exists(index_name):
         create_index(index_name)
 
     bulk_data = []
     for i, embedding in enumerate(embeddings):
-        bulk_data.append({
-            "_index": index_name,
-            "_source": {
-                "embedding": embedding["embedding"],
-                "log": embedding["log"],
-                "id": i
-            }
-        })
+        source = {
+            "embedding": embedding["embedding"],
+            "log": embedding["log"],
+            "id": embedding.get("id", i),
+            # Hashed in full, archived logs are only indexed as a snippet
+            "log_hash": line_hash(embedding["log"])
+        }
+        if embedding.get("archive"):
+            source["log"] = embedding["log"][:snippet_chars]
+            source["archive"] = embedding["archive"]
+        bulk_data.append({"_index": index_name, "_source": source})
+
+    success = dropped = 0
+    first_failed = None
+    start = 0
+    while start < len(bulk_data) and first_failed is None:
+        chunk = bulk_data[start:start + controller.bulk_size]
+        started = time.monotonic()
+        indexed_after_failure = []
+        processed = 0
+        throttled = False
+        try:
+            # streaming_bulk reports each document of the request in order
+            for offset, (ok, item) in enumerate(helpers.streaming_bulk(
+                opensearch_client.client,
+                chunk,
+                chunk_size=len(chunk),
+                raise_on_error=False,
+                raise_on_exception=False,
+                request_timeout=60,
+            )):
+                processed = offset + 1
+                result = next(iter(item.values()))
+                if ok:
+                    if first_failed is None:
+                        success += 1
+                    else:
+                        indexed_after_failure.append(result.get("_id"))
+                elif first_failed is not None:
+                    continue
+                elif is_retryable_status(result.get("status")):
+                    logger.error(f"Error indexing document: {item}")
+                    first_failed = embeddings[start + offset]["position"]
+                    throttled = True
+                else:
+                    logger.error(f"Dropping document of record {embeddings[start + offset]['position']} that cannot be indexed: {item}")
+                    dropped += 1
+        except Exception as e:
+            logger.error(f"Error during bulk indexing: {e}")
+            if first_failed is None:
+                first_failed = embeddings[min(start + processed, len(embeddings) - 1)]["position"]
+            throttled = True
+        if first_failed is None:
+            controller.observe_bulk(len(chunk), time.monotonic() - started, batch_docs=len(bulk_data))
+        else:
+            if throttled:
+                controller.observe_bulk_throttled()
+            delete_documents(index_name, indexed_after_failure)
+        start += len(chunk)
+
+    logger.info(f"Indexed {success} documents" + (f", dropped {dropped}" if dropped else "") +
+                (f", first failure at record {first_failed}" if first_failed is not None else ""))
+    return first_failed
+
+
+def delete_documents(index_name, document_ids):
+    """Delete documents indexed after a failure, they are indexed again with the re-driven records"""
+    document_ids = [document_id for document_id in document_ids if document_id]
+    if not document_ids:
+        return
     try:
-        success, failed = helpers.bulk(
-            client,
-            bulk_data,
+        helpers.bulk(
+            opensearch_client.client,
+            ({"_op_type": "delete", "_index": index_name, "_id": document_id} for document_id in document_ids),
             raise_on_error=True,
             request_timeout=60,
         )
-        logger.info(f"Indexed {success} documents" + (f", {len(failed)} failed" if failed else ""))
+        logger.info(f"Deleted {len(document_ids)} documents indexed after the first failure")
+    except Exception as e:
+        # The re-driven records will be indexed a second time
+        logger.error(f"Error deleting documents indexed after the first failure: {e}")
 
+
+def index_anomalies(logs, timestamp):
+    """Index per namespace/pod error signature counts of the batch in the anomaly side index"""
+    try:
+        counts, samples = aggregate(logs)
+        if not counts:
+            return
+        index_name = anomaly_index_name(timestamp)
+        if not index_exists(index_name):
+            create_index(index_name, body=ANOMALY_INDEX_BODY)
+        success, _ = helpers.bulk(
+            opensearch_client.client,
+            anomaly_documents(counts, samples, index_name),
+            raise_on_error=True,
+            request_timeout=60,
+        )
+        logger.info(f"Indexed {success} anomaly counts")
     except Exception as e:
-        logger.error(f"Error during bulk indexing: {e}")
-        raise
+        # The side index is an optimization, log indexing must not depend on it
+        logger.warning(f"Error indexing anomalies: {e}")
 
 
-def index_exists(index_name):
+def archive_batch(records, logs, timestamp):
+    """Archive the raw logs, returning their archive keys by record position"""
+    if archive is None or not records:
+        return {}
     try:
-        return client.indices.exists(index=index_name)
+        return archive_logs(archive, records, logs, timestamp)
     except Exception as e:
-        logger.error(f"Error checking index existence: {e}")
-        return False
-
-
-def create_index(index_name):
-    logger.info(f"Creating index: {index_name}")
-    body = {
-        "settings": {
-            "index": {
-                "knn": True,
-                "knn.algo_param.ef_search": 100
-            }
-        },
-        "mappings": {
-            "properties": {
-                "embedding": {
-                    "type": "knn_vector",
-                    "dimension": 1024,
-                    "method": {
-                        "name": "hnsw",
-                        "space_type": "l2",
-                        "engine": "faiss",
-                        "parameters": {
-                            "ef_construction": 128,
-                            "m": 24
-                        }
-                    }
-                },
-                "log": {
-                    "type": "text"
-                },
-                "id": {
-                    "type": "keyword"
-                }
-            }
-        }
-    }
+        # Without an archive the full logs stay in the index
+        logger.warning(f"Error archiving logs, indexing them in full: {e}")
+        return {}
+
 
+def trim_archived_batch(records, logs, timestamp, archive_keys, failed_position):
+    """Keep only the records that are checkpointed in the archive, the re-driven records are archived again"""
+    if not archive_keys or failed_position is None:
+        return
     try:
-        response = client.indices.create(index=index_name, body=body)
-        if not response.get('acknowledged', False):
-            logger.error(f"Failed to create index: {response}")
+        trim_archive(archive, records, logs, timestamp, failed_position, set(archive_keys.values()))
     except Exception as e:
-        logger.error(f"Error creating index: {e}")
-        raise
+        # The re-driven records will be in two archive files
+        logger.warning(f"Error trimming archived logs: {e}")
 
 
 def handler(event, context):
-    """Lambda function handler"""
+    """
+    Lambda function handler
+
+    Reports the first record that failed as a batch item failure, so Lambda checkpoints the
+    records before it and only re-drives the shard from that record on.
+    """
     start_time = datetime.now()
-    record_count = len(event['Records'])
+    records = event['Records']
+    record_count = len(records)
     logger.info(f"Processing {record_count} records")
 
+    failed_position = None
     try:
         timestamp = datetime.now().strftime("%Y%m%d")
         index_name = f"eks-cluster-{timestamp}"
-        embeddings = encode_data(data=event['Records'])
-        index_data(embeddings, index_name)
+        deadline = time.monotonic() + context.get_remaining_time_in_millis() / 1000 - flush_margin_seconds
+        logs = decode_records(records)
+        archive_keys = archive_batch(records, logs, timestamp)
+        embeddings, embedding_failure = encode_data(logs, deadline)
+        for embedding in embeddings:
+            embedding["id"] = record_id(records[embedding["position"]])
+            embedding["archive"] = archive_keys.get(embedding["position"])
+        index_failure = index_data(embeddings, index_name)
+        failures = [p for p in (embedding_failure, index_failure) if p is not None]
+        failed_position = min(failures) if failures else None
+        trim_archived_batch(records, logs, timestamp, archive_keys, failed_position)
+        # Only count records that will not be re-driven
+        index_anomalies([log for log in logs[:failed_position] if log], timestamp)
 
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON parsing error: {str(e)}")
     except Exception as e:
         logger.error(f"Processing error: {str(e)}")
+        failed_position = 0
 
     duration = (datetime.now() - start_time).total_seconds()
+    batch_item_failures = []
+    if failed_position is not None and record_count:
+        batch_item_failures.append({"itemIdentifier": records[failed_position]['kinesis']['sequenceNumber']})
+        logger.warning(f"Re-driving {record_count - failed_position} of {record_count} records")
 
     return {
+        'batchItemFailures': batch_item_failures,
         'statusCode': 200,
         'body': json.dumps({
             'message': f'Processed {record_count} records',
@@ -0,0 +1,12 @@
+import os
+import sys
+
+# processor and opensearch_client read their configuration and AWS credentials at import time
+os.environ.setdefault("OPENSEARCH_ENDPOINT", "https://localhost")
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ.setdefault("AWS_DEFAULT_REGION", os.environ["AWS_REGION"])
+os.environ.setdefault("EMBEDDING_MODEL", "amazon.titan-embed-text-v2:0")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "test")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,45 @@
+import glob
+import os
+
+import pyarrow.parquet as pq
+
+from archive import LocalBackend, archive_logs, trim_archive
+from benchmark.load_test import kinesis_event, synthetic_records
+
+DAY = "20261019"
+
+
+def archived_ids(root):
+    return sorted(
+        record_id
+        for path in glob.glob(os.path.join(root, "**", "*.parquet"), recursive=True)
+        for record_id in pq.read_table(path)["id"].to_pylist()
+    )
+
+
+def test_a_retried_batch_overwrites_its_files(tmp_path):
+    backend = LocalBackend(str(tmp_path))
+    logs = synthetic_records(20)
+    records = kinesis_event(logs, 1000)["Records"]
+    first = archive_logs(backend, records, logs, DAY)
+    assert archive_logs(backend, records, logs, DAY) == first
+    assert archived_ids(str(tmp_path)) == sorted(str(1000 + position) for position in range(20))
+
+
+def test_a_redriven_batch_does_not_overlap_the_failed_one(tmp_path):
+    backend = LocalBackend(str(tmp_path))
+    logs = synthetic_records(20)
+    records = kinesis_event(logs, 1000)["Records"]
+    keys = archive_logs(backend, records, logs, DAY)
+    trim_archive(backend, records, logs, DAY, 8, set(keys.values()))
+    archive_logs(backend, records[8:], logs[8:], DAY)
+    assert archived_ids(str(tmp_path)) == sorted(str(1000 + position) for position in range(20))
+
+
+def test_a_batch_failed_at_its_first_record_leaves_no_files(tmp_path):
+    backend = LocalBackend(str(tmp_path))
+    logs = synthetic_records(5)
+    records = kinesis_event(logs, 1000)["Records"]
+    keys = archive_logs(backend, records, logs, DAY)
+    trim_archive(backend, records, logs, DAY, 0, set(keys.values()))
+    assert archived_ids(str(tmp_path)) == []
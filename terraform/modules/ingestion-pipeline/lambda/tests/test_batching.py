@@ -0,0 +1,56 @@
+from batching import AdaptiveController
+
+
+def controller(**kwargs):
+    options = dict(concurrency=4, max_concurrency=8, bulk_size=100, min_bulk_size=20,
+                   max_bulk_size=500, bulk_target_seconds=2, adaptive=True)
+    options.update(kwargs)
+    return AdaptiveController(**options)
+
+
+def test_concurrency_grows_by_one_and_halves_when_throttled():
+    adaptive = controller()
+    adaptive.observe_embeddings(throttled=False)
+    assert adaptive.concurrency == 5
+    adaptive.observe_embeddings(throttled=True)
+    assert adaptive.concurrency == 2
+    for _ in range(20):
+        adaptive.observe_embeddings(throttled=False)
+    assert adaptive.concurrency == 8
+
+
+def test_bulk_size_is_capped_by_the_largest_batch():
+    adaptive = controller()
+    for _ in range(10):
+        # 1ms per document would allow 2000 documents per request
+        adaptive.observe_bulk(100, 0.1, batch_docs=100)
+    assert adaptive.bulk_size == 100
+    adaptive.observe_bulk(300, 0.3, batch_docs=300)
+    assert adaptive.bulk_size == 300
+
+
+def test_bulk_size_shrinks_when_requests_slow_down():
+    adaptive = controller()
+    adaptive.observe_bulk(100, 0.1, batch_docs=400)
+    assert adaptive.bulk_size == 400
+    for _ in range(20):
+        # Small requests are observed too, 50ms per document allows 40 documents
+        adaptive.observe_bulk(30, 1.5, batch_docs=30)
+    assert 40 <= adaptive.bulk_size <= 41
+
+
+def test_bulk_size_halves_when_throttled():
+    adaptive = controller(bulk_size=100)
+    adaptive.observe_bulk_throttled()
+    assert adaptive.bulk_size == 50
+    adaptive.observe_bulk_throttled()
+    adaptive.observe_bulk_throttled()
+    assert adaptive.bulk_size == 20
+
+
+def test_sizes_are_fixed_when_not_adaptive():
+    fixed = controller(adaptive=False)
+    fixed.observe_embeddings(throttled=True)
+    fixed.observe_bulk(100, 10, batch_docs=100)
+    fixed.observe_bulk_throttled()
+    assert (fixed.concurrency, fixed.bulk_size) == (4, 100)
@@ -0,0 +1,29 @@
+from anomalies import line_hash
+from lifecycle import dedupe_key
+
+DAY = "20261019"
+
+
+def log(pod, message):
+    return f'{{"kubernetes":{{"namespace_name":"payments","pod_name":"{pod}"}},"log":"{message}"}}'
+
+
+def test_repeats_of_a_line_share_a_key():
+    first = log("api-7d9f-abc12", "timeout after 1200ms for request 41")
+    repeat = log("api-7d9f-abc12", "timeout after 3400ms for request 97")
+    assert dedupe_key(DAY, {"log": first}) == dedupe_key(DAY, {"log": repeat})
+
+
+def test_pods_and_days_are_kept_apart():
+    line = "timeout after 1200ms for request 41"
+    key = dedupe_key(DAY, {"log": log("api-7d9f-abc12", line)})
+    assert key != dedupe_key(DAY, {"log": log("api-7d9f-def34", line)})
+    assert key != dedupe_key("20261020", {"log": log("api-7d9f-abc12", line)})
+
+
+def test_the_hash_of_the_full_line_is_preferred_over_the_snippet():
+    snippet = log("api-7d9f-abc12", "connection refused")[:40]
+    first = {"log": snippet, "log_hash": line_hash(log("api-7d9f-abc12", "connection refused by payments-db"))}
+    second = {"log": snippet, "log_hash": line_hash(log("api-7d9f-abc12", "connection refused by ledger"))}
+    assert dedupe_key(DAY, first) != dedupe_key(DAY, second)
+    assert dedupe_key(DAY, {"log": snippet}) == dedupe_key(DAY, {"log": snippet, "log_hash": line_hash(snippet)})
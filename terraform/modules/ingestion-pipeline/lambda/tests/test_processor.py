@@ -0,0 +1,81 @@
+import types
+
+import pytest
+
+import opensearch_client
+import processor
+from batching import AdaptiveController
+from benchmark.fakes import FakeBedrockRuntime, InMemoryBulkSink
+from benchmark.load_test import kinesis_event, synthetic_records
+
+INDEX = "eks-cluster-20261019"
+
+
+@pytest.fixture
+def records():
+    return synthetic_records(30)
+
+
+@pytest.fixture(autouse=True)
+def fakes(monkeypatch):
+    monkeypatch.setattr(processor, "bedrock_runtime", FakeBedrockRuntime(latency=0))
+    monkeypatch.setattr(processor, "controller", AdaptiveController(concurrency=4, bulk_size=10, min_bulk_size=5, adaptive=True))
+    monkeypatch.setattr(processor, "archive", None)
+    processor.get_cached_embedding.cache_clear()
+
+
+def use_sink(monkeypatch, item_status=None):
+    sink = InMemoryBulkSink(item_status=item_status)
+    monkeypatch.setattr(opensearch_client, "client", sink)
+    return sink
+
+
+def embedded(records):
+    return [{"log": record, "embedding": [0.0] * 4, "position": position, "id": str(position)}
+            for position, record in enumerate(records)]
+
+
+def test_index_data_indexes_every_document(monkeypatch, records):
+    sink = use_sink(monkeypatch)
+    assert processor.index_data(embedded(records), INDEX) is None
+    assert sink.count(INDEX) == len(records)
+    assert all("log_hash" in document for document in sink.documents[INDEX].values())
+
+
+def test_index_data_stops_at_the_first_retryable_failure(monkeypatch, records):
+    # Record 13 is in the second bulk request, the records after it in that request are rolled back
+    sink = use_sink(monkeypatch, item_status=lambda source: 429 if source["id"] == "13" else None)
+    assert processor.index_data(embedded(records), INDEX) == 13
+    assert sorted(int(document["id"]) for document in sink.documents[INDEX].values()) == list(range(13))
+    # Grown to the whole batch after the fast first request, then halved by the throttled one
+    assert processor.controller.bulk_size == 15
+
+
+def test_index_data_drops_documents_rejected_with_a_client_error(monkeypatch, records):
+    sink = use_sink(monkeypatch, item_status=lambda source: 400 if source["id"] == "3" else None)
+    assert processor.index_data(embedded(records), INDEX) is None
+    assert sink.count(INDEX) == len(records) - 1
+
+
+def test_retryable_statuses():
+    assert processor.is_retryable_status(429)
+    assert processor.is_retryable_status(503)
+    assert processor.is_retryable_status(None)
+    assert not processor.is_retryable_status(400)
+
+
+def invoke(records):
+    context = types.SimpleNamespace(aws_request_id="test", get_remaining_time_in_millis=lambda: 300000)
+    return processor.handler(kinesis_event(records, 1000), context)
+
+
+def test_handler_reports_no_failure_for_a_complete_batch(monkeypatch, records):
+    sink = use_sink(monkeypatch)
+    assert invoke(records)["batchItemFailures"] == []
+    assert sink.count("eks-cluster-") == len(records)
+
+
+def test_handler_reports_the_first_failed_record(monkeypatch, records):
+    failed = records[7]
+    use_sink(monkeypatch, item_status=lambda source: 503 if source["log"] == failed else None)
+    assert invoke(records)["batchItemFailures"] == [{"itemIdentifier": "1007"}]
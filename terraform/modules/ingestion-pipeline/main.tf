@@ -117,8 +117,67 @@ resource "aws_lambda_event_source_mapping" "stream_lambda" {
   function_name     = aws_lambda_function.processor.arn
   starting_position = "LATEST"
 
-  batch_size                         = 100
-  maximum_batching_window_in_seconds = 60
+  # Kinesis accumulates records up to batch_size or the batching window, this is what groups
+  # records of low traffic periods into fewer, larger bulk requests
+  batch_size                         = var.stream_batch_size
+  maximum_batching_window_in_seconds = var.stream_batching_window_seconds
+
+  # The processor returns the first record it failed to process, only that record and the
+  # ones after it are retried
+  function_response_types = ["ReportBatchItemFailures"]
+
+  # A record that keeps failing is retried a limited number of times, then its batch is split
+  # to isolate it and finally sent to the failure queue, so it cannot block the shard
+  maximum_retry_attempts         = var.stream_max_retry_attempts
+  bisect_batch_on_function_error = true
+
+  destination_config {
+    on_failure {
+      destination_arn = aws_sqs_queue.stream_failures.arn
+    }
+  }
+}
+
+# Metadata of the Kinesis batches that exhausted their retries, to replay them from the stream
+resource "aws_sqs_queue" "stream_failures" {
+  name                      = "${var.name}-stream-failures"
+  message_retention_seconds = 1209600
+}
+
+################################################################################
+# Raw Log Archive
+################################################################################
+
+# Raw log lines as zstd Parquet, partitioned by date and namespace. The vector index keeps
+# a snippet and the key of the archive file of each line.
+resource "aws_s3_bucket" "log_archive" {
+  bucket_prefix = "${var.name}-log-archive-"
+  force_destroy = true
+}
+
+resource "aws_s3_bucket_public_access_block" "log_archive" {
+  bucket                  = aws_s3_bucket.log_archive.id
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+}
+
+resource "aws_s3_bucket_lifecycle_configuration" "log_archive" {
+  bucket = aws_s3_bucket.log_archive.id
+
+  rule {
+    id     = "expire-archived-logs"
+    status = "Enabled"
+
+    filter {
+      prefix = "logs/"
+    }
+
+    expiration {
+      days = var.archive_retention_days
+    }
+  }
 }
 
 ################################################################################
@@ -161,6 +220,13 @@ resource "aws_iam_role_policy" "lambda_kinesis_policy" {
         ]
         Resource = aws_kinesis_stream.log_stream.arn
       },
+      {
+        Effect = "Allow"
+        Action = [
+          "sqs:SendMessage"
+        ]
+        Resource = aws_sqs_queue.stream_failures.arn
+      },
       {
         Effect = "Allow"
         Action = [
@@ -194,6 +260,26 @@ resource "aws_iam_role_policy" "lambda_opensearch_policy" {
   })
 }
 
+# Permission to write the raw log archive
+resource "aws_iam_role_policy" "lambda_archive_policy" {
+  name = "${var.name}-log-archive-write-policy"
+  role = aws_iam_role.lambda_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:PutObject",
+          "s3:DeleteObject"
+        ]
+        Resource = ["${aws_s3_bucket.log_archive.arn}/logs/*"]
+      }
+    ]
+  })
+}
+
 # Basic Lambda execution policy
 resource "aws_iam_role_policy_attachment" "lambda_basic" {
   policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
@@ -248,6 +334,11 @@ resource "null_resource" "docker_push" {
   triggers = {
     docker_file = filemd5("${path.module}/lambda/Dockerfile")
     source_code = filemd5("${path.module}/lambda/processor.py")
+    source_opensearch_client = filemd5("${path.module}/lambda/opensearch_client.py")
+    source_anomalies = filemd5("${path.module}/lambda/anomalies.py")
+    source_batching = filemd5("${path.module}/lambda/batching.py")
+    source_archive = filemd5("${path.module}/lambda/archive.py")
+    source_lifecycle = filemd5("${path.module}/lambda/lifecycle.py")
     source_requirements = filemd5("${path.module}/lambda/requirements.txt")
   }
 
@@ -270,14 +361,68 @@ resource "aws_lambda_function" "processor" {
   package_type     = "Image"
   image_uri        = "${aws_ecr_repository.lambda_repo.repository_url}:latest"
   timeout          = 300
+  # pyarrow for the log archive does not fit the default 128 MB
+  memory_size      = 1024
 
   environment {
     variables = {
       LOG_LEVEL = "INFO"
       OPENSEARCH_ENDPOINT = aws_opensearchserverless_collection.vector_db.collection_endpoint
       EMBEDDING_MODEL = "amazon.titan-embed-text-v2:0"
+      EMBEDDING_CONCURRENCY = var.embedding_concurrency
+      ADAPTIVE_BATCHING = var.adaptive_batching
+      ARCHIVE_BUCKET = aws_s3_bucket.log_archive.id
     }
   }
 
   depends_on = [null_resource.docker_push]
 }
+
+################################################################################
+# Index Lifecycle Manager - Lambda Function
+################################################################################
+
+# Same image as the processor with the lifecycle handler: deletes indices past the retention
+# and merges the daily indices of older weeks into a quantized, deduplicated weekly index
+resource "aws_lambda_function" "lifecycle" {
+  function_name    = "${var.name}-index-lifecycle"
+  role             = aws_iam_role.lambda_role.arn
+  package_type     = "Image"
+  image_uri        = "${aws_ecr_repository.lambda_repo.repository_url}:latest"
+  timeout          = 900
+  memory_size      = 1024
+
+  image_config {
+    command = ["lifecycle.handler"]
+  }
+
+  environment {
+    variables = {
+      LOG_LEVEL = "INFO"
+      OPENSEARCH_ENDPOINT = aws_opensearchserverless_collection.vector_db.collection_endpoint
+      RETENTION_DAYS = var.index_retention_days
+      COMPACT_AFTER_DAYS = var.compact_after_days
+    }
+  }
+
+  depends_on = [null_resource.docker_push]
+}
+
+resource "aws_cloudwatch_event_rule" "lifecycle_schedule" {
+  name                = "${var.name}-index-lifecycle"
+  description         = "Runs the index lifecycle manager"
+  schedule_expression = var.lifecycle_schedule
+}
+
+resource "aws_cloudwatch_event_target" "lifecycle" {
+  rule = aws_cloudwatch_event_rule.lifecycle_schedule.name
+  arn  = aws_lambda_function.lifecycle.arn
+}
+
+resource "aws_lambda_permission" "lifecycle_schedule" {
+  statement_id  = "AllowEventBridgeInvoke"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.lifecycle.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.lifecycle_schedule.arn
+}
@@ -8,4 +8,16 @@ output "collection_arn" {
 
 output "ecr_repository_url" {
   value = aws_ecr_repository.lambda_repo.repository_url
-}
\ No newline at end of file
+}
+
+output "archive_bucket_name" {
+  value = aws_s3_bucket.log_archive.id
+}
+
+output "archive_bucket_arn" {
+  value = aws_s3_bucket.log_archive.arn
+}
+
+output "stream_failures_queue_url" {
+  value = aws_sqs_queue.stream_failures.url
+}
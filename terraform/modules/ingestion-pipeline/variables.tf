@@ -12,4 +12,57 @@ variable "region" {
 
 variable "container_builder" {
   type        = string
-}
\ No newline at end of file
+}
+variable "stream_batch_size" {
+  type        = number
+  description = "Maximum number of Kinesis records per processor invocation"
+  default     = 100
+}
+
+variable "stream_batching_window_seconds" {
+  type        = number
+  description = "Maximum time Lambda buffers Kinesis records before invoking the processor"
+  default     = 60
+}
+
+variable "stream_max_retry_attempts" {
+  type        = number
+  description = "Retries of a failing Kinesis batch before it is sent to the failure queue"
+  default     = 10
+}
+
+variable "embedding_concurrency" {
+  type        = number
+  description = "Initial number of concurrent embedding calls per invocation"
+  default     = 4
+}
+
+variable "adaptive_batching" {
+  type        = bool
+  description = "Tune embedding concurrency and bulk request size from observed latency"
+  default     = true
+}
+
+variable "archive_retention_days" {
+  type        = number
+  description = "Days raw log lines are kept in the S3 archive"
+  default     = 30
+}
+
+variable "index_retention_days" {
+  type        = number
+  description = "Days log and anomaly indices are kept in OpenSearch"
+  default     = 30
+}
+
+variable "compact_after_days" {
+  type        = number
+  description = "Days after the end of a week before its daily indices are merged into a weekly index, 0 disables compaction"
+  default     = 7
+}
+
+variable "lifecycle_schedule" {
+  type        = string
+  description = "EventBridge schedule expression of the index lifecycle manager, each run compacts as many days as fit in its timeout"
+  default     = "cron(30 * * * ? *)"
+}